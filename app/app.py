@@ -1,8 +1,30 @@
-from flask import Flask, render_template, url_for
+import os
+import threading
+import time
+from flask import Flask, render_template, url_for, request, make_response
 from werkzeug.exceptions import HTTPException
-from os import listdir
+from catalog import Catalog
+from fragment_cache import FragmentCache
+from leaderboard import Leaderboard
+from metrics import Metrics
+from models import db
+from ratings import MAX_RATING, MIN_RATING, RatingStore
+from static_delivery import StaticDelivery
+from write_behind import StoreFull
 
 app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', "sqlite:///database.db")
+# "", "x-sendfile" or "x-accel-redirect" for files under Games/*/build
+app.config['GAME_BUNDLE_OFFLOAD'] = os.getenv('GAME_BUNDLE_OFFLOAD', '')
+# Shared directory for per-worker metric snapshots when running several processes
+app.config['METRICS_DIR'] = os.getenv('METRICS_DIR')
+db.init_app(app)
+metrics = Metrics(app)
+static_delivery = StaticDelivery(app)
+fragments = FragmentCache()
+# Seconds between checks for edited manifests and regenerated thumbnails
+CATALOG_CHECK_INTERVAL = 2.0
+THUMBNAIL_HASHES = os.path.join(app.static_folder, "thumbnails", "hashes.json")
 
 class GameCard:
     def __init__(self, game_id, game_name, description, rating=0.0):
@@ -11,13 +33,19 @@ class GameCard:
         self.rating = rating
         self.ratings = 0
         self.description = description
+        self.build = "build/web/index.html"
 
     def return_HTML(self):
-        # Generate the URL using Flask's url_for in application context
-        with app.app_context():
-            game_url = url_for("game", game_id=self.game_id)
+        # Only called while the card grid fragment is being (re)built
+        game_url = url_for("game", game_id=self.game_id)
+        thumbnail = ''
+        # Generated by thumbnails.py
+        if os.path.exists(os.path.join(app.static_folder, "thumbnails", f"{self.game_id}.png")):
+            thumbnail_url = url_for("static", filename=f"thumbnails/{self.game_id}.png")
+            thumbnail = f'<img class="card-img-top" src="{thumbnail_url}" alt="{self.game_name}" loading="lazy">'
         return f'''<div class="d-inline col-md-4 col-sm-6 col-xs-12 my-2">
             <div class="card shadow m-3" >
+                {thumbnail}
                 <div class="card-body">
                     <h3 class="card-title">{self.game_name}</h3>
                     <p class="card-text">{self.description}</p>
@@ -27,57 +55,73 @@ class GameCard:
             </div>
         </div>'''
 
-    def recalculate_rating(self, rating):
-        self.rating = (self.rating * self.ratings + rating)/(self.ratings+1)
-        self.ratings += 1
-
-game_of_life = GameCard(
-    'game_of_life',
-    "Conway's game of life",
-    "Basic game of life with back and white squares.",
-    4.6
-)
-platformer = GameCard(
-    'platformer',
-    "Star adventure",
-    "Collect 3 stars to complete the level, only some can finish the third!",
-    4.9
-)
-pong = GameCard(
-    'pong',
-    "Pong",
-    "Nostalgic game for 2 players.",
-    3.7)
-snake = GameCard(
-    'snake',
-    "Snake",
-    "Snake arcade: collect apples, and don`t bump into anything.",
-    4.2)
-tetris = GameCard(
-    'tetris',
-    "Tetris",
-    "Game, where you learn to pack your luggage.",
-    4.7
-)
-typing_test = GameCard(
-    'typing_test',
-    "Type speed testing",
-    "How fast can you actually type?",
-    3.5
-)
-
-games = [
-    game_of_life,
-    platformer,
-    pong,
-    snake,
-    tetris,
-    typing_test
-]
+    def update_rating(self, total, count):
+        # The manifest rating stays until the game has ratings of its own
+        if count:
+            self.rating = total / count
+        self.ratings = count
+
+catalog = Catalog(card_factory=GameCard)
+catalog.load()
+
+def apply_ratings(game_ids):
+    for game_id in game_ids:
+        card = catalog.get(game_id)
+        if card is not None:
+            card.update_rating(*rating_store.get(game_id))
+    fragments.invalidate()
+
+rating_store = RatingStore(app, on_change=apply_ratings)
+leaderboard = Leaderboard(app)
+with app.app_context():
+    db.create_all()
+    rating_store.refresh()
+    leaderboard.refresh()
+rating_store.start()
+leaderboard.start()
+
+def thumbnails_stamp():
+    # thumbnails.py rewrites hashes.json after every run
+    try:
+        st = os.stat(THUMBNAIL_HASHES)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+catalog_lock = threading.Lock()
+catalog_state = {"checked": time.monotonic(), "thumbnails": thumbnails_stamp()}
+
+def reload_catalog():
+    changed = catalog.load()
+    stamp = thumbnails_stamp()
+    if changed:
+        apply_ratings(changed)
+    elif stamp != catalog_state["thumbnails"]:
+        fragments.invalidate()
+    catalog_state["thumbnails"] = stamp
+    return changed
+
+@app.before_request
+def check_catalog():
+    # Only stats the manifests, and at most once per interval across all threads
+    now = time.monotonic()
+    if now - catalog_state["checked"] < CATALOG_CHECK_INTERVAL or not catalog_lock.acquire(blocking=False):
+        return
+    try:
+        catalog_state["checked"] = now
+        reload_catalog()
+    finally:
+        catalog_lock.release()
+
+def whole_number(value):
+    """int of a JSON integer or a form field's digits; floats and booleans are refused, not truncated"""
+    if isinstance(value, (bool, float)):
+        raise ValueError("not a whole number")
+    return int(value)
 
 def render_cards():
     rendered=''''''
-    for card in games:
+    for card in catalog:
         rendered += card.return_HTML() + '\n'
     return rendered
 
@@ -85,7 +129,11 @@ def render_cards():
 @app.route("/")
 @app.route("/games")
 def index():
-    return render_template("index.html", rendered_cards=render_cards())
+    page = fragments.render("index", lambda: render_template(
+        "index.html", rendered_cards=fragments.render("cards", render_cards).html))
+    response = make_response(page.html)
+    response.set_etag(page.etag)
+    return response.make_conditional(request)
 
 @app.route("/about")
 def about():
@@ -101,14 +149,71 @@ def register():
 
 @app.route("/games/<game_id>")
 def game(game_id):
-    for game in games:
-        if game.game_id == game_id:
-            return render_template("game.html",
-                                   game_name=game.game_id,
-                                   game_display_name=game.game_name,
-                                   rating=game.rating,
-                                   description=game.description)
-    return 'Game not found'
+    game = catalog.get(game_id)
+    if game is None:
+        return 'Game not found'
+    return render_template("game.html",
+                           game_name=game.game_id,
+                           game_display_name=game.game_name,
+                           game_build=game.build,
+                           rating=game.rating,
+                           description=game.description)
+
+@app.route("/games/<game_id>/rate", methods=["POST"])
+def rate(game_id):
+    if game_id not in catalog:
+        return {"error": "Game not found"}, 404
+    data = request.get_json(silent=True) or request.form
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object or form fields"}, 400
+    try:
+        rating = whole_number(data.get("rating"))
+    except (TypeError, ValueError):
+        rating = None
+    if rating is None or not MIN_RATING <= rating <= MAX_RATING:
+        return {"error": f"Rating must be a whole number from {MIN_RATING} to {MAX_RATING}"}, 400
+    try:
+        rating_store.submit(game_id, rating)
+    except StoreFull:
+        return {"error": "Too many ratings queued, try again later"}, 503
+    return {"status": "queued"}, 202
+
+@app.route("/games/<game_id>/scores", methods=["POST"])
+def submit_score(game_id):
+    if game_id not in catalog:
+        return {"error": "Game not found"}, 404
+    data = request.get_json(silent=True) or request.form
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object or form fields"}, 400
+    try:
+        score = whole_number(data.get("score"))
+    except (TypeError, ValueError):
+        return {"error": "Score must be a whole number"}, 400
+    try:
+        leaderboard.submit(game_id, str(data.get("player", "")), score)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except StoreFull:
+        return {"error": "Too many scores queued, try again later"}, 503
+    return {"status": "queued"}, 202
+
+@app.route("/games/<game_id>/leaderboard")
+def game_leaderboard(game_id):
+    if game_id not in catalog:
+        return {"error": "Game not found"}, 404
+    limit = max(1, min(request.args.get("limit", 10, type=int), 100))
+    return {"game_id": game_id, "scores": leaderboard.top(game_id, limit)}
+
+@app.route("/games/<game_id>/leaderboard/rank")
+def game_rank(game_id):
+    if game_id not in catalog:
+        return {"error": "Game not found"}, 404
+    score = request.args.get("score", type=int)
+    if score is None:
+        return {"error": "score is required"}, 400
+    rank, total = leaderboard.rank(game_id, score)
+    return {"game_id": game_id, "score": score, "rank": rank, "total": total}
+
 @app.errorhandler(HTTPException)
 def error(e):
     return f'Error code is: {e}'
@@ -0,0 +1,170 @@
+"""Load test for the portal routes.
+
+Every route is driven through the Flask test client (no network, shows
+the cost of the Python code alone) and through a threaded HTTP client
+against a local server. Results can be saved as a JSON baseline and
+compared with a later run:
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import platform
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+from app import app, catalog
+
+
+def default_routes():
+    routes = ["/", "/games", "/about"]
+    for card in catalog:
+        routes.append(f"/games/{card.game_id}")
+    # The bundle files the game iframe pulls for the first game
+    card = next(iter(catalog), None)
+    if card is not None:
+        build_dir = card.build.rsplit("/", 1)[0]
+        routes.append(f"/static/Games/{card.game_id}/{card.build}")
+        routes.append(f"/static/Games/{card.game_id}/{build_dir}/{card.game_id}.apk")
+    return routes
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def bench_test_client(route, requests, warmup):
+    client = app.test_client()
+    for _ in range(warmup):
+        client.get(route)
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = client.get(route)
+        response.close()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_http(base_url, route, requests, threads, warmup):
+    url = base_url + route
+
+    def fetch(_):
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fetch, range(warmup)))
+        start = time.perf_counter()
+        latencies = list(pool.map(fetch, range(requests)))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed)
+
+
+def start_local_server():
+    # Per-request access logging would dominate the timings
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run(routes, modes, requests, threads, warmup, url=None):
+    results = {}
+    server = None
+    if "http" in modes and url is None:
+        server, url = start_local_server()
+    try:
+        for route in routes:
+            if "test_client" in modes:
+                results[f"test_client {route}"] = bench_test_client(route, requests, warmup)
+            if "http" in modes:
+                results[f"http {route}"] = bench_http(url, route, requests, threads, warmup)
+    finally:
+        if server is not None:
+            server.shutdown()
+    return results
+
+
+def print_results(results):
+    print(f"{'route':<60} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<60} {r['throughput']:>10.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+def print_comparison(baseline, results):
+    """Show the change of each metric relative to the baseline run"""
+    print(f"{'route':<60} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, r in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<60} {'(new)':>9}")
+            continue
+        cells = []
+        for key in ("throughput", "p50_ms", "p95_ms", "p99_ms"):
+            change = (r[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{change:>+8.1f}%")
+        print(f"{name:<60} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent HTTP clients")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route")
+    parser.add_argument("--mode", choices=["test_client", "http", "both"], default="both")
+    parser.add_argument("--url", help="benchmark a running server instead of a local one")
+    parser.add_argument("--route", action="append", help="route to test (repeatable)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline to compare against")
+    args = parser.parse_args()
+
+    modes = ["test_client", "http"] if args.mode == "both" else [args.mode]
+    routes = args.route or default_routes()
+    results = run(routes, modes, args.requests, args.threads, args.warmup, args.url)
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        print_comparison(baseline["results"], results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "requests": args.requests,
+                "threads": args.threads,
+                "results": results,
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""Micro-benchmarks for the hot paths of the games.
+
+Each case times one function of a game's classes.py (a Life generation,
+a snake move, a tetris collision check, ...) under the dummy SDL video
+driver, at the size the game plays at and at scaled-up sizes: bigger
+boards, larger maps, longer texts. Results can be saved as a JSON
+baseline and compared with a later run, to see what an engine change
+did:
+
+    python benchmark_games.py --save games.json
+    python benchmark_games.py --compare games.json [game_id ...]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from catalog import Catalog
+from simulate import load_classes
+
+RUBBLE = (128, 128, 128)  # colour of the prefilled tetris cells
+
+
+def life_cases(classes, work_dir):
+    for engine, sizes in (("classic", (20, 100)), ("bitboard", (20, 100, 1000)), ("numpy", (20, 100, 1000)),
+                          ("hashlife", (20, 100)), ("active", (20, 100, 1000))):
+        if engine == "numpy" and classes.numpy is None:
+            continue
+        for size in sizes:
+            def field_run(size=size, engine=engine):
+                simulation = classes.Simulation(0, width=size, height=size, engine=engine)
+                simulation.reset(0)
+                return simulation.field.run
+
+            yield f"{classes.FIELDS[engine].__name__}.run {size}x{size}", field_run
+
+    # A big, nearly empty board: only the active engine's cost follows the activity
+    for engine in ("bitboard", "numpy", "active"):
+        if engine == "numpy" and classes.numpy is None:
+            continue
+
+        def gliders(engine=engine):
+            field = classes.FIELDS[engine](None, None, 1000, 1000)
+            for k in range(10):
+                for x, y in ((1, 0), (2, 1), (0, 2), (1, 2), (2, 2)):
+                    field.toggle(k * 90 + x, k * 90 + y)
+            return field.run
+
+        yield f"{classes.FIELDS[engine].__name__}.run 1000x1000 10 gliders", gliders
+
+    def jump():
+        field = None
+
+        def setup():
+            nonlocal field
+            # A fresh field each time, or the memoized futures make the jump free
+            field = classes.HashField(None, None)
+            field.load_cells([(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)])  # R-pentomino
+        return setup, lambda: field.jump(10)
+
+    yield "HashField.jump 2^10 R-pentomino", jump
+
+    for size in (20, 1000):
+        def field(size=size):
+            window = pygame.display.set_mode((340, 440))
+            simulation = classes.Simulation(0, window=window, width=size, height=size)
+            simulation.reset(0)
+            simulation.field.render_field()
+            simulation.field.changed = []
+            return simulation.field
+
+        def render_still(field=field):
+            return field().render_field
+
+        def render_generation(field=field):
+            field = field()
+
+            def setup():
+                field.changed = []
+                field.run()
+            return setup, field.render_field
+
+        yield f"Field.render_field {size}x{size} unchanged", render_still
+        yield f"Field.render_field {size}x{size} after run", render_generation
+
+
+def snake_cases(classes, work_dir):
+    for size in (20, 100, 250):
+        def move(size=size):
+            field = classes.Field(size, size, random.Random(0))
+            field.reset()
+            rng = random.Random(1)
+            directions = list(classes.DIRECTIONS.values())
+
+            def setup():
+                if not field.alive:
+                    field.reset()
+                if rng.random() < 0.2:
+                    field.change_direction(rng.choice(directions))
+            return setup, field.move
+
+        def spawn_apple(size=size):
+            field = classes.Field(size, size, random.Random(0))
+            field.reset()
+
+            def setup():
+                # Take the previous apple away again so the board doesn't fill up
+                field.set_tile(field.apple_pos[0], field.apple_pos[1], None)
+            return setup, field.spawn_apple
+
+        yield f"Field.move {size}x{size}", move
+        yield f"Field.spawn_apple {size}x{size}", spawn_apple
+
+
+def tetris_board(classes, width, height, rng, full_rows=0):
+    """A board with its lower half filled with rubble, one gap per row"""
+    board = classes.Board()
+    board.width = width
+    board.height = height
+    board.grid = [[None] * width for _ in range(height)]
+    for y in range(height // 2, height):
+        gap = rng.randrange(width) if y < height - full_rows else None
+        board.grid[y] = [None if x == gap else RUBBLE for x in range(width)]
+    return board
+
+
+def tetris_cases(classes, work_dir):
+    for width, height in ((10, 20), (40, 80), (100, 200)):
+        def is_valid_position(width=width, height=height):
+            rng = random.Random(0)
+            board = tetris_board(classes, width, height, rng)
+            pieces = []
+            for _ in range(256):
+                piece = classes.Tetromino(rng.choice(list(classes.TETROMINOES)))
+                piece.rotation_index = rng.randrange(len(piece.rotations))
+                piece.x = rng.randrange(-1, width - 1)
+                piece.y = rng.randrange(-1, height - 1)
+                pieces.append(piece)
+            pieces = itertools.cycle(pieces)
+            return lambda: board.is_valid_position(next(pieces))
+
+        def clear_lines(width=width, height=height):
+            board = tetris_board(classes, width, height, random.Random(0), full_rows=4)
+            template = board.grid
+
+            def setup():
+                board.grid = [row[:] for row in template]
+            return setup, board.clear_lines
+
+        yield f"Board.is_valid_position {width}x{height}", is_valid_position
+        yield f"Board.clear_lines {width}x{height}", clear_lines
+
+
+def scaled_map(path, times_x, times_y, work_dir):
+    """Write a copy of a map tiled times_x by times_y into work_dir"""
+    with open(path) as f:
+        lines = [line.rstrip("\n") for line in f]
+    width = max(len(line) for line in lines)
+    # Only the first copy keeps the player spawn
+    first = [line.ljust(width) for line in lines]
+    other = [line.replace("P", " ") for line in first]
+    rows = []
+    for ty in range(times_y):
+        for y in range(len(lines)):
+            rows.append("".join((first if tx == 0 and ty == 0 else other)[y] for tx in range(times_x)))
+    scaled = os.path.join(work_dir, f"{times_x}x{times_y}.map")
+    with open(scaled, "w") as f:
+        f.write("\n".join(rows) + "\n")
+    return scaled
+
+
+def platformer_cases(classes, work_dir):
+    level = os.path.join("maps", classes.scan_levels()[-1])
+    sizes = (("level", None), ("8x4 level", (8, 4)), ("32x8 level", (32, 8)))
+    for label, times in sizes:
+        def load_map(times=times):
+            path = level if times is None else scaled_map(level, *times, work_dir)
+            return lambda: classes.Map(path)
+
+        def move(times=times):
+            path = level if times is None else scaled_map(level, *times, work_dir)
+            level_map = classes.Map(path)
+            player = classes.Player(level_map.player_spawn_x, level_map.player_spawn_y)
+            rng = random.Random(0)
+            actions = itertools.cycle([tuple(rng.sample(classes.Simulation.ACTIONS, rng.randint(0, 2)))
+                                       for _ in range(256)])
+            return lambda: player.move(next(actions), level_map.tiles)
+
+        yield f"Map.load_map {label}", load_map
+        yield f"Player.move {label}", move
+
+
+def pong_cases(classes, work_dir):
+    def update():
+        simulation = classes.Simulation(0)
+        simulation.start_game()
+        ball = simulation.ball
+        args = (simulation.screen_width, simulation.game_height, simulation.ui_height,
+                simulation.paddle_left, simulation.paddle_right)
+
+        def step():
+            if ball.update(*args):
+                ball.reset(simulation.screen_width, simulation.game_height, simulation.ui_height)
+        return step
+
+    # The ball's cost doesn't depend on the field size, only the real one is timed
+    yield "Ball.update 800x600", update
+
+
+def typing_cases(classes, work_dir):
+    for repeat in (1, 10, 40):
+        def render_text(repeat=repeat):
+            game = classes.Game()
+            game.start_game()
+            game.text = classes.LOREM_IPSUM * repeat
+            game.typed_chars = len(game.text) // 2
+            return game.render_text
+
+        yield f"Game.render_text {len(classes.LOREM_IPSUM) * repeat} chars", render_text
+
+
+CASES = {
+    "game_of_life": life_cases,
+    "snake": snake_cases,
+    "tetris": tetris_cases,
+    "platformer": platformer_cases,
+    "pong": pong_cases,
+    "typing_test": typing_cases,
+}
+
+
+def run_calls(setup, func, number):
+    """Seconds spent in func over number calls, setup() not counted"""
+    if setup is None:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+    total = 0.0
+    for _ in range(number):
+        setup()
+        start = time.perf_counter()
+        func()
+        total += time.perf_counter() - start
+    return total
+
+
+def time_case(make, repeat, min_time):
+    case = make()
+    setup, func = case if isinstance(case, tuple) else (None, case)
+
+    # Grow the calls per sample until a sample takes min_time, the first calls warm up caches
+    number = 1
+    while run_calls(setup, func, number) < min_time and number < 1 << 20:
+        number *= 2
+    samples = sorted(run_calls(setup, func, number) / number for _ in range(repeat))
+    return {
+        "calls": number,
+        "median_us": samples[len(samples) // 2] * 1e6,
+        "min_us": samples[0] * 1e6,
+    }
+
+
+def run(games_dir, game_ids, repeat, min_time):
+    results = {}
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    for game_id in game_ids:
+        game_dir = os.path.join(games_dir, game_id)
+        os.chdir(game_dir)  # games load img/ and maps/ by relative path
+        try:
+            classes = load_classes(game_dir, game_id)
+            for name, make in CASES[game_id](classes, work_dir):
+                results[f"{game_id} {name}"] = time_case(make, repeat, min_time)
+        finally:
+            os.chdir(cwd)
+    shutil.rmtree(work_dir)
+    return results
+
+
+def print_results(results):
+    print(f"{'case':<56} {'median us':>12} {'min us':>12} {'calls':>9}")
+    for name, r in results.items():
+        print(f"{name:<56} {r['median_us']:>12.2f} {r['min_us']:>12.2f} {r['calls']:>9}")
+
+
+def print_comparison(baseline, results):
+    """Show the change of each time relative to the baseline run, negative is faster"""
+    print(f"{'case':<56} {'median':>9} {'min':>9}")
+    for name, r in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<56} {'(new)':>9}")
+            continue
+        cells = []
+        for key in ("median_us", "min_us"):
+            change = (r[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{change:>+8.1f}%")
+        print(f"{name:<56} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("games", nargs="*", help="only benchmark these game ids")
+    parser.add_argument("--repeat", type=int, default=7, help="timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.02, help="seconds per sample")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON baseline to compare against")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    catalog.load()
+    game_ids = [game_id for game_id in catalog.cards
+                if game_id in CASES and (not args.games or game_id in args.games)]
+
+    pygame.init()
+    results = run(catalog.games_dir, game_ids, args.repeat, args.min_time)
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        print_comparison(baseline["results"], results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "pygame": pygame.version.ver,
+                "results": results,
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
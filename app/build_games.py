@@ -0,0 +1,188 @@
+"""Rebuild the pygbag web builds of the games whose sources changed.
+
+A game's sources (main.py, classes.py, img/, maps/ and the shared engine
+package every game bundles) are fingerprinted and compared with the
+fingerprint stored in its build/sources.sha256. Stale games are copied
+to a staging folder and built with `pygbag --build`, several at a time,
+each in its own pygbag process. The fresh build/ then replaces the old
+one, the precompressed variants and manifest asset hashes are refreshed,
+and the build time and artifact sizes are added to build_history.json:
+
+    python build_games.py [--force] [--jobs N] [--dry-run] [game_id ...]
+
+Needs pygbag (pip install pygbag), which is not a runtime dependency.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import BASE_DIR, ENGINE_DIR, SOURCE_DIRS, SOURCE_FILES, Catalog, engine_paths, hash_sources, update_asset_hashes
+from static_delivery import precompress
+
+HISTORY_PATH = os.path.join(BASE_DIR, "build_history.json")
+FINGERPRINT_NAME = "sources.sha256"
+
+
+def fingerprint_path(game_dir):
+    return os.path.join(game_dir, "build", FINGERPRINT_NAME)
+
+
+def stored_fingerprint(game_dir):
+    try:
+        with open(fingerprint_path(game_dir)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def stale_games(catalog, only=None, force=False):
+    """Return {game_id: fingerprint} for the games that need a rebuild"""
+    stale = {}
+    for game_id in catalog.cards:
+        if only and game_id not in only:
+            continue
+        game_dir = os.path.join(catalog.games_dir, game_id)
+        fingerprint = hash_sources(game_dir)
+        if force or stored_fingerprint(game_dir) != fingerprint:
+            stale[game_id] = fingerprint
+    return stale
+
+
+def stage(game_dir, staging_root, game_id, engine_dir=ENGINE_DIR):
+    """Copy only the sources into a folder named after the game (pygbag names the .apk after it)"""
+    target = os.path.join(staging_root, game_id)
+    os.makedirs(target)
+    for name in SOURCE_FILES:
+        source = os.path.join(game_dir, name)
+        if os.path.isfile(source):
+            shutil.copy2(source, target)
+    for name in SOURCE_DIRS:
+        source = os.path.join(game_dir, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(target, name))
+    # Games import the shared engine as a sibling package; in the build it sits next to main.py
+    for path in engine_paths(engine_dir):
+        destination = os.path.join(target, "engine", os.path.relpath(path, engine_dir))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(path, destination)
+    return target
+
+
+def directory_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def build_game(games_dir, game_id, fingerprint):
+    """Build one game with pygbag and swap its build/ folder in"""
+    game_dir = os.path.join(games_dir, game_id)
+    with tempfile.TemporaryDirectory(prefix="pygbag-") as staging_root:
+        target = stage(game_dir, staging_root, game_id)
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "pygbag", "--build", target],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        seconds = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"pygbag failed for {game_id}:\n{result.stdout[-2000:]}")
+
+        new_build = os.path.join(target, "build")
+        with open(os.path.join(new_build, FINGERPRINT_NAME), "w") as f:
+            f.write(fingerprint + "\n")
+
+        old_build = os.path.join(game_dir, "build")
+        if os.path.isdir(old_build):
+            shutil.rmtree(old_build)
+        shutil.move(new_build, old_build)
+
+    apk_path = os.path.join(old_build, "web", f"{game_id}.apk")
+    return {
+        "game_id": game_id,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seconds": round(seconds, 2),
+        "apk_bytes": os.path.getsize(apk_path) if os.path.exists(apk_path) else None,
+        "build_bytes": directory_size(old_build),
+        "sources": fingerprint,
+    }
+
+
+def load_history():
+    try:
+        with open(HISTORY_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def previous_record(history, game_id):
+    for record in reversed(history):
+        if record["game_id"] == game_id:
+            return record
+    return None
+
+
+def print_record(record, previous):
+    change = ""
+    if previous and previous.get("apk_bytes") and record["apk_bytes"]:
+        delta = record["apk_bytes"] - previous["apk_bytes"]
+        change = f" ({delta:+,} bytes, {delta / previous['apk_bytes'] * 100:+.1f}%)"
+    print(f"{record['game_id']:<16} {record['seconds']:>7.1f}s  apk {record['apk_bytes'] or 0:>10,} bytes{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("games", nargs="*", help="only consider these game ids")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the sources are unchanged")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="builds to run at once")
+    parser.add_argument("--dry-run", action="store_true", help="only list the stale games")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    catalog.load()
+    stale = stale_games(catalog, set(args.games), args.force)
+    if not stale:
+        print("All builds are up to date")
+        return
+    if args.dry_run:
+        for game_id in stale:
+            print(f"{game_id} needs a rebuild")
+        return
+    if importlib.util.find_spec("pygbag") is None:
+        sys.exit("pygbag is not installed (pip install pygbag)")
+
+    history = load_history()
+    failed = []
+    # Each build is its own pygbag process, threads only wait on them
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {game_id: pool.submit(build_game, catalog.games_dir, game_id, fingerprint)
+                   for game_id, fingerprint in stale.items()}
+        for game_id, future in futures.items():
+            try:
+                record = future.result()
+            except Exception as e:
+                print(e)
+                failed.append(game_id)
+                continue
+            print_record(record, previous_record(history, game_id))
+            history.append(record)
+
+    with open(HISTORY_PATH, "w") as f:
+        json.dump(history, f, indent=4)
+    precompress(catalog.games_dir)
+    update_asset_hashes(catalog.games_dir)
+    if failed:
+        sys.exit(f"Failed to build: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import pickle
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAMES_DIR = os.path.join(BASE_DIR, "static", "Games")
+SNAPSHOT_PATH = os.path.join(BASE_DIR, "catalog.snapshot")
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_VERSION = 2
+
+
+def hash_file(path, chunk_size=1 << 16):
+    """Return the sha256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+SOURCE_FILES = ("main.py", "classes.py")
+SOURCE_DIRS = ("img", "maps")
+ENGINE_DIR = os.path.join(GAMES_DIR, "engine")  # shared package, bundled into every game
+
+
+def walk_files(top):
+    paths = []
+    for root, dirs, files in os.walk(top):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        paths.extend(os.path.join(root, f) for f in sorted(files))
+    return paths
+
+
+def source_paths(game_dir):
+    """Every file a game's build is made from"""
+    paths = [os.path.join(game_dir, name) for name in SOURCE_FILES]
+    for name in SOURCE_DIRS:
+        paths.extend(walk_files(os.path.join(game_dir, name)))
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def engine_paths(engine_dir=ENGINE_DIR):
+    return [path for path in walk_files(engine_dir) if path.endswith(".py")]
+
+
+def hash_sources(game_dir, salt="", engine_dir=ENGINE_DIR):
+    """Fingerprint of a game's sources and the engine: file names and contents, plus a salt"""
+    digest = hashlib.sha256(salt.encode())
+    for path in source_paths(game_dir):
+        digest.update(os.path.relpath(path, game_dir).replace(os.sep, "/").encode())
+        digest.update(bytes.fromhex(hash_file(path)))
+    for path in engine_paths(engine_dir):
+        digest.update(("engine/" + os.path.relpath(path, engine_dir).replace(os.sep, "/")).encode())
+        digest.update(bytes.fromhex(hash_file(path)))
+    return digest.hexdigest()
+
+
+class Catalog:
+    """Game registry built from the per-game manifest.json files.
+
+    Parsed manifests are kept in a pickled snapshot together with the
+    (mtime, size) of the file they came from, so a restart only re-reads
+    the manifests that changed since the snapshot was written.
+    """
+
+    def __init__(self, games_dir=GAMES_DIR, snapshot_path=SNAPSHOT_PATH, card_factory=None):
+        self.games_dir = games_dir
+        self.snapshot_path = snapshot_path
+        self.card_factory = card_factory
+        self.entries = {}  # game_id -> (stamp, manifest dict)
+        self.cards = {}  # game_id -> card, ordered by game_id
+
+    def __iter__(self):
+        return iter(self.cards.values())
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __contains__(self, game_id):
+        return game_id in self.cards
+
+    def get(self, game_id):
+        return self.cards.get(game_id)
+
+    def manifest(self, game_id):
+        entry = self.entries.get(game_id)
+        return entry[1] if entry else None
+
+    def manifest_path(self, game_id):
+        return os.path.join(self.games_dir, game_id, MANIFEST_NAME)
+
+    def load(self):
+        """Load the catalog, re-parsing only the manifests that changed.
+
+        Returns the list of game ids that were (re)parsed or removed.
+        """
+        if not self.entries:
+            self.entries = self.read_snapshot()
+
+        changed = []
+        found = {}
+        for game_id in sorted(os.listdir(self.games_dir)):
+            path = self.manifest_path(game_id)
+            try:
+                st = os.stat(path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            entry = self.entries.get(game_id)
+            if entry is None or entry[0] != stamp:
+                entry = (stamp, self.parse_manifest(game_id, path))
+                changed.append(game_id)
+            found[game_id] = entry
+
+        removed = set(self.entries) - set(found)
+        self.entries = found
+        if changed or removed or not self.cards:
+            self.build_cards(changed)
+        if changed or removed:
+            self.write_snapshot()
+        return changed + sorted(removed)
+
+    def parse_manifest(self, game_id, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {
+            "id": game_id,
+            "name": data["name"],
+            "description": data.get("description", ""),
+            "rating": float(data.get("rating", 0.0)),
+            "build": data.get("build", "build/web/index.html"),
+            "assets": data.get("assets", {}),
+            "thumbnail": data.get("thumbnail", {}),
+        }
+
+    def build_cards(self, changed=()):
+        cards = {}
+        for game_id, (stamp, data) in self.entries.items():
+            card = self.cards.get(game_id)
+            if card is None or game_id in changed:
+                card = self.make_card(data)
+            cards[game_id] = card
+        self.cards = cards
+
+    def make_card(self, data):
+        if self.card_factory is None:
+            return data
+        card = self.card_factory(data["id"], data["name"], data["description"], data["rating"])
+        card.build = data["build"]
+        return card
+
+    def read_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {}
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("games_dir") != self.games_dir:
+            return {}
+        return snapshot["entries"]
+
+    def write_snapshot(self):
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "games_dir": self.games_dir,
+            "entries": self.entries,
+        }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            # A read-only deploy still works, it just parses manifests on boot
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def update_asset_hashes(games_dir=GAMES_DIR):
+    """Rewrite the "assets" section of every manifest from its build folder"""
+    updated = []
+    for game_id in sorted(os.listdir(games_dir)):
+        path = os.path.join(games_dir, game_id, MANIFEST_NAME)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        build_root = os.path.join(games_dir, game_id, os.path.dirname(os.path.dirname(data.get("build", "build/web/index.html"))))
+        assets = {}
+        for root, dirs, files in os.walk(build_root):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith((".gz", ".br")):
+                    continue  # precompressed variants of the files listed here
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, os.path.join(games_dir, game_id)).replace(os.sep, "/")
+                assets[rel] = hash_file(full)
+
+        if data.get("assets") != assets:
+            data["assets"] = assets
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+                f.write("\n")
+            updated.append(game_id)
+    return updated
+
+
+if __name__ == "__main__":
+    for game_id in update_asset_hashes():
+        print(f"Updated asset hashes for {game_id}")
@@ -0,0 +1,47 @@
+import hashlib
+import threading
+
+
+class Fragment:
+    def __init__(self, html, version):
+        self.html = html
+        self.version = version
+        self.etag = hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+
+
+class FragmentCache:
+    """Rendered HTML fragments kept until something they depend on changes.
+
+    Every invalidation bumps the cache version, so a fragment rendered
+    while an invalidation was in flight is never stored as current.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.fragments = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        return self.fragments.get(name)
+
+    def render(self, name, render_func):
+        fragment = self.fragments.get(name)
+        if fragment is not None:
+            return fragment
+
+        version = self.version
+        fragment = Fragment(render_func(), version)
+        with self.lock:
+            if version == self.version:
+                self.fragments[name] = fragment
+        return fragment
+
+    def invalidate(self, *names):
+        """Drop the named fragments, or every fragment if no name is given"""
+        with self.lock:
+            self.version += 1
+            if names:
+                for name in names:
+                    self.fragments.pop(name, None)
+            else:
+                self.fragments.clear()
@@ -0,0 +1,97 @@
+import bisect
+import time
+
+from models import db, Score
+from write_behind import WriteBehindStore
+
+TOP_CACHE_SIZE = 100  # entries kept per game for top-N queries
+MAX_PLAYER_LENGTH = 20
+MAX_SCORE = (1 << 63) - 1  # largest integer SQLite stores
+
+
+class GameBoard:
+    """Cached leaderboard of one game"""
+
+    def __init__(self):
+        self.scores = []  # every score stored for the game, ascending
+        self.top = []  # (-score, created_at, id, player), best first
+
+    def add(self, rows):
+        # Build the new lists before swapping them in, so readers never see a half-merged one
+        scores = self.scores + [score for row_id, player, score, created_at in rows]
+        scores.sort()  # already sorted runs, so this is a linear merge
+        top = sorted(self.top + [(-score, created_at, row_id, player) for row_id, player, score, created_at in rows])
+        self.scores = scores
+        self.top = top[:TOP_CACHE_SIZE]
+
+    def rank(self, score):
+        scores = self.scores  # one snapshot for both numbers
+        # Ties share the best rank
+        return len(scores) - bisect.bisect_right(scores, score) + 1, len(scores)
+
+
+class Leaderboard(WriteBehindStore):
+    """Per-game high score tables.
+
+    Submitted scores are queued and bulk-inserted in one transaction per
+    flush. Reads are served from an in-memory cache that each flush
+    extends with the rows added since the last one (from any worker), so
+    a burst of submissions costs the readers nothing. Ranks come from a
+    sorted list of every score of the game, kept up to date the same way.
+    """
+
+    name = "leaderboard"
+
+    def __init__(self, app, **kwargs):
+        super().__init__(app, **kwargs)
+        self.boards = {}  # game_id -> GameBoard
+        self.last_id = 0
+
+    def submit(self, game_id, player, score):
+        player = player.strip()
+        if not player or len(player) > MAX_PLAYER_LENGTH:
+            raise ValueError(f"Player name must be 1 to {MAX_PLAYER_LENGTH} characters")
+        if not 0 <= score <= MAX_SCORE:
+            raise ValueError(f"Score must be between 0 and {MAX_SCORE}")
+        self.enqueue({"game_id": game_id, "player": player, "score": int(score), "created_at": time.time()})
+
+    def top(self, game_id, limit=10):
+        board = self.boards.get(game_id)
+        if board is None:
+            return []
+        return [{"player": player, "score": -neg_score} for neg_score, created_at, row_id, player in board.top[:limit]]
+
+    def rank(self, game_id, score):
+        """Return (rank, number of scores) for a score in a game"""
+        board = self.boards.get(game_id)
+        if board is None:
+            return 1, 0
+        return board.rank(score)
+
+    def write_batch(self, batch):
+        try:
+            db.session.execute(db.insert(Score), batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def refresh(self):
+        """Add rows inserted since the last refresh to the cache"""
+        rows = db.session.execute(
+            db.select(Score.id, Score.game_id, Score.player, Score.score, Score.created_at)
+            .where(Score.id > self.last_id)
+            .order_by(Score.id)
+        ).all()
+        if not rows:
+            return
+
+        by_game = {}
+        for row_id, game_id, player, score, created_at in rows:
+            by_game.setdefault(game_id, []).append((row_id, player, score, created_at))
+        for game_id, game_rows in by_game.items():
+            board = self.boards.get(game_id)
+            if board is None:
+                board = self.boards[game_id] = GameBoard()
+            board.add(game_rows)
+        self.last_id = rows[-1][0]
@@ -0,0 +1,247 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+DUMP_INTERVAL = 1.0  # seconds between writes of this process's snapshot
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.latency_sum = 0.0
+        self.size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.in_flight = 0
+
+    def observe(self, seconds, size):
+        self.latency[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.size[bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+        self.size_sum += size
+
+    def to_dict(self):
+        return {
+            "latency": self.latency,
+            "latency_sum": self.latency_sum,
+            "size": self.size,
+            "size_sum": self.size_sum,
+            "in_flight": self.in_flight,
+        }
+
+
+def merge(total, stats):
+    """Add one endpoint's stats dict into another"""
+    for key in ("latency", "size"):
+        total[key] = [a + b for a, b in zip(total[key], stats[key])]
+    for key in ("latency_sum", "size_sum", "in_flight"):
+        total[key] += stats[key]
+
+
+class Metrics:
+    """Per-endpoint request latency, response size and in-flight counts.
+
+    Each thread records into its own shard, so the request path never
+    takes a lock; shards are only summed when /metrics is scraped. The
+    shards of finished threads are folded into one retired total, so a
+    server that starts a thread per request doesn't pile them up. When
+    METRICS_DIR is set, every worker process also dumps its totals there
+    and the scrape adds up the files of all workers; the scraping worker
+    takes over the counters of exited workers and deletes their files.
+    """
+
+    def __init__(self, app=None):
+        self.local = threading.local()
+        self.shards = {}  # thread -> {endpoint: EndpointStats}
+        self.retired = {}  # endpoint -> stats dict of finished threads and exited workers
+        self.shards_lock = threading.Lock()
+        self.metrics_dir = None
+        self.last_dump = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.metrics_dir = app.config.get("METRICS_DIR")
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.export)
+
+    def shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = {}
+            with self.shards_lock:
+                self.retire_shards()
+                self.shards[threading.current_thread()] = shard
+        return shard
+
+    def retire(self, snapshot):
+        """Add a {endpoint: stats dict} snapshot to the retired totals (shards_lock held)"""
+        for endpoint, stats in snapshot.items():
+            if endpoint in self.retired:
+                merge(self.retired[endpoint], stats)
+            else:
+                self.retired[endpoint] = stats
+
+    def retire_shards(self):
+        """Fold the shards of finished threads into the retired totals (shards_lock held)"""
+        for thread in [thread for thread in self.shards if not thread.is_alive()]:
+            shard = self.shards.pop(thread)
+            self.retire({endpoint: stats.to_dict() for endpoint, stats in shard.items()})
+
+    def stats(self, endpoint):
+        shard = self.shard()
+        stats = shard.get(endpoint)
+        if stats is None:
+            stats = shard[endpoint] = EndpointStats()
+        return stats
+
+    def before_request(self):
+        g.metrics_endpoint = request.endpoint or "unmatched"
+        g.metrics_start = time.perf_counter()
+        self.stats(g.metrics_endpoint).in_flight += 1
+
+    def after_request(self, response):
+        elapsed = time.perf_counter() - g.metrics_start
+        # Content-Length is set for send_file responses too, whose body isn't read here
+        size = response.content_length or 0
+        self.stats(g.metrics_endpoint).observe(elapsed, size)
+        return response
+
+    def teardown_request(self, exc):
+        endpoint = g.pop("metrics_endpoint", None)
+        if endpoint is None:
+            return
+        self.stats(endpoint).in_flight -= 1
+        if self.metrics_dir and time.monotonic() - self.last_dump >= DUMP_INTERVAL:
+            self.last_dump = time.monotonic()
+            self.dump()
+
+    def snapshot(self):
+        """Sum the shards of this process into {endpoint: stats dict}"""
+        with self.shards_lock:
+            self.retire_shards()
+            totals = {endpoint: dict(stats) for endpoint, stats in self.retired.items()}
+            shards = list(self.shards.values())
+        for shard in shards:
+            for endpoint, stats in list(shard.items()):
+                if endpoint in totals:
+                    merge(totals[endpoint], stats.to_dict())
+                else:
+                    totals[endpoint] = stats.to_dict()
+        return totals
+
+    def dump(self):
+        path = os.path.join(self.metrics_dir, f"metrics-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Totals for every worker, or for this process without METRICS_DIR"""
+        if not self.metrics_dir:
+            return self.snapshot()
+
+        self.retire_workers()
+        self.dump()
+        totals = {}
+        for name in os.listdir(self.metrics_dir):
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            pid = int(name[len("metrics-"):-len(".json")])
+            try:
+                with open(os.path.join(self.metrics_dir, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = pid_alive(pid)
+            for endpoint, stats in snapshot.items():
+                if not alive:
+                    # Counters of an exited worker still count, its in-flight requests do not
+                    stats["in_flight"] = 0
+                if endpoint in totals:
+                    merge(totals[endpoint], stats)
+                else:
+                    totals[endpoint] = stats
+        return totals
+
+    def retire_workers(self):
+        """Take the counters of exited workers into this process and delete their files"""
+        for name in os.listdir(self.metrics_dir):
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            pid = int(name[len("metrics-"):-len(".json")])
+            if pid_alive(pid):
+                continue
+            path = os.path.join(self.metrics_dir, name)
+            claimed = f"{path}.{os.getpid()}.retiring"
+            try:
+                os.rename(path, claimed)  # only one worker wins the rename
+            except OSError:
+                continue
+            try:
+                with open(claimed) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                snapshot = {}
+            finally:
+                os.remove(claimed)
+            for stats in snapshot.values():
+                stats["in_flight"] = 0
+            with self.shards_lock:
+                self.retire(snapshot)
+
+    def export(self):
+        lines = []
+        totals = sorted(self.collect().items())
+
+        lines.append("# HELP portal_request_duration_seconds Request latency by endpoint.")
+        lines.append("# TYPE portal_request_duration_seconds histogram")
+        for endpoint, stats in totals:
+            lines.extend(histogram_lines("portal_request_duration_seconds", endpoint, LATENCY_BUCKETS,
+                                         stats["latency"], stats["latency_sum"]))
+
+        lines.append("# HELP portal_response_size_bytes Response body size by endpoint.")
+        lines.append("# TYPE portal_response_size_bytes histogram")
+        for endpoint, stats in totals:
+            lines.extend(histogram_lines("portal_response_size_bytes", endpoint, SIZE_BUCKETS,
+                                         stats["size"], stats["size_sum"]))
+
+        lines.append("# HELP portal_requests_in_flight Requests currently being handled.")
+        lines.append("# TYPE portal_requests_in_flight gauge")
+        for endpoint, stats in totals:
+            lines.append(f'portal_requests_in_flight{{endpoint="{endpoint}"}} {stats["in_flight"]}')
+
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def histogram_lines(name, endpoint, bounds, counts, total):
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        yield f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+    cumulative += counts[-1]
+    yield f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {cumulative}'
+    yield f'{name}_sum{{endpoint="{endpoint}"}} {total}'
+    yield f'{name}_count{{endpoint="{endpoint}"}} {cumulative}'
+
+
+def pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
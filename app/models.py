@@ -0,0 +1,21 @@
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+
+class RatingAggregate(db.Model):
+    game_id = db.Column(db.String(64), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Score(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.String(64), nullable=False)
+    player = db.Column(db.String(20), nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_score_game_score", "game_id", "score"),
+    )
@@ -0,0 +1,69 @@
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, RatingAggregate
+from write_behind import WriteBehindStore
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+
+class RatingStore(WriteBehindStore):
+    """Write-behind store for game ratings.
+
+    Each flush folds the buffered ratings into per-game (sum, count)
+    deltas, upserts them in one transaction and reloads the cached
+    aggregates that page renders read from. Other worker processes pick
+    up each other's ratings on their next flush.
+    """
+
+    name = "rating"
+
+    def __init__(self, app, on_change=None, **kwargs):
+        super().__init__(app, **kwargs)
+        self.on_change = on_change
+        self.aggregates = {}  # game_id -> (total, count)
+
+    def submit(self, game_id, rating):
+        if not MIN_RATING <= rating <= MAX_RATING:
+            raise ValueError(f"Rating must be between {MIN_RATING} and {MAX_RATING}")
+        self.enqueue((game_id, float(rating)))
+
+    def get(self, game_id):
+        """Return the cached (total, count) for a game"""
+        return self.aggregates.get(game_id, (0.0, 0))
+
+    def write_batch(self, batch):
+        deltas = {}
+        for game_id, rating in batch:
+            total, count = deltas.get(game_id, (0.0, 0))
+            deltas[game_id] = (total + rating, count + 1)
+
+        stmt = insert(RatingAggregate).values([
+            {"game_id": game_id, "total": total, "count": count}
+            for game_id, (total, count) in deltas.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RatingAggregate.game_id],
+            set_={
+                "total": RatingAggregate.total + stmt.excluded.total,
+                "count": RatingAggregate.count + stmt.excluded.count,
+            },
+        )
+        try:
+            db.session.execute(stmt)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def refresh(self):
+        """Reload every aggregate from the database"""
+        rows = db.session.execute(
+            db.select(RatingAggregate.game_id, RatingAggregate.total, RatingAggregate.count)
+        ).all()
+        aggregates = {game_id: (total, count) for game_id, total, count in rows}
+        changed = [game_id for game_id, value in aggregates.items() if self.aggregates.get(game_id) != value]
+        self.aggregates = aggregates
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+        return changed
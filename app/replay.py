@@ -0,0 +1,94 @@
+"""Play back recorded rounds headlessly and check their scores.
+
+Games record every round they play (seed, level and the inputs of each
+tick, see Games/engine/replay.py) and save it with F5. This reruns a
+replay on the game's Simulation as fast as it goes and prints the score
+it reaches. --score checks a submitted score against it (the exit status
+is 1 on a mismatch); --repeat turns a replay into a workload for timing
+the game's rules:
+
+    python replay.py GAME_ID FILE [--score S] [--repeat N]
+
+FILE may also hold the base64 text the browser build prints.
+"""
+import argparse
+import base64
+import binascii
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from catalog import Catalog
+from simulate import load_classes
+
+
+def read_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(b"RPLY"):
+        return data
+    try:
+        return base64.b64decode(data.strip(), validate=True)
+    except binascii.Error:
+        raise ValueError(f"{path} is neither a replay nor base64 text")
+
+
+def format_score(score):
+    """Pong's score is a pair, the other games' a number"""
+    if isinstance(score, tuple):
+        return ",".join(str(part) for part in score)
+    return str(score)
+
+
+def play(game_dir, game_id, data, repeat=1):
+    """Rerun a replay, return (final score, ticks, seconds for all repeats)"""
+    cwd = os.getcwd()
+    os.chdir(game_dir)  # games load img/ and maps/ by relative path
+    try:
+        classes = load_classes(game_dir, game_id)
+        # classes.py put the engine on sys.path
+        from engine.replay import Replay
+        replay = Replay.from_bytes(data)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            simulation = replay.play(classes.Simulation())
+        seconds = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    return simulation.score, replay.ticks, seconds
+
+
+def verify(game_dir, game_id, data, score):
+    """True if the replay reaches the submitted score"""
+    return format_score(play(game_dir, game_id, data)[0]) == format_score(score)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("game_id")
+    parser.add_argument("path", help="replay file")
+    parser.add_argument("--score", help="score the replay should reach")
+    parser.add_argument("--repeat", type=int, default=1, help="times to play the replay")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    catalog.load()
+    if args.game_id not in catalog.cards:
+        sys.exit(f"Unknown game {args.game_id}")
+    try:
+        data = read_replay(args.path)
+        score, ticks, seconds = play(os.path.join(catalog.games_dir, args.game_id), args.game_id, data, args.repeat)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    rate = ticks * args.repeat / seconds if seconds else 0.0
+    print(f"{ticks} ticks ({len(data)} bytes), score {format_score(score)}, {rate:,.0f} ticks/s")
+    if args.score is not None and format_score(score) != args.score:
+        print(f"Submitted score {args.score} doesn't match the replay")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
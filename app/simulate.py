@@ -0,0 +1,94 @@
+"""Run the games' headless simulations as fast as they go.
+
+Every game exposes a Simulation (its rules without a display) whose
+step(inputs) advances one fixed tick. This drives each one with a bot
+that holds random actions for a few ticks at a time, restarting when a
+round ends, and reports the ticks per second and the best score seen:
+
+    python simulate.py [--ticks N] [--seed S] [game_id ...]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from catalog import Catalog
+
+
+def load_classes(game_dir, game_id):
+    """Import a game's classes.py under its own module name"""
+    spec = importlib.util.spec_from_file_location(f"{game_id}_classes", os.path.join(game_dir, "classes.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_simulation(game_dir, game_id):
+    return load_classes(game_dir, game_id).Simulation
+
+
+class RandomBot:
+    """Holds a random set of actions for a random number of ticks"""
+
+    def __init__(self, actions, rng, max_hold=20):
+        self.actions = actions
+        self.rng = rng
+        self.max_hold = max_hold
+        self.held = ()
+        self.remaining = 0
+
+    def inputs(self):
+        if self.remaining <= 0:
+            count = self.rng.randint(0, min(2, len(self.actions)))
+            self.held = tuple(self.rng.sample(self.actions, count))
+            self.remaining = self.rng.randint(1, self.max_hold)
+        self.remaining -= 1
+        return self.held
+
+
+def simulate(game_dir, game_id, ticks, seed):
+    cwd = os.getcwd()
+    os.chdir(game_dir)  # games load img/ and maps/ by relative path
+    try:
+        simulation = load_simulation(game_dir, game_id)(seed)
+        simulation.reset(seed)
+        bot = RandomBot(list(simulation.ACTIONS), random.Random(seed))
+        rounds = 1
+        best = simulation.score
+        start = time.perf_counter()
+        for _ in range(ticks):
+            simulation.step(bot.inputs())
+            if simulation.done:
+                best = max(best, simulation.score)
+                simulation.reset()
+                rounds += 1
+        best = max(best, simulation.score)
+        seconds = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    return {"game_id": game_id, "ticks": ticks, "rounds": rounds, "seconds": seconds, "best": best}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("games", nargs="*", help="only simulate these game ids")
+    parser.add_argument("--ticks", type=int, default=100000, help="ticks to simulate per game")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    catalog.load()
+    print(f"{'game':<16} {'ticks/s':>12} {'rounds':>8}  best score")
+    for game_id in catalog.cards:
+        if args.games and game_id not in args.games:
+            continue
+        result = simulate(os.path.join(catalog.games_dir, game_id), game_id, args.ticks, args.seed)
+        rate = result["ticks"] / result["seconds"] if result["seconds"] else 0.0
+        print(f"{game_id:<16} {rate:>12,.0f} {result['rounds']:>8}  {result['best']}")
+
+
+if __name__ == "__main__":
+    main()
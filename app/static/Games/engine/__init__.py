@@ -0,0 +1,2 @@
+# Code shared by every game. Games import it by adding the Games folder to
+# sys.path; build_games.py copies this package into each pygbag build.
@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import pygame
+
+
+class AssetManager:
+    """Images loaded once per path and shared by every object using them.
+
+    Surfaces are converted to the display's pixel format (convert_alpha()
+    for images with per-pixel alpha, convert() otherwise) so blits don't
+    convert on every frame. Images loaded before the display mode is set
+    are converted on their next use. The shared surfaces must not be
+    drawn on; copy() one first.
+    """
+
+    def __init__(self):
+        self.images = {}  # absolute path -> Surface
+        self.unconverted = set()
+
+    def key(self, path):
+        return os.path.abspath(path)
+
+    def image(self, path):
+        key = self.key(path)
+        surface = self.images.get(key)
+        if surface is None:
+            surface = self.images[key] = pygame.image.load(key)
+            self.unconverted.add(key)
+        if key in self.unconverted and pygame.display.get_surface() is not None:
+            surface = self.images[key] = self.convert(surface)
+            self.unconverted.discard(key)
+        return surface
+
+    def convert(self, surface):
+        if surface.get_flags() & pygame.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    async def preload(self, paths, per_frame=4):
+        """Load images a few at a time, yielding to the game loop in between.
+
+        Meant to run as a task while a menu is shown, e.g.
+        asyncio.create_task(assets.preload(image_paths("img"))).
+        """
+        for i, path in enumerate(paths):
+            self.image(path)
+            if (i + 1) % per_frame == 0:
+                await asyncio.sleep(0)
+
+    def memory_usage(self):
+        """Bytes of pixel data held per image"""
+        return {key: surface.get_pitch() * surface.get_height() for key, surface in self.images.items()}
+
+    def total_bytes(self):
+        return sum(self.memory_usage().values())
+
+
+assets = AssetManager()
+
+
+def load_image(path):
+    return assets.image(path)
+
+
+def image_paths(directory):
+    """Every image in a directory, for preloading"""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))]
@@ -0,0 +1,102 @@
+import pygame
+
+FULL_UPDATE_THRESHOLD = 0.5  # fraction of the screen above which one full update is cheaper
+
+
+class DirtyRects:
+    """Screen regions that changed since the last display update.
+
+    Games still draw their frames as before, but report which parts of
+    the screen changed; flush() then pushes only those regions to the
+    display (in pygbag, to the canvas) instead of the whole screen. When
+    the changed area exceeds full_threshold of the screen, or the game
+    asked for it with invalidate(), the whole screen is updated instead.
+
+    A game opts in by setting game.dirty to an instance; FixedStepLoop
+    then calls flush() in place of pygame.display.update().
+    """
+
+    def __init__(self, full_threshold=FULL_UPDATE_THRESHOLD):
+        self.full_threshold = full_threshold
+        self.rects = []
+        self.full = True  # the first frame always goes out whole
+        self.tracked = {}  # key -> (rect, state) drawn last frame
+        self.watched = {}  # key -> value drawn last frame
+        self.full_updates = 0
+        self.partial_updates = 0
+
+    def mark(self, rect):
+        """Report a changed region"""
+        if rect is None:
+            self.full = True
+        elif not self.full:
+            self.rects.append(pygame.Rect(rect))
+
+    def invalidate(self):
+        """Update the whole screen this frame"""
+        self.full = True
+
+    def track(self, key, rect, state=None):
+        """Report where a moving object is drawn this frame.
+
+        When its rect (or its state, e.g. a rotation) differs from the
+        previous frame, both the old and the new position are marked.
+        Passing rect=None clears an object that is no longer drawn.
+        """
+        previous = self.tracked.get(key)
+        if previous == (rect, state):
+            return
+        if previous is not None:
+            self.mark(previous[0])
+        if rect is None:
+            self.tracked.pop(key, None)
+            return
+        rect = pygame.Rect(rect)
+        self.mark(rect)
+        self.tracked[key] = (rect, state)
+
+    def watch(self, key, value, rect=None):
+        """Mark rect (the whole screen if None) when value changed since the last frame"""
+        if key in self.watched and self.watched[key] == value:
+            return
+        self.watched[key] = value
+        if rect is None:
+            self.invalidate()
+        else:
+            self.mark(rect)
+
+    def reset(self):
+        """Forget tracked and watched objects, e.g. when the screen was resized"""
+        self.tracked.clear()
+        self.watched.clear()
+        self.invalidate()
+
+    def flush(self):
+        """Push the changed regions to the display and start a new frame"""
+        surface = pygame.display.get_surface()
+        screen = surface.get_rect()
+        rects = merge_rects([rect.clip(screen) for rect in self.rects]) if not self.full else []
+        changed = sum(rect.width * rect.height for rect in rects)
+        if self.full or changed > self.full_threshold * screen.width * screen.height:
+            pygame.display.update()
+            self.full_updates += 1
+        else:
+            # Called even with no rects, so hooks on display.update still see every frame
+            pygame.display.update(rects)
+            self.partial_updates += 1
+        self.rects = []
+        self.full = False
+
+
+def merge_rects(rects):
+    """Union overlapping rects so no pixel is copied twice"""
+    merged = []
+    for rect in rects:
+        if not rect.width or not rect.height:
+            continue
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -0,0 +1,123 @@
+import asyncio
+from time import perf_counter_ns
+
+import pygame
+
+from engine.profiler import FrameProfiler
+
+IDLE_HEARTBEAT = 0.25  # seconds between redraws of an idle game that gets no input
+REPLAY_KEY = pygame.K_F5
+
+
+class FixedStepLoop:
+    """Fixed-timestep game loop shared by the games.
+
+    Every game.update() advances the simulation by exactly one step of
+    1/step_rate seconds, however long frames take, so game speed doesn't
+    depend on the frame rate a browser tab manages. When a tab falls
+    behind, at most max_steps updates run per frame and the rest of the
+    backlog is dropped, so the game slows down instead of freezing.
+    Games whose rules must keep up with real time (a timer that scores)
+    pass max_steps=None to always run the whole backlog.
+    game.render(alpha) gets the fraction of a step elapsed since the last
+    update, for drawing moving objects between their previous and current
+    positions. Games with a dirty attribute (a DirtyRects) only get the
+    regions they reported pushed to the display. Every frame is timed
+    by a FrameProfiler (F3 shows it, F4 exports it); F5 saves the replay
+    of the current or last round.
+
+    While game.idle is true (menus, pauses, game over: nothing moves),
+    the loop draws one frame and then sleeps until input arrives, running
+    no updates and redrawing only on events or every idle_heartbeat
+    seconds. Input that ends idle gets its update() in the same frame,
+    then the fixed-step loop resumes.
+    """
+
+    idle_heartbeat = IDLE_HEARTBEAT
+
+    def __init__(self, step_rate, render_fps=60, max_steps=5):
+        self.step_rate = step_rate
+        self.dt = 1.0 / step_rate
+        self.render_fps = render_fps
+        self.max_steps = max_steps
+        self.clock = pygame.time.Clock()
+        self.running = False
+        self.steps = 0  # updates run so far
+        self.skipped = 0  # updates dropped by the max_steps cap
+        self.profiler = FrameProfiler()
+
+    def stop(self):
+        self.running = False
+
+    async def run(self, game):
+        self.running = True
+        accumulator = 0.0
+        profiler = self.profiler
+        idle = False
+        self.clock.tick()
+        frame_start = perf_counter_ns()
+
+        while self.running:
+            events = []
+            if idle:
+                events = await self.wait_for_input()
+                self.clock.tick(self.render_fps)  # time spent idle isn't simulated
+            else:
+                # tick() returns the milliseconds since the previous frame
+                accumulator += self.clock.tick(self.render_fps) / 1000.0
+                await asyncio.sleep(0)  # Yield control to event loop for pygbag
+
+            t0 = perf_counter_ns()
+            interval = t0 - frame_start
+            frame_start = t0
+            dirty = getattr(game, "dirty", None)
+            for event in events + pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+                    pygame.quit()
+                    return
+                if event.type == pygame.KEYDOWN and event.key == REPLAY_KEY and getattr(game, "replay", None):
+                    game.replay.save()
+                elif not profiler.handle_event(event, dirty):
+                    game.handle_event(event)
+
+            if idle and not getattr(game, "idle", False):
+                # Woken by input: apply it now rather than a whole step later
+                accumulator = max(accumulator, self.dt)
+
+            t1 = perf_counter_ns()
+            steps = 0
+            while accumulator >= self.dt and (self.max_steps is None or steps < self.max_steps):
+                game.update()
+                accumulator -= self.dt
+                steps += 1
+            if accumulator >= self.dt:
+                self.skipped += int(accumulator / self.dt)
+                accumulator %= self.dt
+            self.steps += steps
+
+            t2 = perf_counter_ns()
+            game.render(accumulator / self.dt)
+            t3 = perf_counter_ns()
+            profiler.draw(pygame.display.get_surface(), t3, dirty)
+            if dirty is not None:
+                dirty.flush()
+            else:
+                pygame.display.update()
+            t4 = perf_counter_ns()
+            profiler.record(interval, t1 - t0, t2 - t1, t3 - t2, t4 - t3, steps)
+            idle = getattr(game, "idle", False)
+
+    async def wait_for_input(self):
+        """Sleep until events arrive, or for one heartbeat, and return them"""
+        # Polling with get(), event.peek() loses the attributes of posted events
+        deadline = perf_counter_ns() + int(self.idle_heartbeat * 1e9)
+        events = pygame.event.get()
+        while not events and perf_counter_ns() < deadline:
+            await asyncio.sleep(1.0 / self.render_fps)
+            events = pygame.event.get()
+        return events
+
+
+def lerp(previous, current, alpha):
+    return previous + (current - previous) * alpha
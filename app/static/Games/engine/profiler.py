@@ -0,0 +1,143 @@
+import csv
+import io
+import sys
+
+import pygame
+
+from engine.text import get_font, text_cache
+
+PHASES = ("events", "update", "render", "display")
+COLUMNS = ("interval",) + PHASES + ("frame", "steps")
+PROFILE_FRAMES = 600  # frames kept, 10 seconds at 60 fps
+OVERLAY_KEY = pygame.K_F3
+EXPORT_KEY = pygame.K_F4
+OVERLAY_REFRESH_NS = 250_000_000  # redraw the overlay text 4 times a second
+EXPORT_PATH = "frame_profile.csv"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class FrameProfiler:
+    """Per-phase frame timings of the game loop.
+
+    FixedStepLoop records, with perf_counter_ns, how long each frame
+    spent handling events, running updates, rendering and pushing the
+    frame to the display, into ring buffers of the last PROFILE_FRAMES
+    frames. OVERLAY_KEY toggles an overlay with the rolling average and
+    percentiles of each phase; EXPORT_KEY writes the buffer as CSV (and
+    prints it in the browser, whose file system isn't reachable).
+    """
+
+    def __init__(self, size=PROFILE_FRAMES):
+        self.size = size
+        self.columns = {name: [0] * size for name in COLUMNS}
+        self.count = 0  # frames recorded in total
+        self.visible = False
+        self.panel = None
+        self.panel_rect = None
+        self.panel_time = 0
+
+    def record(self, interval, events, update, render, display, steps):
+        i = self.count % self.size
+        columns = self.columns
+        columns["interval"][i] = interval
+        columns["events"][i] = events
+        columns["update"][i] = update
+        columns["render"][i] = render
+        columns["display"][i] = display
+        columns["frame"][i] = events + update + render + display
+        columns["steps"][i] = steps
+        self.count += 1
+
+    def samples(self, name):
+        """The buffered values of a column, oldest first"""
+        values = self.columns[name]
+        if self.count <= self.size:
+            return values[:self.count]
+        start = self.count % self.size
+        return values[start:] + values[:start]
+
+    def stats(self, name):
+        """Rolling average and percentiles of a phase, in milliseconds"""
+        values = sorted(self.samples(name))
+        if not values:
+            return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "avg": sum(values) / len(values) / 1e6,
+            "p50": percentile(values, 0.50) / 1e6,
+            "p95": percentile(values, 0.95) / 1e6,
+            "p99": percentile(values, 0.99) / 1e6,
+            "max": values[-1] / 1e6,
+        }
+
+    def handle_event(self, event, dirty=None):
+        """Handle the profiler hotkeys, return True if the event was one"""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == OVERLAY_KEY:
+            self.visible = not self.visible
+            self.panel = None
+            if dirty is not None and self.panel_rect is not None:
+                dirty.mark(self.panel_rect)
+            return True
+        if event.key == EXPORT_KEY:
+            self.export()
+            return True
+        return False
+
+    def draw(self, screen, now, dirty=None):
+        if not self.visible:
+            return
+        if self.panel is None or now - self.panel_time >= OVERLAY_REFRESH_NS:
+            self.panel = self.render_panel()
+            self.panel_time = now
+        rect = screen.blit(self.panel, (4, 4))
+        if dirty is not None:
+            # the previous panel may have been larger, push what it covered too
+            dirty.mark(rect.union(self.panel_rect) if self.panel_rect else rect)
+        self.panel_rect = rect
+
+    def render_panel(self):
+        intervals = self.samples("interval")
+        fps = 1e9 * len(intervals) / sum(intervals) if intervals and sum(intervals) else 0.0
+        lines = [f"{fps:5.1f} fps   ms: avg   p50   p95   p99   max"]
+        for name in PHASES + ("frame",):
+            s = self.stats(name)
+            lines.append(f"{name:<8} {s['avg']:6.2f}{s['p50']:6.2f}{s['p95']:6.2f}{s['p99']:6.2f}{s['max']:6.2f}")
+        lines.append(f"text cache {text_cache.hit_rate() * 100:.1f}% hits")
+
+        # Rendered directly: these strings change every refresh and would only churn the text cache
+        font = get_font(18, "monospace").font
+        rows = [font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(row.get_width() for row in rows) + 8
+        height = sum(row.get_height() for row in rows) + 8
+        panel = pygame.Surface((width, height))
+        panel.fill((20, 20, 20))
+        y = 4
+        for row in rows:
+            panel.blit(row, (4, y))
+            y += row.get_height()
+        return panel
+
+    def csv_text(self):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(("frame_index",) + tuple(f"{name}_ns" if name != "steps" else name for name in COLUMNS))
+        columns = [self.samples(name) for name in COLUMNS]
+        first = max(0, self.count - self.size)
+        for i, row in enumerate(zip(*columns)):
+            writer.writerow((first + i,) + row)
+        return out.getvalue()
+
+    def export(self, path=EXPORT_PATH):
+        text = self.csv_text()
+        with open(path, "w", newline="") as f:
+            f.write(text)
+        if sys.platform == "emscripten":
+            print(text)
+        print(f"Frame profile written to {path}")
+        return path
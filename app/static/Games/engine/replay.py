@@ -0,0 +1,114 @@
+import base64
+import sys
+
+MAGIC = b"RPLY"
+VERSION = 1
+REPLAY_PATH = "last_round.replay"
+
+
+def write_varint(out, value):
+    """Append an unsigned LEB128 varint: 7 bits per byte, high bit set on all but the last"""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Decode the varint at data[pos], return (value, position after it)"""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Replay ends inside a number")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """Inputs of one round, compact enough to keep with every score.
+
+    A round is fully determined by the seed its Simulation was reset
+    with, its variant (the level, for games that have several) and the
+    inputs of every step, since all randomness of the rules comes from
+    simulation.rng. Inputs are stored as codes (Simulation.encode_input)
+    in runs of identical ticks; each run is written as varints: its
+    length, the number of inputs and the code of each one. A held key or
+    a stretch without input costs a few bytes however long it lasts.
+    """
+
+    def __init__(self, seed, variant=0):
+        self.seed = seed
+        self.variant = variant
+        self.ticks = 0
+        self.runs = []  # [ticks, codes] of consecutive identical ticks
+
+    def record(self, codes):
+        if self.runs and self.runs[-1][1] == codes:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, codes])
+        self.ticks += 1
+
+    def play(self, simulation):
+        """Rerun the round on a fresh simulation as fast as it goes"""
+        simulation.variant = self.variant
+        simulation.reset(self.seed)
+        decode = simulation.decode_input
+        for ticks, codes in self.runs:
+            inputs = tuple(decode(code) for code in codes)
+            for _ in range(ticks):
+                simulation.step(inputs)
+        return simulation
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        for value in (VERSION, self.seed, self.variant, self.ticks, len(self.runs)):
+            write_varint(out, value)
+        for ticks, codes in self.runs:
+            write_varint(out, ticks)
+            write_varint(out, len(codes))
+            for code in codes:
+                write_varint(out, code)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a replay")
+        pos = len(MAGIC)
+        version, pos = read_varint(data, pos)
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+        seed, pos = read_varint(data, pos)
+        variant, pos = read_varint(data, pos)
+        total, pos = read_varint(data, pos)
+        run_count, pos = read_varint(data, pos)
+
+        replay = cls(seed, variant)
+        for _ in range(run_count):
+            ticks, pos = read_varint(data, pos)
+            count, pos = read_varint(data, pos)
+            codes = []
+            for _ in range(count):
+                code, pos = read_varint(data, pos)
+                codes.append(code)
+            replay.runs.append([ticks, tuple(codes)])
+            replay.ticks += ticks
+        if replay.ticks != total or pos != len(data):
+            raise ValueError("Replay is corrupt")
+        return replay
+
+    def save(self, path=REPLAY_PATH):
+        data = self.to_bytes()
+        with open(path, "wb") as f:
+            f.write(data)
+        if sys.platform == "emscripten":
+            # The browser's file system isn't reachable, print it to copy from the console
+            print(base64.b64encode(data).decode("ascii"))
+        print(f"Replay of {self.ticks} ticks ({len(data)} bytes) written to {path}")
+        return path
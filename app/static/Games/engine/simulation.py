@@ -0,0 +1,59 @@
+import random
+
+from engine.replay import Replay
+
+
+class Simulation:
+    """Headless model of a game: all of its rules, none of its drawing.
+
+    step(inputs) advances the game by one fixed tick, inputs being the
+    names (from ACTIONS) of the controls held or pressed during it.
+    Nothing here opens a window or reads events, so a game can be run far
+    faster than real time: for benchmarks, bots, or checking that a
+    submitted score is reachable. Subclasses provide restart(), tick(),
+    and score and done attributes; each game's Game class extends its
+    Simulation with the window, events and rendering.
+
+    A round started with new_round() is recorded into self.replay, which
+    Replay.play() reruns bit-exact on another Simulation of the game.
+    """
+
+    ACTIONS = ()
+    variant = 0  # level or layout the round is played on, for games with several
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)  # all randomness of the rules, so runs can be replayed
+        self.ticks = 0
+        self.replay = None
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.ticks = 0
+        self.restart()
+
+    def new_round(self, seed=None):
+        """reset() with a fresh seed, recording the round's inputs into self.replay"""
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.replay = Replay(seed, self.variant)
+        self.reset(seed)
+
+    def restart(self):
+        raise NotImplementedError
+
+    def step(self, inputs=()):
+        if self.replay is not None:
+            self.replay.record(tuple(self.encode_input(action) for action in inputs))
+        self.ticks += 1
+        self.tick(inputs)
+
+    def encode_input(self, action):
+        """Small non-negative number standing for an action in replays"""
+        return self.ACTIONS.index(action)
+
+    def decode_input(self, code):
+        return self.ACTIONS[code]
+
+    def tick(self, inputs):
+        raise NotImplementedError
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_SIZE = 512  # rendered surfaces kept
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces.
+
+    Keyed by (font, size, bold, text, color, antialias, background,
+    alpha), so a label drawn every frame is rasterized once. The cached
+    surfaces are shared: blit them, don't draw on them or change their
+    alpha (pass alpha= to render instead).
+    """
+
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color, background=None, alpha=None):
+        key = (font.key, text, bool(antialias), tuple(color),
+               tuple(background) if background is not None else None, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.font.render(text, antialias, color, background)
+        if alpha is not None:
+            surface.set_alpha(alpha)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self.surfaces),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+text_cache = TextCache()
+
+
+class CachedFont:
+    """A pygame font whose render() and size() go through the text cache"""
+
+    def __init__(self, size, name=None, bold=False):
+        self.key = (name, size, bold)
+        if name is None:
+            self.font = pygame.font.Font(None, size)
+            self.font.set_bold(bold)
+        else:
+            self.font = pygame.font.SysFont(name, size, bold=bold)
+        self.sizes = {}
+
+    def render(self, text, antialias, color, background=None, alpha=None):
+        return text_cache.render(self, text, antialias, color, background, alpha)
+
+    def size(self, text):
+        size = self.sizes.get(text)
+        if size is None:
+            if len(self.sizes) >= TEXT_CACHE_SIZE:
+                self.sizes.clear()
+            size = self.sizes[text] = self.font.size(text)
+        return size
+
+    def __getattr__(self, name):
+        # get_height(), get_linesize() and the rest come from the pygame font
+        return getattr(self.font, name)
+
+
+fonts = {}  # (name, size, bold) -> CachedFont
+
+
+def get_font(size, name=None, bold=False):
+    """Shared font of a size; name is a system font name, None for pygame's default font"""
+    key = (name, size, bold)
+    font = fonts.get(key)
+    if font is None:
+        font = fonts[key] = CachedFont(size, name, bold)
+    return font
@@ -0,0 +1,103 @@
+import pygame
+
+from engine.text import get_font
+
+COLOR_WHITE = (255, 255, 255)
+COLOR_BLACK = (0, 0, 0)
+COLOR_GRAY = (128, 128, 128)
+INDEX_CELL = 64  # pixels per side of a ButtonGroup grid cell
+
+faces = {}  # look of a button -> its (normal, hover) surfaces
+
+
+def lighten(color, amount=30):
+    return tuple(min(channel + amount, 255) for channel in color)
+
+
+class Button:
+    """A labelled button, drawn with one blit of a pre-rendered face.
+
+    The normal and hover faces (fill, border and label) are rendered the
+    first time a button of that size, label and style is created and are
+    shared by every equal button after that. Games create their buttons
+    once per screen, not once per frame.
+    """
+
+    def __init__(self, x, y, width, height, text, color=COLOR_GRAY, hover_color=COLOR_WHITE,
+                 text_color=COLOR_BLACK, border_color=COLOR_WHITE, border=2, font=None):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.text = text
+        self.is_hovered = False
+        font = font or get_font(36)
+        key = (width, height, text, color, hover_color, text_color, border_color, border, font.key)
+        self.faces = faces.get(key)
+        if self.faces is None:
+            self.faces = faces[key] = (
+                self.render_face(color, text_color, border_color, border, font),
+                self.render_face(hover_color, text_color, border_color, border, font),
+            )
+
+    def render_face(self, color, text_color, border_color, border, font):
+        face = pygame.Surface(self.rect.size)
+        rect = face.get_rect()
+        pygame.draw.rect(face, color, rect)
+        pygame.draw.rect(face, border_color, rect, border)
+        text_surf = font.render(self.text, True, text_color)
+        face.blit(text_surf, text_surf.get_rect(center=rect.center))
+        return face
+
+    def check_hover(self, mouse_pos):
+        self.is_hovered = self.rect.collidepoint(mouse_pos)
+
+    def check_click(self, mouse_pos):
+        return self.rect.collidepoint(mouse_pos)
+
+    def render(self, window):
+        return window.blit(self.faces[self.is_hovered], self.rect)
+
+
+class ButtonGroup:
+    """The buttons of one screen, hit tested through a coarse grid.
+
+    Every button is filed under the INDEX_CELL sized cells its rect
+    overlaps, so finding the button under the cursor only looks at the
+    few filed under one cell, however long the menu. Only the buttons
+    whose highlight changed are reported to the DirtyRects.
+    """
+
+    def __init__(self, buttons=()):
+        self.buttons = []
+        self.cells = {}  # (column, row) -> buttons overlapping that cell
+        self.hovered = None
+        for button in buttons:
+            self.add(button)
+
+    def add(self, button):
+        rect = button.rect
+        for column in range(rect.left // INDEX_CELL, (rect.right - 1) // INDEX_CELL + 1):
+            for row in range(rect.top // INDEX_CELL, (rect.bottom - 1) // INDEX_CELL + 1):
+                self.cells.setdefault((column, row), []).append(button)
+        self.buttons.append(button)
+        return button
+
+    def at(self, pos):
+        """The button under pos, or None"""
+        for button in self.cells.get((pos[0] // INDEX_CELL, pos[1] // INDEX_CELL), ()):
+            if button.rect.collidepoint(pos):
+                return button
+        return None
+
+    def check_hover(self, mouse_pos, dirty=None):
+        hovered = self.at(mouse_pos)
+        if hovered is not self.hovered:
+            for button in (self.hovered, hovered):
+                if button is not None:
+                    button.is_hovered = button is hovered
+                    if dirty is not None:
+                        dirty.mark(button.rect)
+            self.hovered = hovered
+        return hovered
+
+    def render(self, window):
+        for button in self.buttons:
+            button.render(window)
@@ -1,102 +1,172 @@
+import os
 import pygame, sys
 
-class Sprite:
-    image = None
-    current_frame = 0
-    frame_time = 0
-
-    def __init__(self, img_route, hitbox=None):
-        self.imgs = []
-        self.img_route = img_route
-        if isinstance(hitbox, (list, tuple)) and len(hitbox) == 2:
-            self.x = hitbox[0]
-            self.y = hitbox[1]
-        self.image = pygame.image.load(self.img_route)
-        self.imgs.append(self.image)
-
-    def add_anim_stage(self, anim_img_route):
-        anim_img = pygame.image.load(anim_img_route)
-        self.imgs.append(anim_img)
-
-    def animate(self, anim_time):
-        self.frame_time += clock.get_time()
-        if self.frame_time >= anim_time * 1000:
-            self.current_frame = (self.current_frame + 1) % len(self.imgs)
-            self.image = self.imgs[self.current_frame]
-            self.frame_time = 0
-
-    def display(self, window, x, y):
-        window.blit(self.image, (x, y))
+try:
+    import numpy
+except ImportError:  # numpy is optional, the other fields are pure Python
+    numpy = None
+
+# The shared engine package sits next to the game folders (build_games.py copies it into builds)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import simulation
+from engine.assets import load_image
+from engine.dirty import DirtyRects
+from engine.loop import FixedStepLoop
+
+FIELD_SIZE = 20  # cells per side of the board the game plays on
+CELL_SIZE = 15
+FIELD_MARGIN = 20  # pixels between the window edge and the first cell
+
 
 class Square:
+    """One cell of the classic Field, drawn by FieldView"""
+
     def __init__(self, coords:tuple, alive=False):
         self.status = alive
         self.coords = coords
-        if self.status:
-            self.sprite = Sprite("img/sq-white.png")
-        else:
-            self.sprite = Sprite("img/sq-black.png")
-
-    def render(self, window):
-        if self.status:
-            self.sprite.image = pygame.image.load("img/sq-white.png")
-        else:
-            self.sprite.image = pygame.image.load("img/sq-black.png")
-        self.sprite.display(window, (20 + self.coords[0] * 15), (20 + self.coords[1] * 15))
 
     def toggle(self):
         self.status = bool(abs(self.status - 1))
 
 
+class FieldView:
+    """The cells in the window as one surface, redrawn only where they changed.
+
+    cells holds one palette-indexed pixel per cell in view, so a change
+    to the board is a set_at. When some changed, cells is scaled up to
+    CELL_SIZE pixels per cell and the grid (the borders of the square
+    images) is laid over it. Each frame then draws the field with a
+    single blit, whatever the size of the board.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        width = min(field.width, FIELD_SIZE)
+        height = min(field.height, FIELD_SIZE)
+        dead = load_image("img/sq-black.png")
+        alive = load_image("img/sq-white.png")
+        centre = (CELL_SIZE // 2, CELL_SIZE // 2)
+        self.colors = (dead.get_at(centre), alive.get_at(centre))
+        palette = self.colors + (dead.get_at((0, 0)),)
+
+        self.cells = pygame.Surface((width, height), 0, 8)
+        self.cells.set_palette(palette)
+        # Same palette for the grid, an 8-bit to 8-bit blit is the cheap one
+        self.grid = pygame.Surface((width * CELL_SIZE, height * CELL_SIZE), 0, 8)
+        self.grid.set_palette(palette)
+        for x in range(width):
+            for y in range(height):
+                self.grid.blit(dead, (x * CELL_SIZE, y * CELL_SIZE))
+        self.grid.set_colorkey(self.colors[0])
+        self.image = None
+
+    def render(self, window):
+        field = self.field
+        width, height = self.cells.get_size()
+        if self.image is None:
+            changed = [(x, y) for x in range(width) for y in range(height)]
+        else:
+            changed = [(x, y) for x, y in field.changed if x < width and y < height]
+        if changed:
+            for x, y in changed:
+                self.cells.set_at((x, y), self.colors[field.get(x, y)])
+            self.image = pygame.transform.scale(self.cells, self.grid.get_size())
+            self.image.blit(self.grid, (0, 0))
+        return window.blit(self.image, (FIELD_MARGIN, FIELD_MARGIN))
+
+
 class Field:
-    def __init__(self, Square, window):
-        self.field = []
+    """The Life board, one Square per cell.
+
+    Cells outside the board count as dead. Other engines subclass this
+    with a different build(), get(), toggle() and run(); the game and the
+    Simulation only go through those. The window shows the top left
+    FIELD_SIZE x FIELD_SIZE cells of larger boards.
+    """
+
+    def __init__(self, Square, window, width=FIELD_SIZE, height=FIELD_SIZE):
+        self.width = width
+        self.height = height
         self.running = False
         self.window = window
-        for x in range(20):
+        self.changed = []  # coords of squares toggled since the last frame, only kept with a window
+        self.view = None  # FieldView, made on the first render
+        self.build(Square)
+
+    def build(self, Square):
+        self.field = []
+        for x in range(self.width):
             self.field.append([])
-            for y in range(20):
+            for y in range(self.height):
                 self.field[x].append(Square((x,y)))
 
+    def get(self, x, y):
+        return self.field[x][y].status
+
+    def toggle(self, x, y):
+        self.field[x][y].toggle()
+        if self.window is not None:
+            self.changed.append((x, y))
+
+    def load(self, columns):
+        """Set every cell from columns[x][y] truth values"""
+        for x, column in enumerate(columns):
+            for y, alive in enumerate(column):
+                if self.get(x, y) != alive:
+                    self.toggle(x, y)
+
+    @property
+    def population(self):
+        return sum(box.status for row in self.field for box in row)
+
     def render_field(self):
-        for row in self.field:
-            for box in row:
-                box.render(self.window)
+        if self.view is None:
+            self.view = FieldView(self)
+        return self.view.render(self.window)
+
+    def cell_at(self, mouse):
+        """The (x, y) cell under a window position, or None"""
+        x = (mouse[0] - FIELD_MARGIN) // CELL_SIZE
+        y = (mouse[1] - FIELD_MARGIN) // CELL_SIZE
+        if 0 <= x < min(self.width, FIELD_SIZE) and 0 <= y < min(self.height, FIELD_SIZE):
+            return x, y
+        return None
 
     def click_check(self, mouse):
-        for row in self.field:
-            for box in row:
-                if (20 + box.coords[0] * 15) <= mouse[0] <= (35 + box.coords[0] * 15) and (20 + box.coords[1] * 15) <= mouse[1] <= (35 + box.coords[1] * 15):
-                    box.toggle()
+        cell = self.cell_at(mouse)
+        if cell is not None:
+            self.toggle(*cell)
 
     def run(self):
         toggle = []
+        last_x = self.width - 1
+        last_y = self.height - 1
         for x, row in enumerate(self.field):
             for y, box in enumerate(row):
                 neighbours = 0
-                if 19 > x > 0:
+                if last_x > x > 0:
                     neighbours += self.field[x - 1][y].status + self.field[x + 1][y].status
-                    if 19 > y > 0:
+                    if last_y > y > 0:
                         neighbours += self.field[x - 1][y + 1].status + self.field[x - 1][y - 1].status + self.field[x][y + 1].status + self.field[x][y - 1].status + self.field[x + 1][y - 1].status + self.field[x + 1][y + 1].status
-                    elif y == 19:
+                    elif y == last_y:
                         neighbours += self.field[x - 1][y - 1].status + self.field[x][y - 1].status + self.field[x + 1][y - 1].status
                     elif y == 0:
                         neighbours += self.field[x - 1][y + 1].status + self.field[x][y + 1].status + self.field[x + 1][y + 1].status
 
-                elif x == 7:
+                elif x == last_x:
                     neighbours += self.field[x - 1][y].status
-                    if 19 > y > 0:
+                    if last_y > y > 0:
                         neighbours += self.field[x - 1][y + 1].status + self.field[x - 1][y - 1].status + self.field[x][y + 1].status + self.field[x][y - 1].status
-                    elif y == 19:
+                    elif y == last_y:
                         neighbours += self.field[x - 1][y - 1].status + self.field[x][y - 1].status
                     elif y == 0:
                         neighbours += self.field[x - 1][y + 1].status + self.field[x][y + 1].status
 
                 elif x == 0:
                     neighbours += self.field[x + 1][y].status
-                    if 19 > y > 0:
+                    if last_y > y > 0:
                         neighbours += self.field[x + 1][y + 1].status + self.field[x + 1][y - 1].status + self.field[x][y + 1].status + self.field[x][y - 1].status
-                    elif y == 19:
+                    elif y == last_y:
                         neighbours += self.field[x + 1][y - 1].status + self.field[x][y - 1].status
                     elif y == 0:
                         neighbours += self.field[x + 1][y + 1].status + self.field[x][y + 1].status
@@ -109,58 +179,693 @@ class Field:
 
         for element in toggle:
             self.field[element[0]][element[1]].toggle()
+        if self.window is not None:
+            self.changed.extend(toggle)
+
+
+class NumpyField(Field):
+    """The board as a width x height uint8 array, one generation in a few array sums.
+
+    The board is copied into the middle of a buffer with a dead border,
+    the buffer's rows are summed in threes and then its columns, which
+    gives every cell its 3x3 block total (itself included) without
+    branching on the edges. A cell lives on with a total of 3, or of 4
+    when it is alive itself. All intermediate arrays are allocated once.
+    Only changes inside the window are reported in changed.
+    """
+
+    def build(self, Square):
+        if numpy is None:
+            raise RuntimeError("NumpyField needs numpy")
+        w, h = self.width, self.height
+        self.cells = numpy.zeros((w, h), numpy.uint8)
+        self.padded = numpy.zeros((w + 2, h + 2), numpy.uint8)
+        self.rows = numpy.empty((w, h + 2), numpy.uint8)
+        self.totals = numpy.empty((w, h), numpy.uint8)
+        self.next_cells = numpy.empty((w, h), numpy.uint8)
+        self.scratch = numpy.empty((w, h), bool)
+
+    def get(self, x, y):
+        return bool(self.cells[x, y])
+
+    def toggle(self, x, y):
+        self.cells[x, y] ^= 1
+        if self.window is not None:
+            self.changed.append((x, y))
+
+    def load(self, columns):
+        previous = self.cells.copy()
+        self.cells[:] = numpy.asarray(columns, bool)
+        self.report(previous)
+
+    @property
+    def population(self):
+        return int(numpy.count_nonzero(self.cells))
+
+    def report(self, previous):
+        """Add the cells in view that differ from previous to changed"""
+        if self.window is not None:
+            view = (slice(0, FIELD_SIZE), slice(0, FIELD_SIZE))
+            self.changed.extend((int(x), int(y)) for x, y in numpy.argwhere(previous[view] != self.cells[view]))
+
+    def run(self):
+        padded, rows, totals = self.padded, self.rows, self.totals
+        padded[1:-1, 1:-1] = self.cells
+        numpy.add(padded[:-2], padded[1:-1], out=rows)
+        rows += padded[2:]
+        numpy.add(rows[:, :-2], rows[:, 1:-1], out=totals)
+        totals += rows[:, 2:]
+
+        # Alive next: total == 3, or total == 4 and alive now
+        numpy.equal(totals, 3, out=self.scratch)
+        next_cells = self.next_cells
+        numpy.equal(totals, 4, out=next_cells)  # bool results cast to 0/1
+        next_cells &= self.cells
+        next_cells |= self.scratch
+        self.next_cells, self.cells = self.cells, next_cells
+        self.report(self.next_cells)
+
+
+class BitField(Field):
+    """The board as one Python int per row, bit x of rows[y] being cell (x, y).
+
+    A generation is bitwise adder logic over whole rows, so it needs no
+    numpy and costs a few dozen big-int operations per row, whatever the
+    width. Each row is first added to its two shifted copies, giving every
+    cell the 0-3 count of its row of three as two bit planes. The planes
+    of the rows above, at and below are then added into a 0-9 total of the
+    3x3 block, and the rule reads off totals of 3, or 4 for a live cell.
+    """
+
+    def build(self, Square):
+        self.mask = (1 << self.width) - 1
+        self.rows = [0] * self.height
+
+    def get(self, x, y):
+        return bool(self.rows[y] >> x & 1)
+
+    def toggle(self, x, y):
+        self.rows[y] ^= 1 << x
+        if self.window is not None:
+            self.changed.append((x, y))
+
+    def load(self, columns):
+        previous = self.rows
+        self.rows = [sum(1 << x for x, column in enumerate(columns) if column[y]) for y in range(self.height)]
+        self.report(previous)
+
+    @property
+    def population(self):
+        return sum(bin(row).count("1") for row in self.rows)
+
+    def report(self, previous):
+        """Add the cells in view that differ from previous to changed"""
+        if self.window is not None:
+            self.changed.extend(row_changes(previous, self.rows))
+
+    def run(self):
+        previous, self.rows = self.rows, step_rows(self.rows, self.mask)
+        self.report(previous)
+
+
+def row_changes(previous, rows):
+    """(x, y) of the cells in view that differ between two lists of BitField rows"""
+    view = (1 << FIELD_SIZE) - 1
+    for y in range(min(len(rows), FIELD_SIZE)):
+        for x in bits((previous[y] ^ rows[y]) & view):
+            yield x, y
+
+
+def bits(row):
+    """Positions of the set bits of an int, lowest first"""
+    while row:
+        bit = row & -row
+        yield bit.bit_length() - 1
+        row ^= bit
+
+
+def step_rows(rows, mask):
+    """The next generation of a list of BitField rows"""
+    # Count of each row of three, as bit planes (ones, twos)
+    ones = []
+    twos = []
+    for row in rows:
+        left = row << 1 & mask
+        right = row >> 1
+        half = left ^ row
+        ones.append(half ^ right)
+        twos.append(left & row | half & right)
+    ones.append(0)  # ones[-1] and twos[-1] stand for the dead rows around the board
+    twos.append(0)
+
+    next_rows = []
+    for y, row in enumerate(rows):
+        a0, b0, c0 = ones[y - 1], ones[y], ones[y + 1]
+        a1, b1, c1 = twos[y - 1], twos[y], twos[y + 1]
+        # Add the three counts: bit planes of weight 1, 2, 4 and 8
+        half = a0 ^ b0
+        total1 = half ^ c0
+        carry1 = a0 & b0 | half & c0
+        half = a1 ^ b1
+        sum2 = half ^ c1
+        carry2 = a1 & b1 | half & c1
+        total2 = sum2 ^ carry1
+        carry4 = sum2 & carry1
+        total4 = carry2 ^ carry4
+        total8 = carry2 & carry4
+        three = total1 & total2 & ~(total4 | total8)
+        four = total4 & ~(total1 | total2 | total8)
+        next_rows.append(three | row & four)
+    return next_rows
+
+
+# An active cell costs ActiveField about as much as a row of BitField's
+# whole-board step, so it steps the board as BitField rows while it has
+# more active cells than this per row, and tracks them again below half
+ACTIVE_PER_ROW = 1.5
+TO_BITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+class ActiveField(Field):
+    """The board as bytearrays, evaluating only the cells that may change.
+
+    Cell (x, y) is index x * height + y of alive, and counts holds the
+    live neighbours of every cell, updated by the neighbours of each cell
+    that flips. A cell can only change if it or one of its neighbours did
+    last generation, so those are the only ones in active and the only
+    ones run() evaluates: a still or sparse board costs next to nothing.
+    A busy board, such as a fresh soup, would cost more than stepping
+    everything, so past ACTIVE_PER_ROW the board is kept as BitField
+    rows instead until it settles. active_cells (cells that changed last
+    generation) and evaluated_cells show how much of the board was
+    actually looked at.
+    """
+
+    def build(self, Square):
+        self.alive = bytearray(self.width * self.height)
+        self.counts = bytearray(self.width * self.height)
+        self.active = set()  # indices of the cells to evaluate next generation
+        self.live = 0
+        self.rows = None  # BitField rows while the board is dense, alive and counts are stale then
+        self.diff = None  # rows of the cells changed since the last dense generation
+        self.mask = (1 << self.width) - 1
+        self.dense_limit = self.height * ACTIVE_PER_ROW
+        self.active_cells = 0
+        self.evaluated_cells = 0
+
+    def flip(self, i):
+        alive, counts, active = self.alive, self.counts, self.active
+        alive[i] ^= 1
+        delta = 1 if alive[i] else -1
+        self.live += delta
+        h = self.height
+        x, y = divmod(i, h)
+        for nx in range(max(x - 1, 0), min(x + 2, self.width)):
+            for j in range(nx * h + max(y - 1, 0), nx * h + min(y + 2, h)):
+                active.add(j)
+                if j != i:
+                    counts[j] += delta
+
+    def get(self, x, y):
+        if self.rows is not None:
+            return bool(self.rows[y] >> x & 1)
+        return bool(self.alive[x * self.height + y])
+
+    def toggle(self, x, y):
+        if self.rows is not None:
+            self.rows[y] ^= 1 << x
+            self.diff[y] |= 1 << x
+        else:
+            self.flip(x * self.height + y)
+        if self.window is not None:
+            self.changed.append((x, y))
+
+    def load(self, columns):
+        if self.rows is not None:
+            self.sparse()
+        flips = [x * self.height + y for x, column in enumerate(columns)
+                 for y, alive in enumerate(column) if self.alive[x * self.height + y] != alive]
+        for i in flips:
+            self.flip(i)
+        self.report(flips)
+
+    @property
+    def population(self):
+        if self.rows is not None:
+            return sum(bin(row).count("1") for row in self.rows)
+        return self.live
+
+    def report(self, flips):
+        """Add the flipped cells in view to changed"""
+        if self.window is not None:
+            for i in flips:
+                x, y = divmod(i, self.height)
+                if x < FIELD_SIZE and y < FIELD_SIZE:
+                    self.changed.append((x, y))
+
+    def dense(self):
+        """Switch to BitField rows"""
+        h = self.height
+        self.rows = [int(self.alive[y::h].translate(TO_BITS)[::-1], 2) for y in range(h)]
+        self.diff = [0] * h
+        self.active = set()
+
+    def sparse(self):
+        """Switch back from BitField rows"""
+        w, h = self.width, self.height
+        rows, self.rows = self.rows, None
+        diff, self.diff = self.diff, None
+        self.alive = bytearray(w * h)
+        self.counts = bytearray(w * h)
+        self.live = 0
+        # Turning every live cell on from an empty board counts the neighbours
+        for y, row in enumerate(rows):
+            for x in bits(row):
+                self.flip(x * h + y)
+        # Only the cells around the last changes can change next
+        self.active = active = set()
+        for y, row in enumerate(diff):
+            for x in bits(row):
+                for nx in range(max(x - 1, 0), min(x + 2, w)):
+                    active.update(range(nx * h + max(y - 1, 0), nx * h + min(y + 2, h)))
+
+    def near(self, diff):
+        """Number of cells next to or on a set bit of diff"""
+        mask = self.mask
+        spread = [row | row << 1 & mask | row >> 1 for row in diff]
+        spread.append(0)
+        return sum((spread[y - 1] | row | spread[y + 1]).bit_count() for y, row in enumerate(spread[:-1]))
+
+    def run(self):
+        if self.rows is None and len(self.active) > self.dense_limit:
+            self.dense()
+        if self.rows is not None:
+            previous, self.rows = self.rows, step_rows(self.rows, self.mask)
+            self.diff = [a ^ b for a, b in zip(previous, self.rows)]
+            self.evaluated_cells = self.width * self.height
+            self.active_cells = sum(row.bit_count() for row in self.diff)
+            if self.window is not None:
+                self.changed.extend(row_changes(previous, self.rows))
+            # The changed cells are among the ones near them, so check their count first
+            if self.active_cells < self.dense_limit / 2 and self.near(self.diff) < self.dense_limit / 2:
+                self.sparse()
+            return
+
+        alive, counts = self.alive, self.counts
+        flips = [i for i in self.active if (counts[i] == 3 or counts[i] == 2 and alive[i]) != alive[i]]
+        self.evaluated_cells = len(self.active)
+        self.active_cells = len(flips)
+        self.active = set()
+        for i in flips:
+            self.flip(i)
+        self.report(flips)
+
+
+class Node:
+    """Square of 2**level cells in a HashLife quadtree, shared by every equal square"""
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population")
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+DEAD = Node(None, None, None, None, 0, 0)
+ALIVE = Node(None, None, None, None, 0, 1)
+MAX_NODES = 1 << 18  # nodes a HashField keeps before it drops its caches
+
+
+class HashField(Field):
+    """An unbounded universe as a HashLife quadtree, seen through the window.
+
+    Equal squares of the universe are one canonical Node, so a large or
+    repetitive pattern takes little memory, and the future of a square
+    (its centre half, 2**j generations on) is memoized per node. jump(k)
+    advances 2**k generations with about the work of one; run() is
+    jump(0). width and height only bound what load() and clicks cover:
+    cells around them are alive like any other. (view_x, view_y) is the
+    universe cell shown at the window's top left, see move_view().
+
+    When a step leaves more than max_nodes nodes, the memo and the node
+    table are dropped and rebuilt from the nodes of the current universe
+    only, which bounds memory at the cost of recomputing old futures.
+    """
+
+    def build(self, Square):
+        self.max_nodes = MAX_NODES
+        self.view_x = 0
+        self.view_y = 0
+        self.nodes = {}  # (nw, ne, sw, se) -> canonical Node
+        self.results = {}  # (node, j) -> centre of node 2**j generations on
+        self.empty_nodes = [DEAD]
+        self.root = self.empty(3)
+        self.left = self.top = 0  # universe coords of the root's top left cell
+
+    def join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = Node(nw, ne, sw, se, nw.level + 1,
+                                          nw.population + ne.population + sw.population + se.population)
+        return node
+
+    def empty(self, level):
+        while len(self.empty_nodes) <= level:
+            e = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(e, e, e, e))
+        return self.empty_nodes[level]
+
+    def expand(self):
+        """Put the root in the middle of a square twice its size"""
+        root = self.root
+        e = self.empty(root.level - 1)
+        self.root = self.join(self.join(e, e, e, root.nw), self.join(e, e, root.ne, e),
+                              self.join(e, root.sw, e, e), self.join(root.se, e, e, e))
+        half = 1 << (root.level - 1)
+        self.left -= half
+        self.top -= half
+
+    def centre(self, node):
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def life_4x4(self, node):
+        """Centre 2x2 of a 4x4 node one generation on"""
+        cells = [[0] * 4 for _ in range(4)]
+        for qx, qy, quadrant in ((0, 0, node.nw), (2, 0, node.ne), (0, 2, node.sw), (2, 2, node.se)):
+            cells[qx][qy] = quadrant.nw.population
+            cells[qx + 1][qy] = quadrant.ne.population
+            cells[qx][qy + 1] = quadrant.sw.population
+            cells[qx + 1][qy + 1] = quadrant.se.population
+        next_cells = []
+        for x, y in ((1, 1), (2, 1), (1, 2), (2, 2)):
+            total = sum(cells[i][j] for i in range(x - 1, x + 2) for j in range(y - 1, y + 2))
+            next_cells.append(ALIVE if total == 3 or total == 4 and cells[x][y] else DEAD)
+        return self.join(*next_cells)
+
+    def future(self, node, j):
+        """Centre half of node (level >= 2) 2**j generations on, j <= level - 2"""
+        result = self.results.get((node, j))
+        if result is not None:
+            return result
+        if node.population == 0:
+            result = node.nw
+        elif node.level == 2:
+            result = self.life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # Nine overlapping squares of half the size, each advanced as far as it can go
+            step = min(j, node.level - 3)
+            n00 = self.future(nw, step)
+            n01 = self.future(self.join(nw.ne, ne.nw, nw.se, ne.sw), step)
+            n02 = self.future(ne, step)
+            n10 = self.future(self.join(nw.sw, nw.se, sw.nw, sw.ne), step)
+            n11 = self.future(self.join(nw.se, ne.sw, sw.ne, se.nw), step)
+            n12 = self.future(self.join(ne.sw, ne.se, se.nw, se.ne), step)
+            n20 = self.future(sw, step)
+            n21 = self.future(self.join(sw.ne, se.nw, sw.se, se.sw), step)
+            n22 = self.future(se, step)
+            quadrants = (self.join(n00, n01, n10, n11), self.join(n01, n02, n11, n12),
+                         self.join(n10, n11, n20, n21), self.join(n11, n12, n21, n22))
+            if j == node.level - 2:
+                # The second half of the 2**j generations
+                result = self.join(*(self.future(q, j - 1) for q in quadrants))
+            else:
+                result = self.join(*(self.centre(q) for q in quadrants))
+        self.results[(node, j)] = result
+        return result
+
+    def padded(self):
+        """True if every live cell is in the middle half of the root"""
+        root = self.root
+        return root.level >= 3 and root.population == (root.nw.se.population + root.ne.sw.population +
+                                                        root.sw.ne.population + root.se.nw.population)
+
+    def jump(self, k):
+        """Advance 2**k generations"""
+        previous = self.view_cells()
+        # A pattern grows at most a cell per generation, the padding keeps it inside the result
+        while self.root.level < k + 2 or not self.padded():
+            self.expand()
+        self.expand()
+        quarter = 1 << (self.root.level - 2)
+        self.root = self.future(self.root, k)
+        self.left += quarter
+        self.top += quarter
+        if len(self.nodes) > self.max_nodes:
+            self.collect()
+        self.report(previous)
+
+    def run(self):
+        self.jump(0)
+
+    def collect(self):
+        """Drop the memo and every node the universe no longer uses"""
+        self.nodes = {}
+        self.results = {}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in self.nodes:
+                self.nodes[key] = node
+                stack.extend(key)
+        # Empty squares that dropped out are recreated, equal ones must stay one node
+        self.empty_nodes = [DEAD]
+
+    def get(self, x, y):
+        x += self.view_x - self.left
+        y += self.view_y - self.top
+        node = self.root
+        size = 1 << node.level
+        if not (0 <= x < size and 0 <= y < size):
+            return False
+        while node.level > 0:
+            if node.population == 0:
+                return False
+            size >>= 1
+            if y < size:
+                node = node.nw if x < size else node.ne
+            else:
+                node = node.sw if x < size else node.se
+            x %= size
+            y %= size
+        return node is ALIVE
+
+    def set_cell(self, node, x, y, alive):
+        """node with the cell at (x, y) inside it replaced"""
+        if node.level == 0:
+            return ALIVE if alive else DEAD
+        half = 1 << (node.level - 1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if y < half:
+            if x < half:
+                nw = self.set_cell(nw, x, y, alive)
+            else:
+                ne = self.set_cell(ne, x - half, y, alive)
+        else:
+            if x < half:
+                sw = self.set_cell(sw, x, y - half, alive)
+            else:
+                se = self.set_cell(se, x - half, y - half, alive)
+        return self.join(nw, ne, sw, se)
+
+    def toggle(self, x, y):
+        alive = not self.get(x, y)
+        x += self.view_x
+        y += self.view_y
+        while not (self.left <= x < self.left + (1 << self.root.level) and
+                   self.top <= y < self.top + (1 << self.root.level)):
+            self.expand()
+        self.root = self.set_cell(self.root, x - self.left, y - self.top, alive)
+        if self.window is not None:
+            self.changed.append((x - self.view_x, y - self.view_y))
+
+    def build_tree(self, cells, x, y, level):
+        """Node of the square at (x, y) holding the live cells given, relative to the root"""
+        if not cells:
+            return self.empty(level)
+        if level == 0:
+            return ALIVE
+        half = 1 << (level - 1)
+        quadrants = ([], [], [], [])
+        for cell in cells:
+            quadrants[(cell[0] >= x + half) + 2 * (cell[1] >= y + half)].append(cell)
+        return self.join(self.build_tree(quadrants[0], x, y, level - 1),
+                         self.build_tree(quadrants[1], x + half, y, level - 1),
+                         self.build_tree(quadrants[2], x, y + half, level - 1),
+                         self.build_tree(quadrants[3], x + half, y + half, level - 1))
+
+    def load_cells(self, cells):
+        """Make the universe the given live (x, y) universe cells and nothing else"""
+        previous = self.view_cells()
+        cells = list(cells)
+        self.left = min((x for x, _ in cells), default=0)
+        self.top = min((y for _, y in cells), default=0)
+        extent = max([x - self.left + 1 for x, _ in cells] + [y - self.top + 1 for _, y in cells] + [8])
+        level = (extent - 1).bit_length()
+        shifted = [(x - self.left, y - self.top) for x, y in cells]
+        self.root = self.build_tree(shifted, 0, 0, level)
+        self.report(previous)
+
+    def move_view(self, view_x, view_y):
+        """Show the universe from (view_x, view_y) on"""
+        previous = self.view_cells()
+        self.view_x = view_x
+        self.view_y = view_y
+        self.report(previous)
+
+    def load(self, columns):
+        self.load_cells((self.view_x + x, self.view_y + y)
+                        for x, column in enumerate(columns) for y, alive in enumerate(column) if alive)
+
+    @property
+    def population(self):
+        return self.root.population
+
+    def view_cells(self):
+        """Live cells in the window, in window coords"""
+        cells = set()
+        if self.window is None:
+            return cells
+        size = FIELD_SIZE
+        stack = [(self.root, self.left - self.view_x, self.top - self.view_y)]
+        while stack:
+            node, x, y = stack.pop()
+            extent = 1 << node.level
+            if node.population == 0 or x >= size or y >= size or x + extent <= 0 or y + extent <= 0:
+                continue
+            if node.level == 0:
+                cells.add((x, y))
+                continue
+            half = extent >> 1
+            stack += ((node.nw, x, y), (node.ne, x + half, y), (node.sw, x, y + half),
+                      (node.se, x + half, y + half))
+        return cells
+
+    def report(self, previous):
+        """Add the cells in view that changed since previous (from view_cells) to changed"""
+        if self.window is not None:
+            self.changed.extend(previous ^ self.view_cells())
+
+
+FIELDS = {"classic": Field, "numpy": NumpyField, "bitboard": BitField, "hashlife": HashField,
+          "active": ActiveField}
+ENGINE = "numpy" if numpy is not None else "bitboard"  # fastest engine available
 
 
 class Button:
     def __init__(self):
-        self.img1 = pygame.image.load("img/button-1.png")
-        self.img2 = pygame.image.load("img/button-2.png")
+        self.img1 = load_image("img/button-1.png")
+        self.img2 = load_image("img/button-2.png")
         self.image = self.img1
 
-    def toggle(self):
-        if self.image == self.img1:
-            self.image = self.img2
-        elif self.image == self.img2:
-            self.image = self.img1
+    def render(self, window, running):
+        self.image = self.img2 if running else self.img1
+        return window.blit(self.image, (20,340))
 
-    def render(self, window):
-        window.blit(self.image, (20,340))
+# Game settings
+GENERATIONS_PER_SECOND = 10
+RENDER_FPS = 20
+
+# Simulation variants
+LAYOUT_SOUP = 0  # random soup, running from the start
+LAYOUT_BLANK = 1  # empty and stopped, for drawing a pattern first
+START_STOP = "start_stop"  # input that starts or stops the generations
+
+
+class Simulation(simulation.Simulation):
+    """Game of life without a display, one step is one generation while the field runs"""
+
+    def __init__(self, seed=None, window=None, width=FIELD_SIZE, height=FIELD_SIZE, engine=ENGINE):
+        super().__init__(seed)
+        self.field = FIELDS[engine](Square, window, width, height)
+
+    def restart(self):
+        """Fill the field with a random soup, about 30% alive, or clear it for LAYOUT_BLANK"""
+        if self.variant == LAYOUT_BLANK:
+            self.field.load([[False] * self.field.height for _ in range(self.field.width)])
+            self.field.running = False
+            return
+        random = self.rng.random
+        self.field.load([[random() < 0.3 for _ in range(self.field.height)] for _ in range(self.field.width)])
+        self.field.running = True
+
+    @property
+    def score(self):
+        return self.field.population
+
+    @property
+    def done(self):
+        return self.score == 0
+
+    def encode_input(self, action):
+        if action == START_STOP:
+            return self.field.width * self.field.height
+        return action[0] * self.field.height + action[1]
+
+    def decode_input(self, code):
+        if code == self.field.width * self.field.height:
+            return START_STOP
+        return divmod(code, self.field.height)
+
+    def tick(self, inputs):
+        """inputs are (x, y) cells to toggle, or START_STOP, before the generation"""
+        for action in inputs:
+            if action == START_STOP:
+                self.field.running = not self.field.running
+            else:
+                self.field.toggle(*action)
+        if self.field.running:
+            self.field.run()
+
+
+class Game(Simulation):
+    variant = LAYOUT_BLANK
 
-class Game:
     def __init__(self):
-        pass
-    async def run(self):
-        import asyncio
-        clock = pygame.time.Clock()
         pygame.display.set_caption("Game of life")
-        screen = pygame.display.set_mode((340, 440), 0, 32)
-
-        field = Field(Square, screen)
-        frame = 0
-        button = Button()
+        self.screen = pygame.display.set_mode((340, 440), 0, 32)
+        self.dirty = DirtyRects()
+        super().__init__(window=self.screen)
+        self.button = Button()
+        self.pressed = []  # clicks since the last step, applied (and recorded) by the next one
+        self.new_round()
 
-        while True:
-            clock.tick(20)
-            await asyncio.sleep(0)  # Yield control to event loop for pygbag
-            frame += 1
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse = pygame.mouse.get_pos()
+            cell = self.field.cell_at(mouse)
+            if cell is not None:
+                self.pressed.append(cell)
+            if 20 < mouse[0] < 320 and 340 < mouse[1] < 400:
+                self.pressed.append(START_STOP)
 
-            if field.running and not frame % 2:
-                field.run()
+    @property
+    def idle(self):
+        """A stopped field only changes on clicks"""
+        return not self.field.running and not self.pressed
 
-            screen.fill((118, 61, 217))
-            field.render_field()
-            button.render(screen)
+    def update(self):
+        """One generation, a stopped field only steps to apply clicks"""
+        if self.field.running or self.pressed:
+            self.step(tuple(self.pressed))
+            self.pressed = []
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+    def render(self, alpha):
+        self.screen.fill((118, 61, 217))
+        self.field.render_field()
+        button_rect = self.button.render(self.screen, self.field.running)
 
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse = pygame.mouse.get_pos()
-                    field.click_check(mouse)
-                    if 20 < mouse[0] < 320 and 340 < mouse[1] < 400:
-                        field.running = bool(abs(field.running - 1))
-                        button.toggle()
+        for x, y in self.field.changed:
+            self.dirty.mark(pygame.Rect(FIELD_MARGIN + x * CELL_SIZE, FIELD_MARGIN + y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+        self.field.changed = []
+        self.dirty.watch("button", self.field.running, button_rect)
 
-            pygame.display.update()
\ No newline at end of file
+    async def run(self):
+        await FixedStepLoop(GENERATIONS_PER_SECOND, RENDER_FPS).run(self)
@@ -1,9 +1,19 @@
+import asyncio
 import pygame, os, sys
 
+# The shared engine package sits next to the game folders (build_games.py copies it into builds)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import simulation, widgets
+from engine.assets import assets, image_paths, load_image
+from engine.dirty import DirtyRects
+from engine.loop import FixedStepLoop, lerp
+from engine.text import get_font
+from engine.widgets import ButtonGroup
+
 
 class Sprite:
     def __init__(self, img_route, x=0, y=0):
-        self.image = pygame.image.load(img_route)
+        self.image = load_image(img_route)  # shared by every sprite using the file
         self.x = x
         self.y = y
         self.rect = self.image.get_rect()
@@ -25,6 +35,8 @@ class Player:
         self.sprite = Sprite("img/player.png", x, y)
         self.x = x
         self.y = y
+        self.prev_x = x  # position before the last move, for interpolation
+        self.prev_y = y
         self.vel_x = 0
         self.vel_y = 0
         self.on_ground = False
@@ -37,15 +49,17 @@ class Player:
         self.alive = True
         self.stars_collected = 0
 
-    def move(self, keys, tiles):
+    def move(self, actions, tiles):
+        self.prev_x = self.x
+        self.prev_y = self.y
         if not self.alive:
             return
 
         # Horizontal movement
         self.vel_x = 0
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        if "left" in actions:
             self.vel_x = -self.speed
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        if "right" in actions:
             self.vel_x = self.speed
 
         # Apply horizontal movement
@@ -54,7 +68,7 @@ class Player:
         self.check_collision_x(tiles)
 
         # Jumping
-        if (keys[pygame.K_UP] or keys[pygame.K_w] or keys[pygame.K_SPACE]) and self.on_ground:
+        if "jump" in actions and self.on_ground:
             self.vel_y = -self.jump_power
             self.on_ground = False
 
@@ -121,17 +135,21 @@ class Player:
         return False
 
     def reset(self, spawn_x, spawn_y):
-        self.x = spawn_x
-        self.y = spawn_y
+        self.x = self.prev_x = spawn_x
+        self.y = self.prev_y = spawn_y
         self.vel_x = 0
         self.vel_y = 0
+        self.on_ground = False
         self.alive = True
         self.stars_collected = 0
         self.sprite.update_position(self.x, self.y)
 
-    def render(self, window, camera_x, camera_y):
+    def render(self, window, camera_x, camera_y, alpha=1.0):
         if self.alive:
-            self.sprite.display(window, camera_x, camera_y)
+            x = round(lerp(self.prev_x, self.x, alpha))
+            y = round(lerp(self.prev_y, self.y, alpha))
+            return window.blit(self.sprite.image, (x - camera_x, y - camera_y))
+        return None
 
 
 class Tile:
@@ -278,10 +296,14 @@ class Camera:
     def __init__(self, width, height):
         self.x = 0
         self.y = 0
+        self.prev_x = 0  # position before the last update, for interpolation
+        self.prev_y = 0
         self.width = width
         self.height = height
 
     def update(self, player, map_width, map_height):
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.x = player.x - self.width // 2 + player.width // 2
         self.y = player.y - self.height // 2 + player.height // 2
 
@@ -294,36 +316,23 @@ class Camera:
         if self.y > map_height * 32 - self.height:
             self.y = max(0, map_height * 32 - self.height)
 
+    def snap(self, player, map_width, map_height):
+        """Jump straight to the player, without interpolating from the old position"""
+        self.update(player, map_width, map_height)
+        self.prev_x = self.x
+        self.prev_y = self.y
 
-class Button:
-    def __init__(self, x, y, width, height, text, color):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.color = color
-        self.hover_color = (min(color[0] + 30, 255), min(color[1] + 30, 255), min(color[2] + 30, 255))
-        self.is_hovered = False
-
-    def check_hover(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
-
-    def check_click(self, mouse_pos):
-        return self.rect.collidepoint(mouse_pos)
-
-    def render(self, window):
-        color = self.hover_color if self.is_hovered else self.color
-        pygame.draw.rect(window, color, self.rect)
-        pygame.draw.rect(window, (0, 0, 0), self.rect, 3)
 
-        font = pygame.font.Font(None, 36)
-        text_surf = font.render(self.text, True, (255, 255, 255))
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        window.blit(text_surf, text_rect)
+class Button(widgets.Button):
+    def __init__(self, x, y, width, height, text, color):
+        super().__init__(x, y, width, height, text, color, widgets.lighten(color),
+                         text_color=(255, 255, 255), border_color=(0, 0, 0), border=3)
 
 
 
 # Game settings
-FPS = 60
-clock = pygame.time.Clock()
+TICKS_PER_SECOND = 60  # simulation steps; player speeds are pixels per tick
+RENDER_FPS = 60
 
 # Game states
 STATE_MENU = "menu"
@@ -331,6 +340,8 @@ STATE_PLAYING = "playing"
 STATE_WIN = "win"
 STATE_DEAD = "dead"
 
+BUTTON_COLORS = {"RESTART": (70, 130, 180), "NEXT LEVEL": (70, 180, 70), "MENU": (180, 130, 70)}
+
 
 def scan_levels():
     levels = []
@@ -343,15 +354,80 @@ def scan_levels():
     return sorted(levels)
 
 
-class Game:
-    def __init__(self):
+class Simulation(simulation.Simulation):
+    """Platformer without a display, one step is one tick of the current level"""
+
+    ACTIONS = ("left", "right", "jump")
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
         self.state = STATE_MENU
-        self.current_level = 1
+        self.current_level = 0
         self.available_levels = scan_levels()
-        self.screen = None
         self.current_map = None
         self.player = None
+
+    def load_map(self, level_index):
+        if level_index < 0 or level_index >= len(self.available_levels):
+            level_index = 0
+
+        self.current_level = level_index
+        self.current_map = Map(f"maps/{self.available_levels[level_index]}")
+        self.player = Player(self.current_map.player_spawn_x, self.current_map.player_spawn_y)
+        self.state = STATE_PLAYING
+
+    @property
+    def variant(self):
+        return self.current_level
+
+    @variant.setter
+    def variant(self, level_index):
+        if level_index != self.current_level:
+            self.current_level = level_index
+            self.current_map = None  # restart() loads it
+
+    def restart(self):
+        if self.current_map is None:
+            self.load_map(self.current_level)
+            return
+        self.player.reset(self.current_map.player_spawn_x, self.current_map.player_spawn_y)
+        self.current_map.reset_stars()
+        self.state = STATE_PLAYING
+
+    @property
+    def score(self):
+        return self.player.stars_collected if self.player else 0
+
+    @property
+    def done(self):
+        return self.state == STATE_WIN or self.state == STATE_DEAD
+
+    def tick(self, inputs):
+        if self.state != STATE_PLAYING:
+            return
+        self.player.move(inputs, self.current_map.tiles)
+        self.current_map.check_stars(self.player)
+
+        # Check win condition
+        if self.player.stars_collected >= self.current_map.total_stars:
+            self.state = STATE_WIN
+
+        # Check death
+        if self.player.check_death(self.current_map.height, self.current_map.spikes):
+            self.state = STATE_DEAD
+
+
+class Game(Simulation):
+    def __init__(self):
+        super().__init__()
+        self.screen = None
         self.camera = None
+        self.dirty = DirtyRects()
+        self.menu_buttons = ButtonGroup(
+            Button(250, 200 + i * 70, 300, 50, level[:-4], (70, 130, 180))
+            for i, level in enumerate(self.available_levels))
+        self.win_buttons = None
+        self.dead_buttons = None
         self.init_menu()
 
     def init_menu(self):
@@ -360,12 +436,9 @@ class Game:
         pygame.display.set_caption("Platformer - Menu")
 
     def load_level(self, level_index):
-        if level_index < 0 or level_index >= len(self.available_levels):
-            level_index = 0
-
-        self.current_level = level_index
-        level_name = self.available_levels[level_index]
-        self.current_map = Map(f"maps/{level_name}")
+        self.load_map(level_index)
+        self.new_round()
+        level_name = self.available_levels[self.current_level]
 
         # Resize window based on map size
         screen_width = min(self.current_map.width * 32, 1200)
@@ -373,14 +446,31 @@ class Game:
         self.screen = pygame.display.set_mode((screen_width, screen_height), 0, 32)
         pygame.display.set_caption(f"Platformer - {level_name}")
 
-        self.player = Player(self.current_map.player_spawn_x, self.current_map.player_spawn_y)
         self.camera = Camera(screen_width, screen_height)
-        self.state = STATE_PLAYING
+        self.camera.snap(self.player, self.current_map.width, self.current_map.height)
+        self.layout_buttons(screen_width, screen_height)
+
+    def layout_buttons(self, screen_w, screen_h):
+        """Create the end screen buttons, sized for the level's window"""
+        btn_width = min(250, screen_w - 100)
+        btn_height = min(50, screen_h // 12)
+        btn_x = screen_w // 2 - btn_width // 2
+        btn_spacing = btn_height + 20
+        btn_y = int(screen_h * 0.5)
+
+        labels = ["RESTART", "MENU"]
+        if self.current_level + 1 < len(self.available_levels):
+            labels.insert(1, "NEXT LEVEL")
+        self.win_buttons = ButtonGroup(
+            Button(btn_x, btn_y + i * btn_spacing, btn_width, btn_height, label, BUTTON_COLORS[label])
+            for i, label in enumerate(labels))
+        self.dead_buttons = ButtonGroup(
+            Button(btn_x, btn_y + i * btn_spacing, btn_width, btn_height, label, BUTTON_COLORS[label])
+            for i, label in enumerate(("RESTART", "MENU")))
 
     def restart_level(self):
-        self.player.reset(self.current_map.player_spawn_x, self.current_map.player_spawn_y)
-        self.current_map.reset_stars()
-        self.state = STATE_PLAYING
+        self.new_round()
+        self.camera.snap(self.player, self.current_map.width, self.current_map.height)
 
     def next_level(self):
         next_level = self.current_level + 1
@@ -392,36 +482,34 @@ class Game:
     def render_menu(self):
         self.screen.fill((50, 50, 80))
 
-        font_title = pygame.font.Font(None, 72)
+        font_title = get_font(72)
 
         title = font_title.render("PLATFORMER", True, (255, 255, 255))
         title_rect = title.get_rect(center=(400, 100))
         self.screen.blit(title, title_rect)
 
         # Level buttons
-        y_start = 200
-        buttons = []
-        for i, level in enumerate(self.available_levels):
-            btn = Button(250, y_start + i * 70, 300, 50, level[:-4], (70, 130, 180))
-            buttons.append(btn)
-            btn.check_hover(pygame.mouse.get_pos())
-            btn.render(self.screen)
+        self.menu_buttons.check_hover(pygame.mouse.get_pos(), self.dirty)
+        self.menu_buttons.render(self.screen)
 
-        return buttons
-
-    def render_playing(self):
+    def render_playing(self, alpha=1.0):
         self.screen.fill((135, 206, 235))
-        self.current_map.render(self.screen, self.camera.x, self.camera.y)
-        self.player.render(self.screen, self.camera.x, self.camera.y)
+        camera_x = round(lerp(self.camera.prev_x, self.camera.x, alpha))
+        camera_y = round(lerp(self.camera.prev_y, self.camera.y, alpha))
+        self.current_map.render(self.screen, camera_x, camera_y)
+        self.dirty.track("player", self.player.render(self.screen, camera_x, camera_y, alpha))
+        # Scrolling moves everything, and a collected star disappears from the map
+        self.dirty.watch("camera", (camera_x, camera_y))
+        self.dirty.watch("stars", self.player.stars_collected)
 
         # UI - Stars collected
-        font = pygame.font.Font(None, 48)
+        font = get_font(48)
         stars_text = font.render(f"Stars: {self.player.stars_collected}/{self.current_map.total_stars}", True,
                                  (255, 215, 0))
         self.screen.blit(stars_text, (10, 10))
 
         # Controls hint
-        hint_font = pygame.font.Font(None, 24)
+        hint_font = get_font(24)
         hint = hint_font.render("R-Restart  ESC-Menu", True, (255, 255, 255))
         self.screen.blit(hint, (10, self.screen.get_height() - 30))
 
@@ -435,8 +523,8 @@ class Game:
         title_size = min(72, screen_w // 8)
         text_size = min(36, screen_w // 15)
 
-        font_title = pygame.font.Font(None, title_size)
-        font_text = pygame.font.Font(None, text_size)
+        font_title = get_font(title_size)
+        font_text = get_font(text_size)
 
         title = font_title.render("LEVEL COMPLETE!", True, (255, 255, 255))
         title_rect = title.get_rect(center=(screen_w // 2, screen_h * 0.2))
@@ -447,34 +535,10 @@ class Game:
         stars_rect = stars.get_rect(center=(screen_w // 2, screen_h * 0.35))
         self.screen.blit(stars, stars_rect)
 
-        # Buttons - responsive sizing
-        btn_width = min(250, screen_w - 100)
-        btn_height = min(50, screen_h // 12)
-        btn_x = screen_w // 2 - btn_width // 2
-        btn_spacing = btn_height + 20
-
-        restart_btn = Button(btn_x, int(screen_h * 0.5), btn_width, btn_height, "RESTART", (70, 130, 180))
-        if self.current_level+1 < len(self.available_levels):
-            next_btn = Button(btn_x, int(screen_h * 0.5) + btn_spacing, btn_width, btn_height, "NEXT LEVEL", (70, 180, 70))
-            menu_btn = Button(btn_x, int(screen_h * 0.5) + btn_spacing * 2, btn_width, btn_height, "MENU", (180, 130, 70))
-        else:
-            menu_btn = Button(btn_x, int(screen_h * 0.5) + btn_spacing, btn_width, btn_height, "MENU", (180, 130, 70))
-
-        mouse_pos = pygame.mouse.get_pos()
-        restart_btn.check_hover(mouse_pos)
-        if self.current_level+1 < len(self.available_levels):
-            next_btn.check_hover(mouse_pos)
-        menu_btn.check_hover(mouse_pos)
-
-        restart_btn.render(self.screen)
-        if self.current_level+1 < len(self.available_levels):
-            next_btn.render(self.screen)
-        menu_btn.render(self.screen)
+        # Buttons
+        self.win_buttons.check_hover(pygame.mouse.get_pos(), self.dirty)
+        self.win_buttons.render(self.screen)
 
-        if self.current_level+1 < len(self.available_levels):
-            return restart_btn, next_btn, menu_btn
-        else:
-            return restart_btn, menu_btn
     def render_dead(self):
         self.screen.fill((100, 50, 50))
 
@@ -483,117 +547,81 @@ class Game:
         screen_h = self.screen.get_height()
 
         title_size = min(72, screen_w // 8)
-        font_title = pygame.font.Font(None, title_size)
+        font_title = get_font(title_size)
 
         title = font_title.render("YOU DIED!", True, (255, 100, 100))
         title_rect = title.get_rect(center=(screen_w // 2, screen_h * 0.3))
         self.screen.blit(title, title_rect)
 
-        # Buttons - responsive sizing
-        btn_width = min(250, screen_w - 100)
-        btn_height = min(50, screen_h // 12)
-        btn_x = screen_w // 2 - btn_width // 2
-        btn_spacing = btn_height + 20
+        # Buttons
+        self.dead_buttons.check_hover(pygame.mouse.get_pos(), self.dirty)
+        self.dead_buttons.render(self.screen)
 
-        restart_btn = Button(btn_x, int(screen_h * 0.5), btn_width, btn_height, "RESTART", (70, 130, 180))
-        menu_btn = Button(btn_x, int(screen_h * 0.5) + btn_spacing, btn_width, btn_height, "MENU", (180, 130, 70))
-
-        mouse_pos = pygame.mouse.get_pos()
-        restart_btn.check_hover(mouse_pos)
-        menu_btn.check_hover(mouse_pos)
-
-        restart_btn.render(self.screen)
-        menu_btn.render(self.screen)
-
-        return restart_btn, menu_btn
+    def held_actions(self, keys):
+        """Simulation actions of the keys held down"""
+        actions = set()
+        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+            actions.add("left")
+        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+            actions.add("right")
+        if keys[pygame.K_UP] or keys[pygame.K_w] or keys[pygame.K_SPACE]:
+            actions.add("jump")
+        return actions
 
-    async def run(self):
-        import asyncio
-        running = True
-        while running:
-            clock.tick(FPS)
-            await asyncio.sleep(0)  # Yield control to event loop for pygbag
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    pygame.quit()
-                    sys.exit()
-
-                if event.type == pygame.KEYDOWN:
-                    if self.state == STATE_PLAYING:
-                        if event.key == pygame.K_r:
-                            self.restart_level()
-                        elif event.key == pygame.K_ESCAPE:
-                            self.state = STATE_MENU
-                            self.init_menu()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-
-                    if self.state == STATE_MENU:
-                        buttons = self.render_menu()
-                        for i, btn in enumerate(buttons):
-                            if btn.check_click(mouse_pos):
-                                self.load_level(i)
-
-                    elif self.state == STATE_WIN:
-                        if self.current_level + 1 < len(self.available_levels):
-                            restart_btn, next_btn, menu_btn = self.render_win()
-                        else:
-                            restart_btn, menu_btn = self.render_win()
-
-                        if self.current_level + 1 < len(self.available_levels):
-                            if restart_btn.check_click(mouse_pos):
-                                self.restart_level()
-
-                            elif next_btn.check_click(mouse_pos):
-                                self.next_level()
-
-                            elif menu_btn.check_click(mouse_pos):
-                                self.state = STATE_MENU
-                                self.init_menu()
-
-                        else:
-
-                            if restart_btn.check_click(mouse_pos):
-                                self.restart_level()
-
-                            elif menu_btn.check_click(mouse_pos):
-                                self.state = STATE_MENU
-                                self.init_menu()
-
-                    elif self.state == STATE_DEAD:
-                        restart_btn, menu_btn = self.render_dead()
-                        if restart_btn.check_click(mouse_pos):
-                            self.restart_level()
-                        elif menu_btn.check_click(mouse_pos):
-                            self.state = STATE_MENU
-                            self.init_menu()
-
-            # Game logic
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
             if self.state == STATE_PLAYING:
-                keys = pygame.key.get_pressed()
-                self.player.move(keys, self.current_map.tiles)
-                self.current_map.check_stars(self.player)
-                self.camera.update(self.player, self.current_map.width, self.current_map.height)
-
-                # Check win condition
-                if self.player.stars_collected >= self.current_map.total_stars:
-                    self.state = STATE_WIN
+                if event.key == pygame.K_r:
+                    self.restart_level()
+                elif event.key == pygame.K_ESCAPE:
+                    self.state = STATE_MENU
+                    self.init_menu()
 
-                # Check death
-                if self.player.check_death(self.current_map.height, self.current_map.spikes):
-                    self.state = STATE_DEAD
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
 
-            # Rendering
             if self.state == STATE_MENU:
-                self.render_menu()
-            elif self.state == STATE_PLAYING:
-                self.render_playing()
-            elif self.state == STATE_WIN:
-                self.render_win()
-            elif self.state == STATE_DEAD:
-                self.render_dead()
-
-            pygame.display.update()
\ No newline at end of file
+                btn = self.menu_buttons.at(mouse_pos)
+                if btn is not None:
+                    self.load_level(self.menu_buttons.buttons.index(btn))
+
+            elif self.state == STATE_WIN or self.state == STATE_DEAD:
+                group = self.win_buttons if self.state == STATE_WIN else self.dead_buttons
+                btn = group.at(mouse_pos)
+                if btn is None:
+                    return
+                if btn.text == "RESTART":
+                    self.restart_level()
+                elif btn.text == "NEXT LEVEL":
+                    self.next_level()
+                elif btn.text == "MENU":
+                    self.state = STATE_MENU
+                    self.init_menu()
+
+    @property
+    def idle(self):
+        """Nothing moves in the menu and end screens, the loop only redraws on input"""
+        return self.state != STATE_PLAYING
+
+    def update(self):
+        """One simulation tick"""
+        if self.state == STATE_PLAYING:
+            self.step(self.held_actions(pygame.key.get_pressed()))
+            self.camera.update(self.player, self.current_map.width, self.current_map.height)
+
+    def render(self, alpha):
+        # Every state draws a different screen (and levels resize the window)
+        self.dirty.watch("state", (self.state, self.current_level))
+        if self.state == STATE_MENU:
+            self.render_menu()
+        elif self.state == STATE_PLAYING:
+            self.render_playing(alpha)
+        elif self.state == STATE_WIN:
+            self.render_win()
+        elif self.state == STATE_DEAD:
+            self.render_dead()
+
+    async def run(self):
+        # Load the tile images while the menu is up, so starting a level doesn't stall
+        self.preload_task = asyncio.create_task(assets.preload(image_paths("img")))
+        await FixedStepLoop(TICKS_PER_SECOND, RENDER_FPS).run(self)
@@ -1,10 +1,20 @@
+import os
+import sys
 import pygame
 import random
 import math
 
+# The shared engine package sits next to the game folders (build_games.py copies it into builds)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import simulation
+from engine.dirty import DirtyRects
+from engine.loop import FixedStepLoop, lerp
+from engine.text import get_font
+from engine.widgets import Button
+
 # Game settings
-FPS = 60
-clock = pygame.time.Clock()
+TICKS_PER_SECOND = 60  # simulation steps; speeds below are pixels per tick
+RENDER_FPS = 60
 
 # Game states
 STATE_WAITING = "waiting"
@@ -30,12 +40,14 @@ class Paddle:
     def __init__(self, x, y, width=PADDLE_WIDTH, height=PADDLE_HEIGHT):
         self.x = x
         self.y = y
+        self.prev_y = y  # position before the last update, for interpolation
         self.width = width
         self.height = height
         self.vel_y = 0
         self.score = 0
 
     def update(self, game_height, ui_height):
+        self.prev_y = self.y
         self.y += self.vel_y
         # Keep paddle on screen (accounting for UI offset)
         min_y = ui_height
@@ -45,18 +57,22 @@ class Paddle:
         elif self.y > max_y:
             self.y = max_y
 
-    def render(self, window):
-        paddle_rect = pygame.Rect(self.x, self.y, self.width, self.height)
+    def render(self, window, alpha=1.0):
+        paddle_rect = pygame.Rect(self.x, round(lerp(self.prev_y, self.y, alpha)), self.width, self.height)
         pygame.draw.rect(window, COLOR_WHITE, paddle_rect)
+        return paddle_rect
 
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
 
 class Ball:
-    def __init__(self, x, y, size=BALL_SIZE):
+    def __init__(self, x, y, size=BALL_SIZE, rng=random):
+        self.rng = rng
         self.x = x
         self.y = y
+        self.prev_x = x  # position before the last update, for interpolation
+        self.prev_y = y
         self.size = size
         self.vel_x = BALL_SPEED
         self.vel_y = BALL_SPEED
@@ -67,8 +83,8 @@ class Ball:
         if reset_speed:
             self.horizontal_speed = BALL_SPEED
         # Randomize initial direction
-        direction = random.choice([-1, 1])
-        angle = random.uniform(-math.pi / 4, math.pi / 4)
+        direction = self.rng.choice([-1, 1])
+        angle = self.rng.uniform(-math.pi / 4, math.pi / 4)
         self.vel_x = direction * self.horizontal_speed * math.cos(angle)
         self.vel_y = self.horizontal_speed * math.sin(angle)
 
@@ -77,6 +93,8 @@ class Ball:
         self.horizontal_speed *= factor
 
     def update(self, screen_width, game_height, ui_height, paddle_left, paddle_right):
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.x += self.vel_x
         self.y += self.vel_y
 
@@ -133,49 +151,32 @@ class Ball:
     def reset(self, screen_width, game_height, ui_height, reset_speed=True):
         self.x = screen_width // 2 - self.size // 2
         self.y = ui_height + game_height // 2 - self.size // 2
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.reset_velocity(reset_speed=reset_speed)
 
-    def render(self, window):
-        ball_rect = pygame.Rect(self.x, self.y, self.size, self.size)
+    def render(self, window, alpha=1.0):
+        ball_rect = pygame.Rect(round(lerp(self.prev_x, self.x, alpha)), round(lerp(self.prev_y, self.y, alpha)),
+                                self.size, self.size)
         pygame.draw.rect(window, COLOR_WHITE, ball_rect)
+        return ball_rect
 
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.size, self.size)
 
 
-class Button:
-    def __init__(self, x, y, width, height, text):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.is_hovered = False
-
-    def check_hover(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
-
-    def check_click(self, mouse_pos):
-        return self.rect.collidepoint(mouse_pos)
+class Simulation(simulation.Simulation):
+    """Pong without a display, one step is one tick"""
 
-    def render(self, window):
-        color = COLOR_WHITE if self.is_hovered else COLOR_GRAY
-        pygame.draw.rect(window, color, self.rect)
-        pygame.draw.rect(window, COLOR_WHITE, self.rect, 2)
+    ACTIONS = ("left_up", "left_down", "right_up", "right_down")
 
-        font = pygame.font.Font(None, 36)
-        text_surf = font.render(self.text, True, COLOR_BLACK)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        window.blit(text_surf, text_rect)
-
-
-class Game:
-    def __init__(self):
+    def __init__(self, seed=None):
+        super().__init__(seed)
         self.screen_width = 800
         self.screen_height = 600
         self.ui_height = 60
         self.game_height = self.screen_height - self.ui_height
         
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), 0, 32)
-        pygame.display.set_caption("Pong - 2 Player")
-        
         self.state = STATE_WAITING
         
         # Create paddles (accounting for UI offset)
@@ -186,7 +187,7 @@ class Game:
         
         # Create ball (accounting for UI offset)
         self.ball = Ball(self.screen_width // 2 - BALL_SIZE // 2, 
-                        self.ui_height + self.game_height // 2 - BALL_SIZE // 2)
+                        self.ui_height + self.game_height // 2 - BALL_SIZE // 2, rng=self.rng)
         
         # Reset everything
         self.reset_game()
@@ -194,8 +195,8 @@ class Game:
     def reset_game(self):
         self.paddle_left.score = 0
         self.paddle_right.score = 0
-        self.paddle_left.y = self.ui_height + self.game_height // 2 - PADDLE_HEIGHT // 2
-        self.paddle_right.y = self.ui_height + self.game_height // 2 - PADDLE_HEIGHT // 2
+        self.paddle_left.y = self.paddle_left.prev_y = self.ui_height + self.game_height // 2 - PADDLE_HEIGHT // 2
+        self.paddle_right.y = self.paddle_right.prev_y = self.ui_height + self.game_height // 2 - PADDLE_HEIGHT // 2
         self.ball.reset(self.screen_width, self.game_height, self.ui_height, reset_speed=True)
         self.state = STATE_WAITING
 
@@ -203,6 +204,71 @@ class Game:
         self.ball.reset(self.screen_width, self.game_height, self.ui_height, reset_speed=True)
         self.state = STATE_PLAYING
 
+    def restart(self):
+        self.reset_game()
+        self.start_game()
+
+    @property
+    def score(self):
+        return self.paddle_left.score, self.paddle_right.score
+
+    @property
+    def done(self):
+        return self.state == STATE_GAME_OVER
+
+    def tick(self, inputs):
+        if self.state != STATE_PLAYING:
+            return
+
+        # Player 1 controls
+        if "left_up" in inputs:
+            self.paddle_left.vel_y = -PADDLE_SPEED
+        elif "left_down" in inputs:
+            self.paddle_left.vel_y = PADDLE_SPEED
+        else:
+            self.paddle_left.vel_y = 0
+
+        # Player 2 controls
+        if "right_up" in inputs:
+            self.paddle_right.vel_y = -PADDLE_SPEED
+        elif "right_down" in inputs:
+            self.paddle_right.vel_y = PADDLE_SPEED
+        else:
+            self.paddle_right.vel_y = 0
+
+        # Update paddles
+        self.paddle_left.update(self.game_height, self.ui_height)
+        self.paddle_right.update(self.game_height, self.ui_height)
+
+        # Update ball and check for scoring (speed increase happens in ball.update() on paddle hits)
+        score_result = self.ball.update(self.screen_width, self.game_height, self.ui_height,
+                                      self.paddle_left, self.paddle_right)
+
+        if score_result == "left_score":
+            self.paddle_left.score += 1
+            if self.paddle_left.score >= WIN_SCORE:
+                self.state = STATE_GAME_OVER
+            else:
+                self.ball.reset(self.screen_width, self.game_height, self.ui_height, reset_speed=True)
+
+        elif score_result == "right_score":
+            self.paddle_right.score += 1
+            if self.paddle_right.score >= WIN_SCORE:
+                self.state = STATE_GAME_OVER
+            else:
+                self.ball.reset(self.screen_width, self.game_height, self.ui_height, reset_speed=True)
+
+
+class Game(Simulation):
+    def __init__(self):
+        super().__init__()
+
+        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), 0, 32)
+        self.dirty = DirtyRects()
+        pygame.display.set_caption("Pong - 2 Player")
+        self.start_btn = Button(self.screen_width // 2 - 50, 10, 100, 40, "START")
+        self.restart_btn = Button(self.screen_width // 2 - 100, self.screen_height // 2 + 60, 200, 50, "RESTART")
+
     def render_ui(self):
         # UI Panel at top
         ui_panel = pygame.Rect(0, 0, self.screen_width, self.ui_height)
@@ -210,7 +276,7 @@ class Game:
         pygame.draw.line(self.screen, COLOR_WHITE, (0, self.ui_height), 
                         (self.screen_width, self.ui_height), 2)
 
-        font = pygame.font.Font(None, 36)
+        font = get_font(36)
         
         # Left player score
         left_score_text = font.render(f"Player 1: {self.paddle_left.score}", True, COLOR_WHITE)
@@ -220,23 +286,21 @@ class Game:
         right_score_text = font.render(f"Player 2: {self.paddle_right.score}", True, COLOR_WHITE)
         right_score_x = self.screen_width - right_score_text.get_width() - 20
         self.screen.blit(right_score_text, (right_score_x, 15))
+        self.dirty.watch("scores", (self.paddle_left.score, self.paddle_right.score), ui_panel)
         
         # Controls info
-        controls_font = pygame.font.Font(None, 24)
+        controls_font = get_font(24)
         controls_text = controls_font.render("P1: W/S  P2: Arrow Keys", True, COLOR_GRAY)
         controls_x = self.screen_width // 2 - controls_text.get_width() // 2
         self.screen.blit(controls_text, (controls_x, 20))
         
         # Start button (only show when waiting)
         if self.state == STATE_WAITING:
-            start_btn = Button(self.screen_width // 2 - 50, 10, 100, 40, "START")
-            start_btn.check_hover(pygame.mouse.get_pos())
-            start_btn.render(self.screen)
-            return start_btn
-        
-        return None
+            self.start_btn.check_hover(pygame.mouse.get_pos())
+            self.start_btn.render(self.screen)
+            self.dirty.watch("start_hover", self.start_btn.is_hovered, self.start_btn.rect)
 
-    def render_playing(self):
+    def render_playing(self, alpha=1.0):
         # Black background
         self.screen.fill(COLOR_BLACK)
         
@@ -251,11 +315,11 @@ class Game:
             y += dash_length + gap_length
         
         # Render paddles
-        self.paddle_left.render(self.screen)
-        self.paddle_right.render(self.screen)
+        self.dirty.track("paddle_left", self.paddle_left.render(self.screen, alpha))
+        self.dirty.track("paddle_right", self.paddle_right.render(self.screen, alpha))
         
         # Render ball
-        self.ball.render(self.screen)
+        self.dirty.track("ball", self.ball.render(self.screen, alpha))
         
         # Render UI
         self.render_ui()
@@ -280,12 +344,12 @@ class Game:
         else:
             winner = "Player 2 Wins!"
 
-        font_title = pygame.font.Font(None, 72)
+        font_title = get_font(72)
         title = font_title.render(winner, True, COLOR_WHITE)
         title_rect = title.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 50))
         self.screen.blit(title, title_rect)
 
-        font_score = pygame.font.Font(None, 48)
+        font_score = get_font(48)
         score_text = font_score.render(
             f"{self.paddle_left.score} - {self.paddle_right.score}", 
             True, COLOR_WHITE)
@@ -293,117 +357,77 @@ class Game:
         self.screen.blit(score_text, score_rect)
 
         # Restart button
-        btn_width = 200
-        btn_height = 50
-        btn_x = self.screen_width // 2 - btn_width // 2
+        self.restart_btn.check_hover(pygame.mouse.get_pos())
+        self.restart_btn.render(self.screen)
+        self.dirty.watch("restart_hover", self.restart_btn.is_hovered, self.restart_btn.rect)
+
+    def held_actions(self, keys):
+        """Simulation actions of the keys held down"""
+        actions = set()
+        # Player 1 controls (W/S)
+        if keys[pygame.K_w]:
+            actions.add("left_up")
+        if keys[pygame.K_s]:
+            actions.add("left_down")
+        # Player 2 controls (Arrow keys)
+        if keys[pygame.K_UP]:
+            actions.add("right_up")
+        if keys[pygame.K_DOWN]:
+            actions.add("right_down")
+        return actions
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if self.state == STATE_WAITING and event.key == pygame.K_SPACE:
+                self.new_round()
+            elif self.state == STATE_PLAYING and event.key == pygame.K_SPACE:
+                # Pause/Unpause
+                self.state = STATE_PAUSED if self.state == STATE_PLAYING else STATE_PLAYING
+            elif self.state == STATE_PAUSED and event.key == pygame.K_SPACE:
+                self.state = STATE_PLAYING
+            elif self.state == STATE_GAME_OVER and event.key == pygame.K_SPACE:
+                self.new_round()
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
 
-        restart_btn = Button(btn_x, self.screen_height // 2 + 60, btn_width, btn_height, "RESTART")
-        restart_btn.check_hover(pygame.mouse.get_pos())
-        restart_btn.render(self.screen)
+            if self.state == STATE_WAITING:
+                if self.start_btn.check_click(mouse_pos):
+                    self.new_round()
 
-        return restart_btn
+            elif self.state == STATE_GAME_OVER:
+                if self.restart_btn.check_click(mouse_pos):
+                    self.new_round()
 
-    def handle_input(self, keys):
-        if self.state == STATE_PLAYING:
-            # Player 1 controls (W/S or Up/Down arrow)
-            if keys[pygame.K_w]:
-                self.paddle_left.vel_y = -PADDLE_SPEED
-            elif keys[pygame.K_s]:
-                self.paddle_left.vel_y = PADDLE_SPEED
-            else:
-                self.paddle_left.vel_y = 0
+    @property
+    def idle(self):
+        """Nothing moves outside of play, the loop only redraws on input"""
+        return self.state != STATE_PLAYING
 
-            # Player 2 controls (Arrow keys)
-            if keys[pygame.K_UP]:
-                self.paddle_right.vel_y = -PADDLE_SPEED
-            elif keys[pygame.K_DOWN]:
-                self.paddle_right.vel_y = PADDLE_SPEED
-            else:
-                self.paddle_right.vel_y = 0
+    def update(self):
+        """One simulation tick"""
+        if self.state == STATE_PLAYING:
+            self.step(self.held_actions(pygame.key.get_pressed()))
+
+    def render(self, alpha):
+        # Objects only move while playing, other states draw the last positions
+        if self.state != STATE_PLAYING:
+            alpha = 1.0
+        # The overlays cover everything, so a state change redraws the whole screen
+        self.dirty.watch("state", self.state)
+        if self.state == STATE_WAITING:
+            self.render_waiting()
+        elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
+            self.render_playing(alpha)
+            if self.state == STATE_PAUSED:
+                # Draw pause overlay
+                font = get_font(72)
+                pause_text = font.render("PAUSED", True, COLOR_WHITE)
+                pause_rect = pause_text.get_rect(center=(self.screen_width // 2,
+                                                        self.screen_height // 2))
+                self.screen.blit(pause_text, pause_rect)
+        elif self.state == STATE_GAME_OVER:
+            self.render_game_over()
 
     async def run(self):
-        import asyncio
-        running = True
-
-        while running:
-            clock.tick(FPS)
-            await asyncio.sleep(0)  # Yield control to event loop for pygbag
-
-            keys = pygame.key.get_pressed()
-            
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    pygame.quit()
-                    return
-
-                if event.type == pygame.KEYDOWN:
-                    if self.state == STATE_WAITING and event.key == pygame.K_SPACE:
-                        self.start_game()
-                    elif self.state == STATE_PLAYING and event.key == pygame.K_SPACE:
-                        # Pause/Unpause
-                        self.state = STATE_PAUSED if self.state == STATE_PLAYING else STATE_PLAYING
-                    elif self.state == STATE_PAUSED and event.key == pygame.K_SPACE:
-                        self.state = STATE_PLAYING
-                    elif self.state == STATE_GAME_OVER and event.key == pygame.K_SPACE:
-                        self.reset_game()
-                        self.start_game()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-
-                    if self.state == STATE_WAITING:
-                        start_btn = self.render_ui()
-                        if start_btn and start_btn.check_click(mouse_pos):
-                            self.start_game()
-
-                    elif self.state == STATE_GAME_OVER:
-                        restart_btn = self.render_game_over()
-                        if restart_btn and restart_btn.check_click(mouse_pos):
-                            self.reset_game()
-                            self.start_game()
-
-            # Game logic
-            if self.state == STATE_PLAYING:
-                # Handle input
-                self.handle_input(keys)
-                
-                # Update paddles
-                self.paddle_left.update(self.game_height, self.ui_height)
-                self.paddle_right.update(self.game_height, self.ui_height)
-                
-                # Update ball and check for scoring (speed increase happens in ball.update() on paddle hits)
-                score_result = self.ball.update(self.screen_width, self.game_height, self.ui_height,
-                                              self.paddle_left, self.paddle_right)
-                
-                if score_result == "left_score":
-                    self.paddle_left.score += 1
-                    if self.paddle_left.score >= WIN_SCORE:
-                        self.state = STATE_GAME_OVER
-                    else:
-                        self.ball.reset(self.screen_width, self.game_height, self.ui_height, reset_speed=True)
-                
-                elif score_result == "right_score":
-                    self.paddle_right.score += 1
-                    if self.paddle_right.score >= WIN_SCORE:
-                        self.state = STATE_GAME_OVER
-                    else:
-                        self.ball.reset(self.screen_width, self.game_height, self.ui_height, reset_speed=True)
-
-            # Rendering
-            if self.state == STATE_WAITING:
-                self.render_waiting()
-            elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
-                self.render_playing()
-                if self.state == STATE_PAUSED:
-                    # Draw pause overlay
-                    font = pygame.font.Font(None, 72)
-                    pause_text = font.render("PAUSED", True, COLOR_WHITE)
-                    pause_rect = pause_text.get_rect(center=(self.screen_width // 2, 
-                                                            self.screen_height // 2))
-                    self.screen.blit(pause_text, pause_rect)
-            elif self.state == STATE_GAME_OVER:
-                self.render_game_over()
-
-            pygame.display.update()
-
+        await FixedStepLoop(TICKS_PER_SECOND, RENDER_FPS).run(self)
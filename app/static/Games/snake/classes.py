@@ -1,9 +1,18 @@
+import os
+import sys
 import pygame
 import random
 
+# The shared engine package sits next to the game folders (build_games.py copies it into builds)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import simulation, widgets
+from engine.dirty import DirtyRects
+from engine.loop import FixedStepLoop
+from engine.text import get_font
+
 # Game settings
-FPS = 10
-clock = pygame.time.Clock()
+MOVES_PER_SECOND = 6  # simulation steps, one snake move each
+RENDER_FPS = 60
 
 # Game states
 STATE_PLAYING = "playing"
@@ -22,6 +31,7 @@ DIR_UP = (0, -1)
 DIR_DOWN = (0, 1)
 DIR_LEFT = (-1, 0)
 DIR_RIGHT = (1, 0)
+DIRECTIONS = {"up": DIR_UP, "down": DIR_DOWN, "left": DIR_LEFT, "right": DIR_RIGHT}
 
 
 class Tile:
@@ -51,7 +61,8 @@ class Tile:
 
 
 class Field:
-    def __init__(self, width=20, height=20):
+    def __init__(self, width=20, height=20, rng=random):
+        self.rng = rng
         self.width = width
         self.height = height
         self.field = []
@@ -62,10 +73,12 @@ class Field:
         self.alive = True
         self.score = 0
         self.grow_next_move = False
+        self.changed = None  # (x, y) of tiles changed since the last frame, None if all of them
         self.initialize_field()
 
     def initialize_field(self):
         # Create field with walls on borders
+        self.changed = None
         self.field = []
         for y in range(self.height):
             row = []
@@ -92,7 +105,7 @@ class Field:
         # Update field with snake
         for x, y in self.snake:
             if 0 < x < self.width - 1 and 0 < y < self.height - 1:
-                self.field[y][x].change("S")
+                self.set_tile(x, y, "S")
         
         # Spawn apple
         self.spawn_apple()
@@ -106,8 +119,8 @@ class Field:
                     empty_positions.append((x, y))
         
         if empty_positions:
-            self.apple_pos = random.choice(empty_positions)
-            self.field[self.apple_pos[1]][self.apple_pos[0]].change("A")
+            self.apple_pos = self.rng.choice(empty_positions)
+            self.set_tile(self.apple_pos[0], self.apple_pos[1], "A")
             return True
         return False
 
@@ -145,20 +158,25 @@ class Field:
 
         # Add new head
         self.snake.insert(0, (new_head_x, new_head_y))
-        self.field[new_head_y][new_head_x].change("S")
+        self.set_tile(new_head_x, new_head_y, "S")
 
         # Check if apple is eaten
         if self.apple_pos and (new_head_x, new_head_y) == self.apple_pos:
             # Apple eaten - snake grows (don't remove tail)
             self.score += 10
             self.apple_pos = None
-            self.field[new_head_y][new_head_x].change("S")
+            self.set_tile(new_head_x, new_head_y, "S")
             self.spawn_apple()
         else:
             # No apple eaten - remove tail to maintain length
             tail_x, tail_y = self.snake.pop()
             if 0 < tail_x < self.width - 1 and 0 < tail_y < self.height - 1:
-                self.field[tail_y][tail_x].change(None)
+                self.set_tile(tail_x, tail_y, None)
+
+    def set_tile(self, x, y, value):
+        self.field[y][x].change(value)
+        if self.changed is not None:
+            self.changed.append((x, y))
 
     def render(self, window, y_offset=0):
         for row in self.field:
@@ -169,38 +187,48 @@ class Field:
                 tile_copy.render(window)
 
 
-class Button:
+class Button(widgets.Button):
     def __init__(self, x, y, width, height, text, color):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.color = color
-        self.hover_color = (min(color[0] + 30, 255), min(color[1] + 30, 255), min(color[2] + 30, 255))
-        self.is_hovered = False
+        super().__init__(x, y, width, height, text, color, widgets.lighten(color),
+                         text_color=COLOR_WHITE, border=3)
 
-    def check_hover(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
 
-    def check_click(self, mouse_pos):
-        return self.rect.collidepoint(mouse_pos)
+class Simulation(simulation.Simulation):
+    """Snake without a display, one step is one move"""
 
-    def render(self, window):
-        color = self.hover_color if self.is_hovered else self.color
-        pygame.draw.rect(window, color, self.rect)
-        pygame.draw.rect(window, COLOR_WHITE, self.rect, 3)
+    ACTIONS = tuple(DIRECTIONS)
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.field = Field(20, 20, self.rng)
+        self.field.reset()
 
-        font = pygame.font.Font(None, 36)
-        text_surf = font.render(self.text, True, COLOR_WHITE)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        window.blit(text_surf, text_rect)
+    def restart(self):
+        self.field.reset()
+
+    def tick(self, inputs):
+        for action in inputs:
+            self.field.change_direction(DIRECTIONS[action])
+        self.field.move()
+
+    @property
+    def score(self):
+        return self.field.score
 
+    @property
+    def done(self):
+        return not self.field.alive
 
-class Game:
+
+class Game(Simulation):
     def __init__(self):
+        super().__init__()
         self.state = STATE_WAITING
-        self.field = Field(20, 20)
         self.screen = None
+        self.dirty = None
         self.high_score = 0
         self.ui_height = 60
+        self.pressed = []  # directions pressed since the last move
         self.start_game_screen()
 
     def start_game_screen(self):
@@ -208,12 +236,16 @@ class Game:
         screen_width = self.field.width * 32
         screen_height = self.field.height * 32 + self.ui_height
         self.screen = pygame.display.set_mode((screen_width, screen_height), 0, 32)
+        self.dirty = DirtyRects()
         pygame.display.set_caption("Snake Game")
+        self.start_btn = Button(screen_width - 120, 10, 100, 40, "START", (70, 180, 70))
+        self.restart_btn = Button(screen_width // 2 - 100, screen_height // 2 + 60, 200, 50, "RESTART", (70, 130, 180))
         self.field.reset()
         self.state = STATE_WAITING
 
     def start_game(self):
-        self.field.reset()
+        self.new_round()
+        self.pressed = []
         self.state = STATE_PLAYING
 
     def render_waiting(self):
@@ -277,7 +309,7 @@ class Game:
         pygame.draw.rect(self.screen, (30, 30, 30), ui_panel)
         pygame.draw.line(self.screen, COLOR_PURPLE, (0, self.ui_height), (self.screen.get_width(), self.ui_height), 2)
 
-        font = pygame.font.Font(None, 36)
+        font = get_font(36)
         
         # Score
         score_text = font.render(f"Score: {self.field.score}", True, COLOR_WHITE)
@@ -287,15 +319,13 @@ class Game:
         high_score_text = font.render(f"High Score: {self.high_score}", True, COLOR_WHITE)
         high_score_x = self.screen.get_width() // 2 - high_score_text.get_width() // 2
         self.screen.blit(high_score_text, (high_score_x, 15))
+        self.dirty.watch("scores", (self.field.score, self.high_score), ui_panel)
         
         # Start button (only show when waiting)
         if self.state == STATE_WAITING:
-            start_btn = Button(self.screen.get_width() - 120, 10, 100, 40, "START", (70, 180, 70))
-            start_btn.check_hover(pygame.mouse.get_pos())
-            start_btn.render(self.screen)
-            return start_btn
-        
-        return None
+            self.start_btn.check_hover(pygame.mouse.get_pos())
+            self.start_btn.render(self.screen)
+            self.dirty.watch("start_hover", self.start_btn.is_hovered, self.start_btn.rect)
 
     def render_game_over(self):
         # Draw game field in background
@@ -334,96 +364,87 @@ class Game:
         screen_w = self.screen.get_width()
         screen_h = self.screen.get_height()
 
-        font_title = pygame.font.Font(None, 72)
+        font_title = get_font(72)
         title = font_title.render("GAME OVER", True, COLOR_RED)
         title_rect = title.get_rect(center=(screen_w // 2, screen_h // 2 - 50))
         self.screen.blit(title, title_rect)
 
-        font_score = pygame.font.Font(None, 48)
+        font_score = get_font(48)
         score_text = font_score.render(f"Final Score: {self.field.score}", True, COLOR_WHITE)
         score_rect = score_text.get_rect(center=(screen_w // 2, screen_h // 2))
         self.screen.blit(score_text, score_rect)
 
         # Restart button
-        btn_width = 200
-        btn_height = 50
-        btn_x = screen_w // 2 - btn_width // 2
+        self.restart_btn.check_hover(pygame.mouse.get_pos())
+        self.restart_btn.render(self.screen)
+        self.dirty.watch("restart_hover", self.restart_btn.is_hovered, self.restart_btn.rect)
 
-        restart_btn = Button(btn_x, screen_h // 2 + 60, btn_width, btn_height, "RESTART", (70, 130, 180))
-        restart_btn.check_hover(pygame.mouse.get_pos())
-        restart_btn.render(self.screen)
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if self.state == STATE_PLAYING:
+                if event.key == pygame.K_UP or event.key == pygame.K_w:
+                    self.pressed.append("up")
+                elif event.key == pygame.K_DOWN or event.key == pygame.K_s:
+                    self.pressed.append("down")
+                elif event.key == pygame.K_LEFT or event.key == pygame.K_a:
+                    self.pressed.append("left")
+                elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
+                    self.pressed.append("right")
+                elif event.key == pygame.K_SPACE:
+                    # Restart game
+                    self.start_game()
+            elif self.state == STATE_GAME_OVER:
+                if event.key == pygame.K_SPACE:
+                    # Restart game
+                    self.start_game()
 
-        return restart_btn
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
 
-    async def run(self):
-        import asyncio
-        running = True
-        move_timer = 0
-        move_interval = FPS  # Move every FPS frames (so 1 move per second at 10 FPS)
-
-        while running:
-            clock.tick(60)  # Run at 60 FPS for smooth input
-            await asyncio.sleep(0)  # Yield control to event loop for pygbag
-            move_timer += 1
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    pygame.quit()
-                    return
-
-                if event.type == pygame.KEYDOWN:
-                    if self.state == STATE_PLAYING:
-                        if event.key == pygame.K_UP or event.key == pygame.K_w:
-                            self.field.change_direction(DIR_UP)
-                        elif event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                            self.field.change_direction(DIR_DOWN)
-                        elif event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                            self.field.change_direction(DIR_LEFT)
-                        elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                            self.field.change_direction(DIR_RIGHT)
-                        elif event.key == pygame.K_SPACE:
-                            # Restart game
-                            self.field.reset()
-                            self.state = STATE_PLAYING
-                    elif self.state == STATE_GAME_OVER:
-                        if event.key == pygame.K_SPACE:
-                            # Restart game
-                            self.field.reset()
-                            self.state = STATE_PLAYING
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-
-                    if self.state == STATE_WAITING:
-                        start_btn = self.render_ui()
-                        if start_btn and start_btn.check_click(mouse_pos):
-                            self.start_game()
-
-                    elif self.state == STATE_GAME_OVER:
-                        restart_btn = self.render_game_over()
-                        if restart_btn and restart_btn.check_click(mouse_pos):
-                            self.start_game()
-
-            # Game logic
-            if self.state == STATE_PLAYING:
-                # Move snake at slower rate
-                if move_timer >= move_interval:
-                    move_timer = 0
-                    self.field.move()
-                    
-                    if not self.field.alive:
-                        # Update high score
-                        if self.field.score > self.high_score:
-                            self.high_score = self.field.score
-                        self.state = STATE_GAME_OVER
-
-            # Rendering
             if self.state == STATE_WAITING:
-                self.render_waiting()
-            elif self.state == STATE_PLAYING:
-                self.render_playing()
+                if self.start_btn.check_click(mouse_pos):
+                    self.start_game()
+
             elif self.state == STATE_GAME_OVER:
-                self.render_game_over()
+                if self.restart_btn.check_click(mouse_pos):
+                    self.start_game()
+
+    @property
+    def idle(self):
+        """Nothing moves outside of play, the loop only redraws on input"""
+        return self.state != STATE_PLAYING
+
+    def update(self):
+        """One simulation step: move the snake one tile"""
+        if self.state == STATE_PLAYING:
+            self.step(self.pressed)
+            self.pressed = []
+
+            if self.done:
+                # Update high score
+                if self.field.score > self.high_score:
+                    self.high_score = self.field.score
+                self.state = STATE_GAME_OVER
+
+    def report_changed_tiles(self):
+        """Mark the tiles that changed since the last frame"""
+        if self.field.changed is None:
+            self.dirty.mark(pygame.Rect(0, self.ui_height, self.field.width * 32, self.field.height * 32))
+        else:
+            for x, y in self.field.changed:
+                self.dirty.mark(pygame.Rect(x * 32, self.ui_height + y * 32, 32, 32))
+        self.field.changed = []
+
+    def render(self, alpha):
+        # The overlays cover everything, so a state change redraws the whole screen
+        self.dirty.watch("state", self.state)
+        self.report_changed_tiles()
+        if self.state == STATE_WAITING:
+            self.render_waiting()
+        elif self.state == STATE_PLAYING:
+            self.render_playing()
+        elif self.state == STATE_GAME_OVER:
+            self.render_game_over()
 
-            pygame.display.update()
+    async def run(self):
+        await FixedStepLoop(MOVES_PER_SECOND, RENDER_FPS).run(self)
@@ -1,9 +1,18 @@
+import os
+import sys
 import pygame
-import random
+
+# The shared engine package sits next to the game folders (build_games.py copies it into builds)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import simulation
+from engine.dirty import DirtyRects
+from engine.loop import FixedStepLoop
+from engine.text import get_font
+from engine.widgets import Button
 
 # Game settings
-FPS = 20
-clock = pygame.time.Clock()
+TICKS_PER_SECOND = 20  # simulation steps; timers below count these
+RENDER_FPS = 20
 
 # Game states
 STATE_WAITING = "waiting"
@@ -29,7 +38,7 @@ BOARD_HEIGHT = 20
 CELL_SIZE = 30
 BOARD_X_OFFSET = 50
 BOARD_Y_OFFSET = 80
-FALL_SPEED_INITIAL = 30  # frames per cell drop
+FALL_SPEED_INITIAL = 30  # ticks per cell drop
 SCORE_PER_LINE = 100
 SCORE_PER_TETRIS = 400  # 4 lines at once
 
@@ -188,42 +197,18 @@ class Board:
         pygame.draw.rect(window, COLOR_WHITE, board_rect, 3)
 
 
-class Button:
-    def __init__(self, x, y, width, height, text):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.is_hovered = False
-
-    def check_hover(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
-
-    def check_click(self, mouse_pos):
-        return self.rect.collidepoint(mouse_pos)
-
-    def render(self, window):
-        color = COLOR_WHITE if self.is_hovered else COLOR_GRAY
-        pygame.draw.rect(window, color, self.rect)
-        pygame.draw.rect(window, COLOR_WHITE, self.rect, 2)
+class Simulation(simulation.Simulation):
+    """Tetris without a display, one step is one tick"""
 
-        font = pygame.font.Font(None, 36)
-        text_surf = font.render(self.text, True, COLOR_BLACK)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        window.blit(text_surf, text_rect)
+    ACTIONS = ("left", "right", "down", "rotate", "drop")
 
-
-class Game:
-    def __init__(self):
-        self.screen_width = BOARD_WIDTH * CELL_SIZE + 300
-        self.screen_height = BOARD_HEIGHT * CELL_SIZE + 100
-        self.ui_height = 60
-        
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), 0, 32)
-        pygame.display.set_caption("Tetris")
-        
+    def __init__(self, seed=None):
+        super().__init__(seed)
         self.state = STATE_WAITING
         self.board = Board()
         self.current_piece = None
         self.next_piece = None
+        self.pieces = 0  # pieces spawned so far, never reset, so a change always shows
         self.score = 0
         self.lines_cleared = 0
         self.level = 1
@@ -232,6 +217,13 @@ class Game:
         
         self.reset_game()
 
+    def restart(self):
+        self.start_game()
+
+    @property
+    def done(self):
+        return self.state == STATE_GAME_OVER
+
     def reset_game(self):
         self.board = Board()
         self.score = 0
@@ -245,17 +237,18 @@ class Game:
 
     def spawn_piece(self):
         """Spawn a new tetromino"""
+        self.pieces += 1
         if self.next_piece is None:
-            shape_type = random.choice(list(TETROMINOES.keys()))
+            shape_type = self.rng.choice(list(TETROMINOES.keys()))
             self.current_piece = Tetromino(shape_type)
-            shape_type = random.choice(list(TETROMINOES.keys()))
+            shape_type = self.rng.choice(list(TETROMINOES.keys()))
             self.next_piece = Tetromino(shape_type)
         else:
             self.current_piece = self.next_piece
             self.current_piece.x = BOARD_WIDTH // 2 - 1
             self.current_piece.y = 0
             self.current_piece.rotation_index = 0
-            shape_type = random.choice(list(TETROMINOES.keys()))
+            shape_type = self.rng.choice(list(TETROMINOES.keys()))
             self.next_piece = Tetromino(shape_type)
 
     def start_game(self):
@@ -323,6 +316,48 @@ class Game:
             self.score += 2  # Bonus for hard drop
         self.drop_piece()  # Final placement
 
+    def tick(self, inputs):
+        """Rotate and drop are presses (in order, repeats count), left, right and down are held"""
+        if self.state != STATE_PLAYING:
+            return
+        for action in inputs:
+            if action == "rotate":
+                self.rotate_piece()
+            elif action == "drop":
+                self.hard_drop()
+        if self.state != STATE_PLAYING:
+            return
+
+        if "left" in inputs:
+            self.move_piece(-1, 0)
+        elif "right" in inputs:
+            self.move_piece(1, 0)
+        elif "down" in inputs:
+            if self.move_piece(0, 1):
+                self.score += 1  # Bonus for soft drop
+
+        # Auto drop
+        self.fall_timer += 1
+        if self.fall_timer >= self.fall_speed:
+            self.fall_timer = 0
+            self.drop_piece()
+
+
+class Game(Simulation):
+    def __init__(self):
+        self.screen_width = BOARD_WIDTH * CELL_SIZE + 300
+        self.screen_height = BOARD_HEIGHT * CELL_SIZE + 100
+        self.ui_height = 60
+        
+        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), 0, 32)
+        self.dirty = DirtyRects()
+        pygame.display.set_caption("Tetris")
+        self.start_btn = Button(self.screen_width - 120, 10, 100, 40, "START")
+        self.restart_btn = Button(self.screen_width // 2 - 100, self.screen_height // 2 + 100, 200, 50, "RESTART")
+        self.pressed = []  # rotations and drops pressed since the last tick
+        
+        super().__init__()
+
     def render_ui(self):
         """Render UI panel"""
         ui_panel = pygame.Rect(0, 0, self.screen_width, self.ui_height)
@@ -330,7 +365,7 @@ class Game:
         pygame.draw.line(self.screen, COLOR_WHITE, (0, self.ui_height),
                         (self.screen_width, self.ui_height), 2)
 
-        font = pygame.font.Font(None, 36)
+        font = get_font(36)
         
         # Score
         score_text = font.render(f"Score: {self.score}", True, COLOR_WHITE)
@@ -343,15 +378,13 @@ class Game:
         # Level
         level_text = font.render(f"Level: {self.level}", True, COLOR_WHITE)
         self.screen.blit(level_text, (350, 15))
+        self.dirty.watch("stats", (self.score, self.lines_cleared, self.level), ui_panel)
         
         # Start button (only show when waiting)
         if self.state == STATE_WAITING:
-            start_btn = Button(self.screen_width - 120, 10, 100, 40, "START")
-            start_btn.check_hover(pygame.mouse.get_pos())
-            start_btn.render(self.screen)
-            return start_btn
-        
-        return None
+            self.start_btn.check_hover(pygame.mouse.get_pos())
+            self.start_btn.render(self.screen)
+            self.dirty.watch("start_hover", self.start_btn.is_hovered, self.start_btn.rect)
 
     def render_next_piece(self):
         """Render next piece preview"""
@@ -361,7 +394,7 @@ class Game:
         preview_x = BOARD_X_OFFSET + BOARD_WIDTH * CELL_SIZE + 20
         preview_y = BOARD_Y_OFFSET
         
-        font = pygame.font.Font(None, 24)
+        font = get_font(24)
         next_text = font.render("Next:", True, COLOR_WHITE)
         self.screen.blit(next_text, (preview_x, preview_y - 25))
         
@@ -381,9 +414,16 @@ class Game:
     def render_current_piece(self):
         """Render current falling piece"""
         if self.current_piece is None:
+            self.dirty.track("piece", None)
             return
         
         shape = self.current_piece.get_shape()
+        self.dirty.track("piece", pygame.Rect(
+            BOARD_X_OFFSET + self.current_piece.x * CELL_SIZE,
+            BOARD_Y_OFFSET + self.current_piece.y * CELL_SIZE,
+            len(shape[0]) * CELL_SIZE,
+            len(shape) * CELL_SIZE
+        ), self.current_piece.rotation_index)
         for row_idx, row in enumerate(shape):
             for col_idx, cell in enumerate(row):
                 if cell == '#':
@@ -396,6 +436,12 @@ class Game:
     def render_playing(self):
         """Render game during play"""
         self.screen.fill(COLOR_BLACK)
+
+        # The board only changes when a piece locks (and lines clear), and every lock spawns the next piece
+        board_rect = pygame.Rect(BOARD_X_OFFSET, BOARD_Y_OFFSET, BOARD_WIDTH * CELL_SIZE, BOARD_HEIGHT * CELL_SIZE)
+        self.dirty.watch("board", self.pieces, board_rect.inflate(2, 2))
+        self.dirty.watch("next", self.pieces, pygame.Rect(
+            board_rect.right, BOARD_Y_OFFSET - 25, self.screen_width - board_rect.right, 4 * CELL_SIZE + 25))
         
         # Render board
         self.board.render(self.screen, BOARD_X_OFFSET, BOARD_Y_OFFSET)
@@ -407,7 +453,7 @@ class Game:
         self.render_next_piece()
         
         # Render controls hint
-        hint_font = pygame.font.Font(None, 20)
+        hint_font = get_font(20)
         controls = [
             "A/D or Left/Right: Move",
             "W or Up: Rotate",
@@ -442,12 +488,12 @@ class Game:
         screen_w = self.screen_width
         screen_h = self.screen_height
 
-        font_title = pygame.font.Font(None, 72)
+        font_title = get_font(72)
         title = font_title.render("GAME OVER", True, COLOR_RED)
         title_rect = title.get_rect(center=(screen_w // 2, screen_h // 2 - 50))
         self.screen.blit(title, title_rect)
 
-        font_score = pygame.font.Font(None, 48)
+        font_score = get_font(48)
         score_text = font_score.render(f"Final Score: {self.score}", True, COLOR_WHITE)
         score_rect = score_text.get_rect(center=(screen_w // 2, screen_h // 2))
         self.screen.blit(score_text, score_rect)
@@ -457,101 +503,77 @@ class Game:
         self.screen.blit(lines_text, lines_rect)
 
         # Restart button
-        btn_width = 200
-        btn_height = 50
-        btn_x = screen_w // 2 - btn_width // 2
+        self.restart_btn.check_hover(pygame.mouse.get_pos())
+        self.restart_btn.render(self.screen)
+        self.dirty.watch("restart_hover", self.restart_btn.is_hovered, self.restart_btn.rect)
 
-        restart_btn = Button(btn_x, screen_h // 2 + 100, btn_width, btn_height, "RESTART")
-        restart_btn.check_hover(pygame.mouse.get_pos())
-        restart_btn.render(self.screen)
-
-        return restart_btn
-
-    def handle_input(self, keys):
-        """Handle continuous key presses"""
-        if self.state != STATE_PLAYING:
-            return
-        
+    def held_actions(self, keys):
+        """Simulation actions of the keys held down"""
+        actions = set()
         if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            self.move_piece(-1, 0)
-        elif keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            self.move_piece(1, 0)
-        elif keys[pygame.K_s] or keys[pygame.K_DOWN]:
-            if self.move_piece(0, 1):
-                self.score += 1  # Bonus for soft drop
+            actions.add("left")
+        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+            actions.add("right")
+        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+            actions.add("down")
+        return actions
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if self.state == STATE_WAITING and event.key == pygame.K_SPACE:
+                self.new_round()
+            elif self.state == STATE_PLAYING:
+                if event.key == pygame.K_w or event.key == pygame.K_UP:
+                    self.pressed.append("rotate")
+                elif event.key == pygame.K_SPACE:
+                    self.pressed.append("drop")
+                elif event.key == pygame.K_p:
+                    self.state = STATE_PAUSED if self.state == STATE_PLAYING else STATE_PLAYING
+            elif self.state == STATE_PAUSED:
+                if event.key == pygame.K_p:
+                    self.state = STATE_PLAYING
+            elif self.state == STATE_GAME_OVER:
+                if event.key == pygame.K_SPACE:
+                    self.new_round()
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
 
-    async def run(self):
-        import asyncio
-        running = True
-
-        while running:
-            clock.tick(FPS)
-            await asyncio.sleep(0)  # Yield control to event loop for pygbag
-            keys = pygame.key.get_pressed()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    pygame.quit()
-                    return
-
-                if event.type == pygame.KEYDOWN:
-                    if self.state == STATE_WAITING and event.key == pygame.K_SPACE:
-                        self.start_game()
-                    elif self.state == STATE_PLAYING:
-                        if event.key == pygame.K_w or event.key == pygame.K_UP:
-                            self.rotate_piece()
-                        elif event.key == pygame.K_SPACE:
-                            self.hard_drop()
-                        elif event.key == pygame.K_p:
-                            self.state = STATE_PAUSED if self.state == STATE_PLAYING else STATE_PLAYING
-                    elif self.state == STATE_PAUSED:
-                        if event.key == pygame.K_p:
-                            self.state = STATE_PLAYING
-                    elif self.state == STATE_GAME_OVER:
-                        if event.key == pygame.K_SPACE:
-                            self.reset_game()
-                            self.start_game()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-
-                    if self.state == STATE_WAITING:
-                        start_btn = self.render_ui()
-                        if start_btn and start_btn.check_click(mouse_pos):
-                            self.start_game()
-
-                    elif self.state == STATE_GAME_OVER:
-                        restart_btn = self.render_game_over()
-                        if restart_btn and restart_btn.check_click(mouse_pos):
-                            self.reset_game()
-                            self.start_game()
-
-            # Game logic
-            if self.state == STATE_PLAYING:
-                # Handle continuous input
-                self.handle_input(keys)
-                
-                # Auto drop
-                self.fall_timer += 1
-                if self.fall_timer >= self.fall_speed:
-                    self.fall_timer = 0
-                    self.drop_piece()
-
-            # Rendering
             if self.state == STATE_WAITING:
-                self.render_waiting()
-            elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
-                self.render_playing()
-                if self.state == STATE_PAUSED:
-                    # Draw pause overlay
-                    font = pygame.font.Font(None, 72)
-                    pause_text = font.render("PAUSED", True, COLOR_WHITE)
-                    pause_rect = pause_text.get_rect(center=(self.screen_width // 2,
-                                                            self.screen_height // 2))
-                    self.screen.blit(pause_text, pause_rect)
-            elif self.state == STATE_GAME_OVER:
-                self.render_game_over()
+                if self.start_btn.check_click(mouse_pos):
+                    self.new_round()
 
-            pygame.display.update()
+            elif self.state == STATE_GAME_OVER:
+                if self.restart_btn.check_click(mouse_pos):
+                    self.new_round()
+
+    @property
+    def idle(self):
+        """Nothing moves outside of play, the loop only redraws on input"""
+        return self.state != STATE_PLAYING
+
+    def update(self):
+        """One simulation tick"""
+        if self.state == STATE_PLAYING:
+            self.step(tuple(self.held_actions(pygame.key.get_pressed())) + tuple(self.pressed))
+            self.pressed = []
+
+    def render(self, alpha):
+        # The overlays cover everything, so a state change redraws the whole screen
+        self.dirty.watch("state", self.state)
+        if self.state == STATE_WAITING:
+            self.render_waiting()
+        elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
+            self.render_playing()
+            if self.state == STATE_PAUSED:
+                # Draw pause overlay
+                font = get_font(72)
+                pause_text = font.render("PAUSED", True, COLOR_WHITE)
+                pause_rect = pause_text.get_rect(center=(self.screen_width // 2,
+                                                        self.screen_height // 2))
+                self.screen.blit(pause_text, pause_rect)
+        elif self.state == STATE_GAME_OVER:
+            self.render_game_over()
 
+    async def run(self):
+        await FixedStepLoop(TICKS_PER_SECOND, RENDER_FPS).run(self)
@@ -1,9 +1,18 @@
+import os
+import sys
 import pygame
-import time
+
+# The shared engine package sits next to the game folders (build_games.py copies it into builds)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import simulation
+from engine.dirty import DirtyRects
+from engine.loop import FixedStepLoop
+from engine.text import get_font
+from engine.widgets import Button
 
 # Game settings
-FPS = 60
-clock = pygame.time.Clock()
+TICKS_PER_SECOND = 20  # how often the timer and live speed refresh
+RENDER_FPS = 60
 
 # Game states
 STATE_WAITING = "waiting"
@@ -11,6 +20,10 @@ STATE_PLAYING = "playing"
 STATE_PAUSED = "paused"
 STATE_GAME_OVER = "game_over"
 
+# Button inputs, recorded with the typed characters
+STOP = "stop"
+PAUSE = "pause"  # pauses, or resumes a paused test
+
 # Colors
 COLOR_BLACK = (0, 0, 0)
 COLOR_WHITE = (255, 255, 255)
@@ -29,55 +42,14 @@ LOREM_IPSUM = (
 )
 
 
-class Button:
-    def __init__(self, x, y, width, height, text):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.is_hovered = False
-
-    def check_hover(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
-
-    def check_click(self, mouse_pos):
-        return self.rect.collidepoint(mouse_pos)
-
-    def render(self, window, font):
-        color = COLOR_WHITE if self.is_hovered else COLOR_GRAY
-        pygame.draw.rect(window, color, self.rect)
-        pygame.draw.rect(window, COLOR_WHITE, self.rect, 2)
-
-        text_surf = font.render(self.text, True, COLOR_BLACK)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        window.blit(text_surf, text_rect)
+class Simulation(simulation.Simulation):
+    """Typing test without a display, on a clock that advances one tick per step"""
 
+    ACTIONS = tuple(sorted(set(LOREM_IPSUM)))  # the characters typed during a step
+    BUTTONS = (STOP, PAUSE)  # coded after the characters in replays
 
-class Game:
-    def __init__(self):
-        self.screen_width = 1000
-        self.screen_height = 700
-        self.ui_height = 60
-        
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), 0, 32)
-        pygame.display.set_caption("Typing Speed Test")
-        
-        # Try to use a monospace font, fallback to default
-        try:
-            self.font = pygame.font.SysFont("courier", FONT_SIZE, bold=True)
-        except:
-            try:
-                self.font = pygame.font.SysFont("monospace", FONT_SIZE, bold=True)
-            except:
-                self.font = pygame.font.Font(None, FONT_SIZE)
-        
-        # UI font (smaller)
-        try:
-            self.ui_font = pygame.font.SysFont("courier", 24, bold=True)
-        except:
-            try:
-                self.ui_font = pygame.font.SysFont("monospace", 24, bold=True)
-            except:
-                self.ui_font = pygame.font.Font(None, 24)
-        
+    def __init__(self, seed=None):
+        super().__init__(seed)
         self.state = STATE_WAITING
         self.text = LOREM_IPSUM
         self.typed_chars = 0
@@ -91,6 +63,21 @@ class Game:
         
         self.reset_game()
 
+    def clock(self):
+        """Seconds, as the timer sees them"""
+        return self.ticks / TICKS_PER_SECOND
+
+    def restart(self):
+        self.start_game()
+
+    @property
+    def score(self):
+        return self.current_speed if self.done else self.calculate_speed()
+
+    @property
+    def done(self):
+        return self.state == STATE_GAME_OVER
+
     def reset_game(self):
         self.text = LOREM_IPSUM
         self.typed_chars = 0
@@ -103,7 +90,7 @@ class Game:
 
     def start_game(self):
         self.reset_game()
-        self.start_time = time.time()
+        self.start_time = self.clock()
         self.state = STATE_PLAYING
 
     def calculate_speed(self):
@@ -121,7 +108,7 @@ class Game:
     def update_time(self):
         """Update elapsed time (only when playing)"""
         if self.state == STATE_PLAYING and self.start_time is not None:
-            current_time = time.time()
+            current_time = self.clock()
             if self.pause_start is None:
                 # Not paused, calculate normally
                 self.elapsed_time = current_time - self.start_time - self.paused_time
@@ -131,12 +118,12 @@ class Game:
 
     def pause_game(self):
         if self.state == STATE_PLAYING:
-            self.pause_start = time.time()
+            self.pause_start = self.clock()
             self.state = STATE_PAUSED
         elif self.state == STATE_PAUSED:
             # Resume
             if self.pause_start is not None:
-                self.paused_time += time.time() - self.pause_start
+                self.paused_time += self.clock() - self.pause_start
                 self.pause_start = None
             self.state = STATE_PLAYING
 
@@ -144,6 +131,7 @@ class Game:
         """Stop the game and show results"""
         if self.state == STATE_PLAYING or self.state == STATE_PAUSED:
             # Calculate final speed
+            self.update_time()
             self.current_speed = self.calculate_speed()
             if self.current_speed > self.fastest_speed:
                 self.fastest_speed = self.current_speed
@@ -161,11 +149,75 @@ class Game:
                 
                 # Check if completed
                 if self.typed_chars >= len(self.text):
+                    self.update_time()
                     self.current_speed = self.calculate_speed()
                     if self.current_speed > self.fastest_speed:
                         self.fastest_speed = self.current_speed
                     self.state = STATE_GAME_OVER
 
+    def encode_input(self, action):
+        if action in self.BUTTONS:
+            return len(self.ACTIONS) + self.BUTTONS.index(action)
+        return self.ACTIONS.index(action)
+
+    def decode_input(self, code):
+        if code >= len(self.ACTIONS):
+            return self.BUTTONS[code - len(self.ACTIONS)]
+        return self.ACTIONS[code]
+
+    def tick(self, inputs):
+        """inputs are typed characters, STOP or PAUSE, in the order they came"""
+        for action in inputs:
+            if action == STOP:
+                self.stop_game()
+            elif action == PAUSE:
+                self.pause_game()
+            else:
+                self.handle_typing(action)
+        self.update_time()
+
+
+class Game(Simulation):
+    def __init__(self):
+        self.screen_width = 1000
+        self.screen_height = 700
+        self.ui_height = 60
+        
+        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), 0, 32)
+        self.dirty = DirtyRects()
+        self.drawn_chars = 0  # typed_chars when the text was last drawn
+        self.pressed = []  # characters typed and buttons clicked since the last tick
+        self.wrapped_text = None
+        self.wrapped_lines = []
+        pygame.display.set_caption("Typing Speed Test")
+        
+        # Try to use a monospace font, fallback to default
+        try:
+            self.font = get_font(FONT_SIZE, "courier", bold=True)
+        except:
+            try:
+                self.font = get_font(FONT_SIZE, "monospace", bold=True)
+            except:
+                self.font = get_font(FONT_SIZE)
+        
+        # UI font (smaller)
+        try:
+            self.ui_font = get_font(24, "courier", bold=True)
+        except:
+            try:
+                self.ui_font = get_font(24, "monospace", bold=True)
+            except:
+                self.ui_font = get_font(24)
+
+        self.start_btn = Button(self.screen_width - 120, 10, 100, 40, "START", font=self.ui_font)
+        self.stop_btn = Button(self.screen_width - 240, 10, 100, 40, "STOP", font=self.ui_font)
+        self.pause_btn = Button(self.screen_width - 120, 10, 100, 40, "PAUSE", font=self.ui_font)
+        self.resume_btn = Button(self.screen_width - 120, 10, 100, 40, "RESUME", font=self.ui_font)
+        self.restart_btn = Button(self.screen_width // 2 - 100, self.screen_height // 2 + 130, 200, 50, "RESTART",
+                                  font=self.ui_font)
+        
+        super().__init__()
+
     def render_ui(self):
         """Render UI panel"""
         ui_panel = pygame.Rect(0, 0, self.screen_width, self.ui_height)
@@ -193,38 +245,31 @@ class Game:
         fastest_str = f"Fastest: {self.fastest_speed} WPM"
         fastest_text = self.ui_font.render(fastest_str, True, COLOR_WHITE)
         self.screen.blit(fastest_text, (400, 15))
-        
-        # Buttons
-        buttons = []
+        self.dirty.watch("stats", (time_str, self.calculate_speed(), self.current_speed, fastest_str), ui_panel)
         
         # Start button (only show when waiting)
         if self.state == STATE_WAITING:
-            start_btn = Button(self.screen_width - 120, 10, 100, 40, "START")
-            start_btn.check_hover(pygame.mouse.get_pos())
-            start_btn.render(self.screen, self.ui_font)
-            buttons.append(start_btn)
+            self.start_btn.check_hover(pygame.mouse.get_pos())
+            self.start_btn.render(self.screen)
+            self.dirty.watch("start_hover", self.start_btn.is_hovered, self.start_btn.rect)
         
         # Pause/Resume and Stop buttons (show when playing or paused)
         elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
-            btn_text = "PAUSE" if self.state == STATE_PLAYING else "RESUME"
             # Stop button (on the left)
-            stop_btn = Button(self.screen_width - 240, 10, 100, 40, "STOP")
-            stop_btn.check_hover(pygame.mouse.get_pos())
-            stop_btn.render(self.screen, self.ui_font)
-            buttons.append(stop_btn)
+            self.stop_btn.check_hover(pygame.mouse.get_pos())
+            self.stop_btn.render(self.screen)
+            self.dirty.watch("stop_hover", self.stop_btn.is_hovered, self.stop_btn.rect)
             
             # Pause/Resume button (on the right)
-            pause_btn = Button(self.screen_width - 120, 10, 100, 40, btn_text)
+            pause_btn = self.pause_btn if self.state == STATE_PLAYING else self.resume_btn
             pause_btn.check_hover(pygame.mouse.get_pos())
-            pause_btn.render(self.screen, self.ui_font)
-            buttons.append(pause_btn)
-        
-        return buttons if buttons else None
+            pause_btn.render(self.screen)
+            self.dirty.watch("pause_hover", (pause_btn.text, pause_btn.is_hovered), pause_btn.rect)
 
-    def render_text(self):
-        """Render the text with typed parts in white and untyped parts semi-transparent"""
-        y_offset = self.ui_height + TEXT_MARGIN
-        x_offset = TEXT_MARGIN
+    def wrap_text(self):
+        """Split the text into lines that fit the screen, rewrapped only when the text changes"""
+        if self.wrapped_text == self.text:
+            return self.wrapped_lines
         max_width = self.screen_width - 2 * TEXT_MARGIN
         
         # Build lines by wrapping text
@@ -251,9 +296,19 @@ class Game:
         
         if current_line:
             lines.append(current_line)
+        self.wrapped_text = self.text
+        self.wrapped_lines = lines
+        return lines
+
+    def render_text(self):
+        """Render the text with typed parts in white and untyped parts semi-transparent"""
+        y_offset = self.ui_height + TEXT_MARGIN
+        x_offset = TEXT_MARGIN
+        lines = self.wrap_text()
         
         # Render each line character by character
         char_index = 0
+        char_rects = []
         for line in lines:
             line_y = y_offset
             x_pos = x_offset
@@ -264,10 +319,9 @@ class Game:
                     char_surf = self.font.render(char, True, COLOR_TEXT_TYPED)
                 else:
                     # Untyped character - semi-transparent gray
-                    char_surf = self.font.render(char, True, (100, 100, 100))
-                    char_surf.set_alpha(180)
+                    char_surf = self.font.render(char, True, (100, 100, 100), alpha=180)
                 
-                self.screen.blit(char_surf, (x_pos, line_y))
+                char_rects.append(self.screen.blit(char_surf, (x_pos, line_y)))
                 
                 # Get character width for positioning
                 char_width = self.font.size(char)[0]
@@ -276,6 +330,12 @@ class Game:
             
             y_offset += LINE_SPACING
 
+        # Only the characters typed (or reset) since the last frame changed colour
+        if self.typed_chars != self.drawn_chars:
+            for rect in char_rects[min(self.typed_chars, self.drawn_chars):max(self.typed_chars, self.drawn_chars)]:
+                self.dirty.mark(rect)
+            self.drawn_chars = self.typed_chars
+
     def render_playing(self):
         """Render game during play"""
         self.screen.fill(COLOR_LIGHT_BLUE)
@@ -294,12 +354,12 @@ class Game:
         self.render_text()
         
         # Render instructions
-        title_font = pygame.font.Font(None, 48)
+        title_font = get_font(48)
         title_text = title_font.render("Typing Speed Test", True, COLOR_BLACK)
         title_rect = title_text.get_rect(center=(self.screen_width // 2, self.ui_height + 30))
         self.screen.blit(title_text, title_rect)
         
-        hint_font = pygame.font.Font(None, 24)
+        hint_font = get_font(24)
         hint_text = hint_font.render("Type the text above. Press SPACE to start.", True, COLOR_BLACK)
         hint_rect = hint_text.get_rect(center=(self.screen_width // 2, self.screen_height - 50))
         self.screen.blit(hint_text, hint_rect)
@@ -317,12 +377,12 @@ class Game:
         overlay.fill(COLOR_BLACK)
         self.screen.blit(overlay, (0, 0))
         
-        pause_font = pygame.font.Font(None, 72)
+        pause_font = get_font(72)
         pause_text = pause_font.render("PAUSED", True, COLOR_WHITE)
         pause_rect = pause_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
         self.screen.blit(pause_text, pause_rect)
         
-        hint_font = pygame.font.Font(None, 24)
+        hint_font = get_font(24)
         hint_text = hint_font.render("Click RESUME button to continue", True, COLOR_WHITE)
         hint_rect = hint_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 + 50))
         self.screen.blit(hint_text, hint_rect)
@@ -341,13 +401,13 @@ class Game:
         screen_w = self.screen_width
         screen_h = self.screen_height
 
-        font_title = pygame.font.Font(None, 72)
+        font_title = get_font(72)
         title = font_title.render("COMPLETE!", True, COLOR_WHITE)
         title_rect = title.get_rect(center=(screen_w // 2, screen_h // 2 - 150))
         self.screen.blit(title, title_rect)
 
         # Speed information
-        font_score = pygame.font.Font(None, 48)
+        font_score = get_font(48)
         
         current_text = font_score.render(f"Current Speed: {self.current_speed} WPM", True, COLOR_WHITE)
         current_rect = current_text.get_rect(center=(screen_w // 2, screen_h // 2 - 80))
@@ -367,84 +427,65 @@ class Game:
         self.screen.blit(time_text, time_rect)
 
         # Restart button
-        btn_width = 200
-        btn_height = 50
-        btn_x = screen_w // 2 - btn_width // 2
-
-        restart_btn = Button(btn_x, screen_h // 2 + 130, btn_width, btn_height, "RESTART")
-        restart_btn.check_hover(pygame.mouse.get_pos())
-        restart_btn.render(self.screen, self.ui_font)
-
-        return restart_btn
+        self.restart_btn.check_hover(pygame.mouse.get_pos())
+        self.restart_btn.render(self.screen)
+        self.dirty.watch("restart_hover", self.restart_btn.is_hovered, self.restart_btn.rect)
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if self.state == STATE_WAITING and event.key == pygame.K_SPACE:
+                self.new_round()
+            elif self.state == STATE_PLAYING:
+                if event.unicode in self.ACTIONS:
+                    # Typed characters are handled by the next tick
+                    self.pressed.append(event.unicode)
+            elif self.state == STATE_GAME_OVER:
+                if event.key == pygame.K_SPACE:
+                    self.previous_speed = self.current_speed
+                    self.new_round()
 
-    async def run(self):
-        import asyncio
-        running = True
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
 
-        while running:
-            clock.tick(FPS)
-            await asyncio.sleep(0)  # Yield control to event loop for pygbag
+            if self.state == STATE_WAITING:
+                if self.start_btn.check_click(mouse_pos):
+                    self.new_round()
 
-            # Update time
-            self.update_time()
+            elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
+                # Applied by the next tick, so the replay has them
+                if self.stop_btn.check_click(mouse_pos):
+                    self.pressed.append(STOP)
+                elif self.pause_btn.check_click(mouse_pos):
+                    self.pressed.append(PAUSE)
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    pygame.quit()
-                    return
-
-                if event.type == pygame.KEYDOWN:
-                    if self.state == STATE_WAITING and event.key == pygame.K_SPACE:
-                        self.start_game()
-                    elif self.state == STATE_PLAYING:
-                        if event.unicode:
-                            # Handle character input
-                            self.handle_typing(event.unicode)
-                    elif self.state == STATE_GAME_OVER:
-                        if event.key == pygame.K_SPACE:
-                            self.previous_speed = self.current_speed
-                            self.reset_game()
-                            self.start_game()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-
-                    if self.state == STATE_WAITING:
-                        buttons = self.render_ui()
-                        if buttons:
-                            for btn in buttons:
-                                if btn.check_click(mouse_pos):
-                                    self.start_game()
-                                    break
-
-                    elif self.state == STATE_PLAYING or self.state == STATE_PAUSED:
-                        buttons = self.render_ui()
-                        if buttons:
-                            for btn in buttons:
-                                if btn.check_click(mouse_pos):
-                                    if btn.text == "STOP":
-                                        self.stop_game()
-                                    elif btn.text == "PAUSE" or btn.text == "RESUME":
-                                        self.pause_game()
-                                    break
-
-                    elif self.state == STATE_GAME_OVER:
-                        restart_btn = self.render_game_over()
-                        if restart_btn and restart_btn.check_click(mouse_pos):
-                            self.previous_speed = self.current_speed
-                            self.reset_game()
-                            self.start_game()
-
-            # Rendering
-            if self.state == STATE_WAITING:
-                self.render_waiting()
-            elif self.state == STATE_PLAYING:
-                self.render_playing()
-            elif self.state == STATE_PAUSED:
-                self.render_paused()
             elif self.state == STATE_GAME_OVER:
-                self.render_game_over()
-
-            pygame.display.update()
+                if self.restart_btn.check_click(mouse_pos):
+                    self.previous_speed = self.current_speed
+                    self.new_round()
+
+    @property
+    def idle(self):
+        """Nothing moves outside of play, the loop only redraws on input"""
+        return self.state != STATE_PLAYING and not self.pressed
+
+    def update(self):
+        """One timer tick, the timer stops outside of play unless a button was clicked"""
+        if self.state == STATE_PLAYING or self.pressed:
+            self.step(self.pressed)
+            self.pressed = []
+
+    def render(self, alpha):
+        # The overlays cover everything, so a state change redraws the whole screen
+        self.dirty.watch("state", self.state)
+        if self.state == STATE_WAITING:
+            self.render_waiting()
+        elif self.state == STATE_PLAYING:
+            self.render_playing()
+        elif self.state == STATE_PAUSED:
+            self.render_paused()
+        elif self.state == STATE_GAME_OVER:
+            self.render_game_over()
 
+    async def run(self):
+        # Every tick counts towards the timer: a slow frame must not make the speed look higher
+        await FixedStepLoop(TICKS_PER_SECOND, RENDER_FPS, max_steps=None).run(self)
@@ -0,0 +1,201 @@
+import gzip
+import mimetypes
+import os
+import threading
+from urllib.parse import quote
+
+from flask import Response, abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+from catalog import GAMES_DIR, hash_file
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants still work without it
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+HASH_LENGTH = 12  # characters of the sha256 used in ?v= links
+MIN_COMPRESS_SIZE = 1024
+MIN_COMPRESS_SAVING = 0.9  # keep a variant only if it is at most 90% of the original
+
+# GAME_BUNDLE_OFFLOAD values. With OFFLOAD_NONE files go through
+# send_file, which uses the server's wsgi.file_wrapper (os.sendfile under
+# gunicorn) when there is one.
+OFFLOAD_NONE = ""
+OFFLOAD_X_SENDFILE = "x-sendfile"
+OFFLOAD_X_ACCEL = "x-accel-redirect"
+OFFLOAD_MODES = (OFFLOAD_NONE, OFFLOAD_X_SENDFILE, OFFLOAD_X_ACCEL)
+
+# Preferred order when the client accepts more than one encoding
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+VARIANT_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+
+
+class StaticDelivery:
+    """Replacement for Flask's static view.
+
+    Serves the precompressed .br/.gz variant that the client accepts, sets
+    a content-hash ETag (so Range and If-None-Match work against a stable
+    validator), and adds ?v=<hash> to url_for('static', ...) links. A
+    request carrying the current hash is cached as immutable for a year;
+    anything else, such as the .apk that pygbag's index.html loads by a
+    relative URL, is revalidated against the ETag.
+    """
+
+    def __init__(self, app=None):
+        self.static_folder = None
+        self.hashes = {}  # path -> ((mtime_ns, size), sha256)
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("GAME_BUNDLE_OFFLOAD", OFFLOAD_NONE)
+        # Internal nginx location that aliases the static folder
+        app.config.setdefault("GAME_BUNDLE_ACCEL_PREFIX", "/_static/")
+        if app.config["GAME_BUNDLE_OFFLOAD"] not in OFFLOAD_MODES:
+            raise ValueError(f"GAME_BUNDLE_OFFLOAD must be one of {OFFLOAD_MODES}")
+        self.static_folder = app.static_folder
+        app.view_functions["static"] = self.serve
+        app.url_defaults(self.add_version)
+
+    def content_hash(self, path):
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self.hashes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        digest = hash_file(path)
+        with self.lock:
+            self.hashes[path] = (stamp, digest)
+        return digest
+
+    def resolve(self, filename):
+        path = safe_join(self.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def add_version(self, endpoint, values):
+        if endpoint != "static" or "v" in values:
+            return
+        path = self.resolve(values.get("filename", ""))
+        if path is not None:
+            values["v"] = self.content_hash(path)[:HASH_LENGTH]
+
+    def pick_variant(self, path):
+        """Return (encoding, path) of the best variant the client accepts"""
+        mtime = os.stat(path).st_mtime_ns
+        for encoding, suffix in ENCODINGS:
+            if not request.accept_encodings[encoding]:
+                continue
+            variant = path + suffix
+            try:
+                # Ignore variants left behind by an older build
+                if os.stat(variant).st_mtime_ns >= mtime:
+                    return encoding, variant
+            except FileNotFoundError:
+                continue
+        return None, path
+
+    def serve(self, filename):
+        path = self.resolve(filename)
+        if path is None:
+            abort(404)
+
+        digest = self.content_hash(path)
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        offload = current_app.config["GAME_BUNDLE_OFFLOAD"]
+
+        if offload and is_game_bundle(filename):
+            response = self.offload(offload, filename, path, mimetype, digest[:32])
+        else:
+            encoding, variant = self.pick_variant(path)
+            etag = digest[:32] if encoding is None else f"{digest[:32]}-{encoding}"
+            response = send_file(variant, mimetype=mimetype, conditional=True, etag=etag)
+            if encoding is not None:
+                response.headers["Content-Encoding"] = encoding
+            response.vary.add("Accept-Encoding")
+
+        if request.args.get("v") == digest[:HASH_LENGTH]:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+            response.cache_control.max_age = None
+        return response
+
+    def offload(self, mode, filename, path, mimetype, etag):
+        """Let the fronting proxy send the file instead of this worker
+
+        Only headers are produced here. Range requests and picking a
+        precompressed variant are left to the proxy (nginx gzip_static /
+        brotli_static, or Apache's mod_xsendfile with MultiViews).
+        """
+        response = Response(mimetype=mimetype)
+        response.set_etag(etag)
+        if mode == OFFLOAD_X_ACCEL:
+            prefix = current_app.config["GAME_BUNDLE_ACCEL_PREFIX"]
+            response.headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(filename)
+        else:
+            response.headers["X-Sendfile"] = path
+        response.make_conditional(request)
+        if response.status_code == 304:
+            # The proxy would otherwise send the whole file with the 304
+            response.headers.pop("X-Accel-Redirect", None)
+            response.headers.pop("X-Sendfile", None)
+        return response
+
+
+def is_game_bundle(filename):
+    """True for files under Games/<game_id>/build/"""
+    parts = filename.split("/")
+    return len(parts) > 3 and parts[0] == "Games" and parts[2] == "build"
+
+
+def compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def precompress(root=GAMES_DIR):
+    """Write .gz (and .br if brotli is installed) next to every build file
+
+    Only files under a game's build/ folder are compressed, and a variant
+    is kept only if it is meaningfully smaller than the original.
+    """
+    encodings = [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != "br" or brotli]
+    written = []
+    for game_id in sorted(os.listdir(root)):
+        build_dir = os.path.join(root, game_id, "build")
+        for dirpath, dirs, files in os.walk(build_dir):
+            for name in sorted(files):
+                if name.endswith(VARIANT_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, name)
+                if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                for encoding, suffix in encodings:
+                    variant = path + suffix
+                    if os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+                        continue
+                    compressed = compress(data, encoding)
+                    if len(compressed) > len(data) * MIN_COMPRESS_SAVING:
+                        if os.path.exists(variant):
+                            os.remove(variant)
+                        continue
+                    with open(variant, "wb") as f:
+                        f.write(compressed)
+                    written.append(variant)
+    return written
+
+
+if __name__ == "__main__":
+    for path in precompress():
+        print(f"Wrote {os.path.relpath(path, GAMES_DIR)}")
@@ -0,0 +1,50 @@
+import functools
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAMES_DIR = os.path.join(APP_DIR, "static", "Games")
+
+# The games run headless, as in simulate.py and thumbnails.py
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, APP_DIR)
+sys.path.append(GAMES_DIR)  # the shared engine package, as the games import it
+
+from simulate import load_classes
+
+
+@functools.lru_cache(maxsize=None)
+def game_classes(game_id):
+    return load_classes(os.path.join(GAMES_DIR, game_id), game_id)
+
+
+@pytest.fixture
+def game(monkeypatch):
+    """game(game_id) returns its classes module, with the game's folder as working directory"""
+    def load(game_id):
+        monkeypatch.chdir(os.path.join(GAMES_DIR, game_id))  # games load img/ and maps/ by relative path
+        return game_classes(game_id)
+    return load
+
+
+@pytest.fixture
+def life(game):
+    return game("game_of_life")
+
+
+@pytest.fixture(scope="session")
+def portal(tmp_path_factory):
+    """The portal's app module, on a database of its own"""
+    os.environ["DATABASE_URL"] = "sqlite:///" + str(tmp_path_factory.mktemp("portal") / "portal.db")
+    import app as portal
+    yield portal
+    portal.rating_store.stop()
+    portal.leaderboard.stop()
+
+
+@pytest.fixture
+def client(portal):
+    return portal.app.test_client()
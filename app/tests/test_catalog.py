@@ -0,0 +1,32 @@
+"""Catalog loading, snapshot reuse and reloads on a throwaway games folder"""
+import json
+import os
+
+from catalog import Catalog
+
+
+def write_manifest(games_dir, game_id, name, size=0):
+    os.makedirs(games_dir / game_id, exist_ok=True)
+    with open(games_dir / game_id / "manifest.json", "w") as f:
+        json.dump({"name": name, "description": " " * size}, f)
+
+
+def test_reload_reparses_only_changed_manifests(tmp_path):
+    games_dir = tmp_path / "Games"
+    write_manifest(games_dir, "alpha", "Alpha")
+    write_manifest(games_dir, "beta", "Beta")
+    snapshot = str(tmp_path / "catalog.snapshot")
+
+    catalog = Catalog(str(games_dir), snapshot)
+    assert catalog.load() == ["alpha", "beta"]
+    assert [card["name"] for card in catalog] == ["Alpha", "Beta"]
+    assert catalog.load() == []
+
+    # A fresh process starts from the snapshot
+    assert Catalog(str(games_dir), snapshot).load() == []
+
+    write_manifest(games_dir, "beta", "Beta 2", size=3)
+    os.remove(games_dir / "alpha" / "manifest.json")
+    assert catalog.load() == ["beta", "alpha"]
+    assert "alpha" not in catalog
+    assert catalog.get("beta")["name"] == "Beta 2"
@@ -0,0 +1,153 @@
+"""Every Game of Life engine against a brute-force generation"""
+import random
+
+import pytest
+
+BOUNDED_ENGINES = ["classic", "numpy", "bitboard", "active"]
+SIZES = [(20, 20), (37, 23), (1, 9), (64, 5), (130, 6)]
+
+
+def reference_step(cells, width=None, height=None):
+    """Next generation of a set of live (x, y) cells, dead outside width x height when given"""
+    counts = {}
+    for x, y in cells:
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx or dy:
+                    counts[x + dx, y + dy] = counts.get((x + dx, y + dy), 0) + 1
+    return {(x, y) for (x, y), count in counts.items()
+            if (count == 3 or count == 2 and (x, y) in cells)
+            and (width is None or 0 <= x < width and 0 <= y < height)}
+
+
+def soup(rng, width, height, density=0.3):
+    return {(x, y) for x in range(width) for y in range(height) if rng.random() < density}
+
+
+def columns(cells, width, height):
+    return [[(x, y) in cells for y in range(height)] for x in range(width)]
+
+
+def live_cells(field, width, height, left=0, top=0):
+    return {(x, y) for x in range(left, left + width) for y in range(top, top + height) if field.get(x, y)}
+
+
+def make_field(life, engine, width, height):
+    if engine == "numpy" and life.numpy is None:
+        pytest.skip("numpy is not installed")
+    return life.FIELDS[engine](life.Square, None, width, height)
+
+
+@pytest.mark.parametrize("engine", BOUNDED_ENGINES)
+@pytest.mark.parametrize("width, height", SIZES)
+def test_engine_matches_reference(life, engine, width, height):
+    rng = random.Random(width * 1000 + height)
+    field = make_field(life, engine, width, height)
+    cells = soup(rng, width, height)
+    field.load(columns(cells, width, height))
+    assert live_cells(field, width, height) == cells
+
+    for generation in range(40):
+        if generation % 10 == 5:  # a click between generations
+            cell = rng.randrange(width), rng.randrange(height)
+            field.toggle(*cell)
+            cells ^= {cell}
+        field.run()
+        cells = reference_step(cells, width, height)
+        assert live_cells(field, width, height) == cells, f"generation {generation}"
+        assert field.population == len(cells)
+
+
+def test_bitboard_rows_stay_inside_the_board(life):
+    width, height = 70, 12
+    field = life.BitField(life.Square, None, width, height)
+    field.load(columns(soup(random.Random(3), width, height, 0.5), width, height))
+    for _ in range(30):
+        field.run()
+        assert all(0 <= row < 1 << width for row in field.rows)
+
+
+def test_active_field_switches_to_rows_and_back(life):
+    # A soup in one corner is dense at first, then settles into a few still lifes and blinkers
+    width, height = 120, 120
+    rng = random.Random(13)
+    field = life.ActiveField(life.Square, None, width, height)
+    cells = soup(rng, 30, 30, 0.35)
+    field.load(columns(cells, width, height))
+    modes = []
+    for generation in range(400):
+        if generation == 3:
+            # A click, then a load of the same board while the rows are in use
+            field.toggle(60, 60)
+            cells ^= {(60, 60)}
+            field.load(columns(cells, width, height))
+        field.run()
+        cells = reference_step(cells, width, height)
+        modes.append(field.rows is not None)
+        if generation % 25 == 0 or modes[-2:] == [True, False]:
+            assert live_cells(field, width, height) == cells, f"generation {generation}"
+        assert field.population == len(cells)
+    assert modes[0] and not modes[-1]
+    assert live_cells(field, width, height) == cells
+
+
+def assert_universe(field, cells):
+    """The HashField universe holds exactly the given live cells"""
+    assert field.population == len(cells)
+    assert all(field.get(x, y) for x, y in cells)
+
+
+def test_hashlife_matches_unbounded_reference(life):
+    field = life.HashField(life.Square, None, 12, 12)
+    cells = {(x - 5, y + 3) for x, y in soup(random.Random(4), 12, 12, 0.4)}
+    field.load_cells(cells)
+    for generation in range(40):
+        field.run()
+        cells = reference_step(cells)
+        assert_universe(field, cells)
+
+
+@pytest.mark.parametrize("k", range(6))
+def test_hashlife_jump_matches_single_steps(life, k):
+    r_pentomino = {(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)}
+    field = life.HashField(life.Square, None)
+    field.load_cells(r_pentomino)
+    field.jump(k)
+    cells = r_pentomino
+    for _ in range(1 << k):
+        cells = reference_step(cells)
+    assert_universe(field, cells)
+
+
+def test_hashlife_survives_collection(life):
+    field = life.HashField(life.Square, None)
+    field.max_nodes = 64  # collect after nearly every step
+    cells = soup(random.Random(6), 10, 10, 0.4)
+    field.load_cells(cells)
+    for generation in range(30):
+        field.jump(generation % 3)
+        for _ in range(1 << generation % 3):
+            cells = reference_step(cells)
+        assert_universe(field, cells)
+
+
+@pytest.mark.parametrize("engine", BOUNDED_ENGINES + ["hashlife"])
+def test_field_view_shows_every_cell(life, engine):
+    # A board bigger than the view, redrawn from the changed cells after every generation
+    size = life.FIELD_MARGIN * 2 + life.FIELD_SIZE * life.CELL_SIZE
+    window = life.pygame.Surface((size, size))
+    width, height = life.FIELD_SIZE + 7, life.FIELD_SIZE + 3
+    field = make_field(life, engine, width, height)
+    field.window = window
+    field.load(columns(soup(random.Random(9), width, height), width, height))
+    for frame in range(12):
+        if frame == 6:
+            field.toggle(3, 4)
+        field.render_field()
+        field.changed.clear()
+        for x in range(life.FIELD_SIZE):
+            for y in range(life.FIELD_SIZE):
+                centre = (life.FIELD_MARGIN + x * life.CELL_SIZE + life.CELL_SIZE // 2,
+                          life.FIELD_MARGIN + y * life.CELL_SIZE + life.CELL_SIZE // 2)
+                assert window.get_at(centre) == field.view.colors[field.get(x, y)], f"frame {frame} cell {x}, {y}"
+        field.run()
@@ -0,0 +1,53 @@
+"""FixedStepLoop with a stand-in game"""
+import asyncio
+
+import pygame
+import pytest
+
+from engine.loop import FixedStepLoop
+
+
+class ClickGame:
+    """Idle until clicked, like a stopped Game of Life board"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.frames = 0
+        self.pressed = []
+        self.applied_at = None  # frame whose update() applied the click
+
+    @property
+    def idle(self):
+        return not self.pressed
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.pressed.append(event.pos)
+
+    def update(self):
+        if self.pressed:
+            self.applied_at = self.frames
+            self.pressed = []
+
+    def render(self, alpha):
+        self.frames += 1
+        if self.frames == 2:
+            pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(1, 1), button=1))
+        if self.frames == 4:
+            self.loop.stop()
+
+
+@pytest.fixture
+def display():
+    pygame.init()
+    pygame.display.set_mode((40, 40))
+    yield
+    pygame.quit()
+
+
+def test_input_that_ends_idle_is_applied_in_the_same_frame(display):
+    loop = FixedStepLoop(1)  # a step per second: waiting for one would show
+    loop.idle_heartbeat = 0.01
+    game = ClickGame(loop)
+    asyncio.run(loop.run(game))
+    assert game.applied_at == 2  # update() ran before the third frame's render
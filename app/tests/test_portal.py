@@ -0,0 +1,78 @@
+"""Ratings, scores and the cached index through the Flask test client"""
+import pytest
+
+
+def test_rating_is_applied_to_the_card(portal, client):
+    for rating in (5, 2, "5"):
+        response = client.post("/games/tetris/rate", json={"rating": rating})
+        assert response.status_code == 202
+    portal.rating_store.flush()
+    assert portal.rating_store.get("tetris") == (12.0, 3)
+    assert portal.catalog.get("tetris").rating == 4.0
+    assert b"4.0/5" in client.get("/").data
+
+
+@pytest.mark.parametrize("rating", [4.9, True, 0, 6, "4.5", "five", None, [3]])
+def test_rating_must_be_a_whole_number_from_1_to_5(client, rating):
+    assert client.post("/games/tetris/rate", json={"rating": rating}).status_code == 400
+
+
+def test_rating_unknown_game(client):
+    assert client.post("/games/nope/rate", json={"rating": 3}).status_code == 404
+
+
+@pytest.mark.parametrize("score", [99.99, True, "1.5", -1, 1 << 63, None])
+def test_score_must_be_a_whole_number_in_range(client, score):
+    assert client.post("/games/snake/scores", json={"player": "ann", "score": score}).status_code == 400
+
+
+def test_score_needs_a_player(client):
+    assert client.post("/games/snake/scores", json={"player": " ", "score": 3}).status_code == 400
+
+
+@pytest.mark.parametrize("body", [[1, 2], "7", 7])
+def test_score_body_must_be_an_object(client, body):
+    assert client.post("/games/snake/scores", json=body).status_code == 400
+
+
+def test_leaderboard_and_rank(portal, client):
+    for player, score in (("ann", 30), ("bob", 50), ("cid", 10), ("dee", 50)):
+        response = client.post("/games/snake/scores", json={"player": player, "score": score})
+        assert response.status_code == 202
+    response = client.post("/games/snake/scores", data={"player": "eve", "score": "20"})
+    assert response.status_code == 202
+    portal.leaderboard.flush()
+
+    scores = client.get("/games/snake/leaderboard?limit=3").json["scores"]
+    assert [entry["score"] for entry in scores] == [50, 50, 30]
+    assert [entry["player"] for entry in scores[:2]] == ["bob", "dee"]  # ties in submission order
+    assert len(client.get("/games/snake/leaderboard?limit=-5").json["scores"]) == 1
+
+    def rank(score):
+        data = client.get(f"/games/snake/leaderboard/rank?score={score}").json
+        return data["rank"], data["total"]
+
+    assert rank(50) == (1, 5)  # ties share the best rank
+    assert rank(30) == (3, 5)
+    assert rank(25) == (4, 5)
+    assert rank(0) == (6, 5)
+    assert client.get("/games/snake/leaderboard/rank").status_code == 400
+
+
+def test_index_answers_304_to_its_etag(client):
+    response = client.get("/")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and etag
+
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert client.get("/", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_metrics_counts_requests(client):
+    client.get("/about")
+    client.get("/about")
+    text = client.get("/metrics").get_data(as_text=True)
+    counts = [line for line in text.splitlines() if line.startswith('portal_request_duration_seconds_count{endpoint="about"}')]
+    assert counts and int(counts[0].split()[-1]) >= 2
@@ -0,0 +1,95 @@
+"""Recorded rounds survive the varint format and replay to the same end"""
+import os
+import random
+
+import pytest
+
+from catalog import GAMES_DIR, MANIFEST_NAME
+from engine.replay import Replay, read_varint, write_varint
+from simulate import RandomBot
+
+GAME_IDS = sorted(game_id for game_id in os.listdir(GAMES_DIR)
+                  if os.path.isfile(os.path.join(GAMES_DIR, game_id, MANIFEST_NAME)))
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 1 << 32, (1 << 63) - 1])
+def test_varint_round_trip(value):
+    out = bytearray(b"x")
+    write_varint(out, value)
+    assert read_varint(out, 1) == (value, len(out))
+    assert all(byte & 0x80 for byte in out[1:-1]) and out[-1] < 0x80
+
+
+def test_truncated_varint_is_rejected():
+    out = bytearray()
+    write_varint(out, 300)
+    with pytest.raises(ValueError):
+        read_varint(out[:-1], 0)
+
+
+def bot_actions(classes, simulation):
+    if simulation.ACTIONS:
+        return list(simulation.ACTIONS)
+    # Game of Life takes clicked cells and the start/stop button
+    return [classes.START_STOP] + [(x, y) for x in range(5) for y in range(5)]
+
+
+@pytest.mark.parametrize("game_id", GAME_IDS)
+def test_recorded_round_replays(game, game_id):
+    classes = game(game_id)
+    simulation = classes.Simulation()
+    simulation.new_round(1234)
+    bot = RandomBot(bot_actions(classes, simulation), random.Random(5))
+    for _ in range(1500):
+        simulation.step(bot.inputs())
+        if simulation.done:
+            break
+
+    data = simulation.replay.to_bytes()
+    replay = Replay.from_bytes(data)
+    assert (replay.seed, replay.variant, replay.ticks) == (1234, simulation.variant, simulation.ticks)
+    assert replay.to_bytes() == data
+
+    played = classes.Simulation()
+    played.replay = Replay(replay.seed, replay.variant)  # records the inputs again
+    replay.play(played)
+    assert played.replay.to_bytes() == data
+    assert (played.ticks, played.score, played.done) == (simulation.ticks, simulation.score, simulation.done)
+    assert played.rng.getstate() == simulation.rng.getstate()
+
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:-1])
+
+
+def test_typing_test_buttons_are_replayed(game, monkeypatch):
+    classes = game("typing_test")
+    pygame = classes.pygame
+    pygame.init()  # as main.py does
+    typing = classes.Game()
+    typing.new_round(99)
+
+    def key(char):
+        typing.handle_event(pygame.event.Event(pygame.KEYDOWN, key=0, unicode=char, mod=0, scancode=0))
+
+    def click(button):
+        monkeypatch.setattr(pygame.mouse, "get_pos", lambda: button.rect.center)
+        typing.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=button.rect.center, button=1))
+
+    for char in classes.LOREM_IPSUM[:12]:
+        key(char)
+        for _ in range(10):
+            typing.update()
+    click(typing.pause_btn)
+    typing.update()
+    assert typing.state == classes.STATE_PAUSED
+    click(typing.resume_btn)
+    typing.update()
+    for _ in range(5):
+        typing.update()
+    click(typing.stop_btn)
+    typing.update()
+    assert typing.done
+
+    played = typing.replay.play(classes.Simulation())
+    assert played.done
+    assert (played.ticks, played.score, played.typed_chars) == (typing.ticks, typing.score, typing.typed_chars)
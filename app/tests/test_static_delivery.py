@@ -0,0 +1,71 @@
+"""StaticDelivery on a throwaway static folder"""
+import gzip
+
+import pytest
+from flask import Flask, url_for
+
+from static_delivery import IMMUTABLE_MAX_AGE, StaticDelivery, precompress
+
+BUNDLE = "Games/demo/build/web/demo.apk"
+PAGE = "Games/demo/build/web/index.html"
+
+
+@pytest.fixture
+def static_app(tmp_path):
+    static = tmp_path / "static"
+    (static / "Games" / "demo" / "build" / "web").mkdir(parents=True)
+    (static / BUNDLE).write_bytes(b"bundle " * 4096)
+    (static / PAGE).write_text("<html>" + "<p>demo</p>" * 200 + "</html>")
+    precompress(str(static / "Games"))
+    app = Flask(__name__, static_folder=str(static))
+    StaticDelivery(app)
+    return app
+
+
+def test_range_is_served_from_the_gzip_variant(static_app):
+    client = static_app.test_client()
+    gz = (static_app.static_folder + "/" + BUNDLE + ".gz")
+    with open(gz, "rb") as f:
+        data = f.read()
+    assert gzip.decompress(data) == b"bundle " * 4096
+
+    response = client.get("/static/" + BUNDLE, headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Range"] == f"bytes 0-9/{len(data)}"
+    assert response.data == data[:10]
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    plain = client.get("/static/" + BUNDLE, headers={"Range": "bytes=7-13"})
+    assert plain.status_code == 206
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == b"bundle "
+
+
+def test_versioned_links_are_immutable(static_app):
+    client = static_app.test_client()
+    with static_app.test_request_context():
+        url = url_for("static", filename=PAGE)
+    assert "?v=" in url
+
+    response = client.get(url)
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == IMMUTABLE_MAX_AGE
+
+    response = client.get("/static/" + PAGE)
+    assert response.cache_control.no_cache
+    assert client.get("/static/" + PAGE, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_x_accel_offload(static_app):
+    static_app.config["GAME_BUNDLE_OFFLOAD"] = "x-accel-redirect"
+    client = static_app.test_client()
+    response = client.get("/static/" + BUNDLE)
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/_static/" + BUNDLE
+    assert response.data == b""
+
+    response = client.get("/static/" + BUNDLE, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert "X-Accel-Redirect" not in response.headers
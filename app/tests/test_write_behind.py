@@ -0,0 +1,58 @@
+"""WriteBehindStore batching, retries and limits without a database"""
+import pytest
+from flask import Flask
+
+from write_behind import StoreFull, WriteBehindStore
+
+
+class ListStore(WriteBehindStore):
+    """Writes into a list, refusing any batch that holds "bad" """
+
+    def __init__(self, app, **kwargs):
+        super().__init__(app, **kwargs)
+        self.written = []
+        self.batches = 0
+
+    def write_batch(self, batch):
+        self.batches += 1
+        if "bad" in batch:
+            raise RuntimeError("refused")
+        self.written.extend(batch)
+
+    def refresh(self):
+        pass
+
+
+@pytest.fixture
+def store():
+    return ListStore(Flask(__name__), max_pending=4, max_attempts=2)
+
+
+def test_flush_writes_one_batch(store):
+    for item in "abc":
+        store.enqueue(item)
+    store.flush()
+    assert store.written == ["a", "b", "c"]
+    assert store.batches == 1 and store.pending == []
+
+
+def test_failing_item_is_retried_then_dropped(store):
+    for item in ("a", "bad", "b"):
+        store.enqueue(item)
+    store.flush()
+    assert store.written == ["a", "b"]
+    assert store.pending == [("bad", 1)]
+
+    store.enqueue("c")
+    store.flush()
+    assert store.written == ["a", "b", "c"]
+    assert store.pending == []
+
+
+def test_full_buffer_refuses_items(store):
+    for item in "abcd":
+        store.enqueue(item)
+    with pytest.raises(StoreFull):
+        store.enqueue("e")
+    store.flush()
+    store.enqueue("e")
@@ -0,0 +1,173 @@
+"""Render a preview thumbnail of every game in the catalog.
+
+Each game runs headless (SDL dummy video driver) in its own process for
+a scripted number of frames and the last frame is saved, scaled down, to
+static/thumbnails/<game_id>.png. A game is only re-rendered when the hash
+of its sources, images, maps or thumbnail script changed. random is
+seeded with the script's "seed", or the game id, so the same sources
+always give the same picture:
+
+    python thumbnails.py [--force] [--workers N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog import BASE_DIR, Catalog, hash_sources
+
+THUMBNAIL_DIR = os.path.join(BASE_DIR, "static", "thumbnails")
+HASHES_PATH = os.path.join(THUMBNAIL_DIR, "hashes.json")
+THUMBNAIL_WIDTH = 320
+DEFAULT_FRAMES = 30
+PIPELINE_VERSION = 2  # bump to re-render everything after changing the renderer
+
+
+def source_hash(game_dir, script):
+    """Hash everything that can change what a game draws"""
+    return hash_sources(game_dir, f"{PIPELINE_VERSION}:{json.dumps(script, sort_keys=True)}")
+
+
+class FinishedRendering(Exception):
+    pass
+
+
+class FakeClock:
+    """Stands in for pygame.time.Clock so frames are not rate limited"""
+
+    def __init__(self, frame_ms=16):
+        self.frame_ms = frame_ms
+
+    def tick(self, framerate=0):
+        return self.frame_ms
+
+    def get_time(self):
+        return self.frame_ms
+
+
+def render_thumbnail(game_dir, output, script):
+    """Run one game headless and save its last frame (runs in a worker process)"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    os.chdir(game_dir)  # games load img/ and maps/ by relative path
+    sys.path.insert(0, game_dir)
+
+    import pygame
+    pygame.time.Clock = FakeClock
+    pygame.init()
+
+    frames = script.get("frames", DEFAULT_FRAMES)
+    events = {}
+    for frame, x, y in script.get("clicks", []):
+        events.setdefault(frame, []).append(("click", (x, y)))
+    for frame, key in script.get("keys", []):
+        events.setdefault(frame, []).append(("key", key))
+
+    # Games read the cursor with get_pos(), which the dummy driver never moves
+    mouse = [(0, 0)]
+    pygame.mouse.get_pos = lambda: mouse[0]
+
+    def post_events(frame):
+        for kind, value in events.get(frame, []):
+            if kind == "click":
+                mouse[0] = tuple(value)
+                pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=mouse[0], button=1))
+            else:
+                key = pygame.key.key_code(value)
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode="", mod=0, scancode=0))
+
+    frame = [0]
+
+    def update(*args):
+        frame[0] += 1
+        if frame[0] >= frames:
+            surface = pygame.display.get_surface()
+            width, height = surface.get_size()
+            size = (THUMBNAIL_WIDTH, max(1, height * THUMBNAIL_WIDTH // width))
+            pygame.image.save(pygame.transform.smoothscale(surface, size), output)
+            raise FinishedRendering
+        post_events(frame[0])
+
+    pygame.display.update = update
+    pygame.display.flip = update
+
+    # new_round() and any other draw from random follow this seed, so a thumbnail only changes with its sources
+    random.seed(script.get("seed", os.path.basename(game_dir)))
+    import classes
+    from engine.loop import FixedStepLoop
+    # Idle screens wait for input in real time; the scripted input is already queued
+    FixedStepLoop.idle_heartbeat = 0
+    game = classes.Game()
+    post_events(0)
+    try:
+        asyncio.run(game.run())
+    except FinishedRendering:
+        pass
+    return output
+
+
+def load_hashes():
+    try:
+        with open(HASHES_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def generate(catalog, force=False, workers=None):
+    """Render the thumbnails whose source hash changed, in parallel"""
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    hashes = load_hashes()
+    jobs = {}
+    for game_id in catalog.cards:
+        game_dir = os.path.join(catalog.games_dir, game_id)
+        script = catalog.manifest(game_id).get("thumbnail", {})
+        digest = source_hash(game_dir, script)
+        output = os.path.join(THUMBNAIL_DIR, f"{game_id}.png")
+        if not force and hashes.get(game_id) == digest and os.path.exists(output):
+            continue
+        jobs[game_id] = (game_dir, output, script, digest)
+
+    if not jobs:
+        return []
+
+    # One process per game: every game has its own top-level "classes"
+    # module and pygame display, so workers can't be reused
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {
+            game_id: pool.submit(render_thumbnail, game_dir, output, script)
+            for game_id, (game_dir, output, script, digest) in jobs.items()
+        }
+        rendered = []
+        for game_id, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Failed to render {game_id}: {e!r}")
+                continue
+            hashes[game_id] = jobs[game_id][3]
+            rendered.append(game_id)
+
+    with open(HASHES_PATH, "w") as f:
+        json.dump(hashes, f, indent=4, sort_keys=True)
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="re-render every game")
+    parser.add_argument("--workers", type=int, help="size of the process pool")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    catalog.load()
+    for game_id in generate(catalog, args.force, args.workers):
+        print(f"Rendered thumbnail for {game_id}")
+
+
+if __name__ == "__main__":
+    main()
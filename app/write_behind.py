@@ -0,0 +1,99 @@
+import atexit
+import threading
+
+FLUSH_INTERVAL = 5.0  # seconds between write-behind flushes
+MAX_PENDING = 10000  # buffered submissions before new ones are refused
+MAX_ATTEMPTS = 3  # flushes an item may fail on its own before it is dropped
+
+
+class StoreFull(Exception):
+    """The buffer already holds max_pending submissions"""
+
+
+class WriteBehindStore:
+    """Base for stores that buffer submissions and write them in batches.
+
+    submit() only appends to an in-memory buffer; a background thread
+    calls flush() every flush_interval seconds, which hands the whole
+    batch to write_batch() inside an app context. When a batch fails its
+    items are written one at a time, so one bad item can't hold back the
+    others; an item that keeps failing on its own is dropped after
+    max_attempts flushes, the rest are put back in front of the buffer
+    for the next flush. The buffer holds at most max_pending items.
+    """
+
+    name = "write-behind"
+
+    def __init__(self, app, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING, max_attempts=MAX_ATTEMPTS):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.pending = []  # (item, failed attempts)
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.flush_loop, name=f"{self.name}-flush", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self.stop_event.set()
+        self.flush()
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception(f"{self.name} flush failed")
+
+    def enqueue(self, item):
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                raise StoreFull(f"{self.name} buffer is full")
+            self.pending.append((item, 0))
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                entries, self.pending = self.pending, []
+            with self.app.app_context():
+                if entries:
+                    try:
+                        self.write_batch([item for item, attempts in entries])
+                    except Exception:
+                        self.app.logger.exception(f"{self.name} batch of {len(entries)} failed, writing items one by one")
+                        retry = self.write_each(entries)
+                        with self.lock:
+                            self.pending[:0] = retry
+                self.refresh()
+
+    def write_each(self, entries):
+        """Write items one per batch, return the (item, attempts) to retry"""
+        retry = []
+        dropped = 0
+        for item, attempts in entries:
+            try:
+                self.write_batch([item])
+            except Exception:
+                attempts += 1
+                if attempts < self.max_attempts:
+                    retry.append((item, attempts))
+                else:
+                    dropped += 1
+                    self.app.logger.error(f"{self.name} dropped {item!r} after {attempts} failed writes")
+        if retry or dropped:
+            self.app.logger.warning(f"{self.name}: {len(retry)} items to retry, {dropped} dropped")
+        return retry
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Update the read cache from the database (runs in an app context)"""